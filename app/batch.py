@@ -0,0 +1,197 @@
+"""Пакетное планирование комнат в пуле процессов."""
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from app.roomplanner import RoomPlanner
+from app.storage import encode
+
+DEFAULT_CELL_SIZE = 20  # Размер ячейки, который использует test.py
+REQUIRED_FIELDS = ("room_size", "doors", "windows", "furniture_list")
+
+
+class PlanResult(NamedTuple):
+    """Компактный результат планирования одной комнаты."""
+    index: int  # Порядковый номер спецификации во входном потоке
+    furniture_positions: Dict[str, Tuple[int, int, int, int]]
+    failures: List[str]
+    stats: Optional[dict] = None  # PlannerStats.as_dict(), если статистика собиралась
+    layout: Optional[bytes] = None  # Запись архива storage.encode, если запрошена
+    error: Optional[str] = None  # Ошибка планирования; тогда остальные поля пустые
+
+
+class InvalidSpec(NamedTuple):
+    """Заглушка вместо спецификации, которую не удалось прочитать.
+
+    Проходит через plan_batch, как обычная спецификация, и дает результат
+    с текстом error на своем месте в порядке входа."""
+    error: str
+
+
+def place_items(planner: RoomPlanner, furniture_list) -> None:
+    """Расставляет мебель из списка вида (name, width, height, placement, *extra)."""
+    for item in furniture_list:
+        place_item(planner, item)
+
+
+def place_item(planner: RoomPlanner, item, rotated: bool = False) -> None:
+    """Ставит один предмет (name, width, height, placement, *extra); rotated - повернутым на 90°."""
+    name, width, height, placement, *extra = item
+    if rotated:
+        width, height = height, width
+    if placement == "window":
+        planner.place_furniture(name, width, height, prefer_window=True)
+    elif placement == "wall":
+        planner.place_furniture(name, width, height, prefer_wall=True)
+    elif placement == "near":
+        planner.place_furniture_near(name, width, height, near_name=extra[0])
+    elif placement == "around":
+        planner.place_furniture_around(name, width, height, target_name=extra[0])
+    elif placement == "wardrobe":
+        planner.place_wardrobe(name, width, height)
+
+
+def validate_spec(spec: dict) -> None:
+    """Проверяет, что в спецификации есть все обязательные поля (ValueError)."""
+    missing = [field for field in REQUIRED_FIELDS if field not in spec]
+    if missing:
+        raise ValueError(f"нет полей: {', '.join(missing)}")
+
+
+def plan_room(spec: dict, **planner_options) -> RoomPlanner:
+    """Планирует комнату по спецификации в формате test_cases из test.py.
+
+    Необязательный ключ cell_size задает размер ячейки (по умолчанию 20 см),
+    planner_options (scoring, collect_stats, ...) передаются в RoomPlanner."""
+    planner = RoomPlanner(
+        tuple(spec["room_size"]), spec.get("cell_size", DEFAULT_CELL_SIZE),
+        spec["doors"], spec["windows"], **planner_options)
+    planner.calculate_weights()
+    place_items(planner, spec["furniture_list"])
+    return planner
+
+
+def plan_result(index: int, spec: dict, **planner_options) -> PlanResult:
+    """Планирует комнату и возвращает только позиции мебели и список неудач."""
+    return _compact(index, plan_room(spec, **planner_options))
+
+
+def _compact(index: int, planner: RoomPlanner, layout: Optional[bytes] = None) -> PlanResult:
+    positions = {name: tuple(int(v) for v in position) for name, position in planner.furniture_positions.items()}
+    stats = planner.stats.as_dict() if planner.stats is not None else None
+    return PlanResult(index, positions, list(planner.failures), stats, layout)
+
+
+def _plan_chunk(chunk: List[Tuple[int, dict]], planner_options: dict, render: bool = False,
+                layouts: bool = False) -> List[Tuple[PlanResult, object]]:
+    """Задача для процесса пула: планирует пачку комнат.
+
+    Возвращает пары (результат, снимок visualizer.RoomView); снимок
+    снимается только с render=True, а рисует его уже писатель
+    изображений в основном процессе. С layouts=True запись архива
+    комнаты собирается в процессе пула. Ошибка в одной спецификации
+    не прерывает пачку: для нее возвращается результат с полем error."""
+    if render:
+        from app.visualizer import RoomView
+
+    results = []
+    for index, spec in chunk:
+        if isinstance(spec, InvalidSpec):
+            results.append((PlanResult(index, {}, [], error=spec.error), None))
+            continue
+        try:
+            planner = plan_room(spec, **planner_options)
+            view = RoomView.from_room(planner) if render else None
+            results.append((_compact(index, planner, encode(planner) if layouts else None), view))
+        except Exception as error:
+            results.append((PlanResult(index, {}, [], error=f"{type(error).__name__}: {error}"), None))
+    return results
+
+
+def _chunks(specs: Iterable[dict], chunksize: int) -> Iterator[List[Tuple[int, dict]]]:
+    """Разбивает поток спецификаций на пачки, сохраняя их номера."""
+    numbered = enumerate(specs)
+    while True:
+        chunk = list(islice(numbered, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def plan_batch(specs: Iterable[dict], workers: Optional[int] = None, chunksize: int = 1,
+               ordered: bool = False, render_dir: Optional[str] = None, layouts: bool = False,
+               writer=None, **planner_options) -> Iterator[PlanResult]:
+    """Планирует комнаты в пуле процессов и отдает результаты по мере готовности.
+
+    specs читается лениво: в работе одновременно не больше 2 * workers пачек,
+    а с ordered=True своей очереди ждут не больше 2 * workers * chunksize
+    результатов (и результаты пачек, уже бывших в работе), поэтому поток
+    спецификаций может быть сколь угодно длинным. chunksize
+    задает число комнат в одной задаче пула и уменьшает накладные расходы
+    на обмен данными для маленьких комнат. Результат каждой комнаты зависит
+    только от ее спецификации, а не от числа процессов; с ordered=True
+    результаты отдаются в порядке входных спецификаций.
+    workers=1 планирует в текущем процессе без пула. render_dir включает
+    сохранение PNG каждой комнаты под ее номером через visualizer.ImageWriter:
+    снимки комнат ставятся в его очередь, планирование не ждет отрисовки,
+    а писатель закрывается по окончании пакета. Вместо render_dir можно
+    передать свой writer (с тем же методом submit); его закрывает
+    вызывающий код. Ошибки отрисовки пишутся в журнал и не попадают
+    в результаты. layouts=True - запись
+    комнаты для архива storage в поле layout результата (ее можно сразу
+    передать в storage.LayoutWriter.write). Комнаты, спецификацию которых
+    не удалось спланировать, дают результат с текстом ошибки в поле error
+    и не прерывают пакет; так же на своем месте выдается ошибка для
+    заглушки InvalidSpec в specs. planner_options передаются
+    в RoomPlanner; с collect_stats=True статистику пакета можно сложить
+    через PlannerStats.aggregate(result.stats for result in results)."""
+    if chunksize < 1:
+        raise ValueError("chunksize должен быть положительным")
+    if render_dir is not None and writer is None:
+        from app.visualizer import ImageWriter
+        with ImageWriter(render_dir) as writer:
+            yield from plan_batch(specs, workers, chunksize, ordered, layouts=layouts, writer=writer,
+                                  **planner_options)
+        return
+    render = writer is not None
+    chunks = _chunks(specs, chunksize)
+    if workers == 1:
+        for chunk in chunks:
+            for result, view in _plan_chunk(chunk, planner_options, render, layouts):
+                if view is not None:
+                    writer.submit(view, f"{result.index}.png")
+                yield result
+        return
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        max_pending = 2 * workers
+        pending = set()
+        ready = {}  # Результаты, ожидающие своей очереди при ordered=True
+        # Пока очереди ждет столько результатов, новые пачки не отправляются:
+        # иначе за одной медленной пачкой копились бы результаты всего входа
+        max_ready = max_pending * chunksize
+        next_index = 0
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < max_pending and len(ready) < max_ready:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                    break
+                pending.add(executor.submit(_plan_chunk, chunk, planner_options, render, layouts))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for result, view in future.result():
+                    if view is not None:
+                        writer.submit(view, f"{result.index}.png")
+                    if not ordered:
+                        yield result
+                        continue
+                    ready[result.index] = result
+                    while next_index in ready:
+                        yield ready.pop(next_index)
+                        next_index += 1
@@ -0,0 +1,266 @@
+"""Кэш результатов планирования по канонической спецификации комнаты.
+
+Ключ - хэш SHA-256 от канонического JSON спецификации (формат test_cases
+из test.py). Кэш двухуровневый: LRU в памяти и, если задан путь, SQLite
+на диске с вытеснением давно не использованных записей по суммарному размеру.
+
+С normalize=True комнаты, отличающиеся только отражением или поворотом
+на 90°, попадают в одну запись: спецификация приводится к каноническому
+положению, а найденная расстановка преобразуется обратно. Планировщик
+не симметричен (порядок перебора, округление до клеток), поэтому такая
+расстановка может отличаться от расстановки, полученной для исходной
+комнаты напрямую; по умолчанию нормализация выключена."""
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from itertools import product
+from typing import NamedTuple, Optional, Tuple
+
+from app.batch import DEFAULT_CELL_SIZE, PlanResult, plan_result
+
+CACHE_VERSION = 1  # Меняется при изменении алгоритма, чтобы не отдавать старые результаты
+
+
+class Transform(NamedTuple):
+    """Преобразование комнаты: транспонирование, затем отражения по осям."""
+    transpose: bool = False
+    flip_x: bool = False
+    flip_y: bool = False
+
+
+IDENTITY = Transform()
+TRANSFORMS = [Transform(*flags) for flags in product((False, True), repeat=3)]
+
+
+def _number(value):
+    """Приводит целые числа с плавающей точкой к int, чтобы 20 и 20.0 давали один ключ."""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _rect(rect, transform: Transform, room_width, room_height) -> list:
+    """Преобразует прямоугольник (x, y, w, h) в сантиметрах."""
+    x, y, w, h = (_number(value) for value in rect)
+    if transform.transpose:
+        x, y, w, h = y, x, h, w
+        room_width, room_height = room_height, room_width
+    if transform.flip_x:
+        x = room_width - x - w
+    if transform.flip_y:
+        y = room_height - y - h
+    return [x, y, w, h]
+
+
+def canonical_spec(spec: dict, transform: Transform = IDENTITY) -> dict:
+    """Спецификация в каноническом виде после преобразования transform."""
+    room_width, room_height = (_number(value) for value in spec["room_size"])
+    furniture = []
+    for name, width, height, placement, *extra in spec["furniture_list"]:
+        width, height = _number(width), _number(height)
+        if transform.transpose:
+            width, height = height, width
+        furniture.append([name, width, height, placement, *extra])
+    room_size = [room_height, room_width] if transform.transpose else [room_width, room_height]
+    return {
+        "version": CACHE_VERSION,
+        "room_size": room_size,
+        "cell_size": _number(spec.get("cell_size", DEFAULT_CELL_SIZE)),
+        "doors": [_rect(door, transform, room_width, room_height) for door in spec["doors"]],
+        "windows": [_rect(window, transform, room_width, room_height) for window in spec["windows"]],
+        "furniture_list": furniture,
+    }
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def spec_key(spec: dict, normalize: bool = False) -> Tuple[str, Transform]:
+    """Ключ кэша и преобразование, приводящее спецификацию к каноническому виду.
+
+    С normalize=True из восьми отражений и поворотов выбирается то,
+    у которого канонический JSON лексикографически минимален."""
+    transforms = TRANSFORMS if normalize else [IDENTITY]
+    text, transform = min((_dumps(canonical_spec(spec, transform)), transform) for transform in transforms)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest(), transform
+
+
+def _grid_size(spec: dict) -> Tuple[int, int]:
+    """Размер сетки комнаты в клетках, как в RoomPlanner."""
+    cell_size = spec.get("cell_size", DEFAULT_CELL_SIZE)
+    room_width, room_height = spec["room_size"]
+    return int(room_width / cell_size), int(room_height / cell_size)
+
+
+def to_canonical_positions(positions: dict, transform: Transform, spec: dict) -> dict:
+    """Переводит позиции мебели (в клетках) из исходного положения в каноническое."""
+    if transform == IDENTITY:
+        return dict(positions)
+    grid_width, grid_height = _grid_size(spec)
+    if transform.transpose:
+        grid_width, grid_height = grid_height, grid_width
+    canonical = {}
+    for name, (x, y, w, h) in positions.items():
+        if transform.transpose:
+            x, y, w, h = y, x, h, w
+        if transform.flip_x:
+            x = grid_width - x - w
+        if transform.flip_y:
+            y = grid_height - y - h
+        canonical[name] = (x, y, w, h)
+    return canonical
+
+
+def restore_positions(positions: dict, transform: Transform, spec: dict) -> dict:
+    """Переводит позиции мебели (в клетках) из канонического положения в исходное."""
+    if transform == IDENTITY:
+        return dict(positions)
+    grid_width, grid_height = _grid_size(spec)
+    if transform.transpose:
+        grid_width, grid_height = grid_height, grid_width
+    restored = {}
+    for name, (x, y, w, h) in positions.items():
+        # Отражения отменяются в каноническом положении, затем транспонирование
+        if transform.flip_x:
+            x = grid_width - x - w
+        if transform.flip_y:
+            y = grid_height - y - h
+        if transform.transpose:
+            x, y, w, h = y, x, h, w
+        restored[name] = (x, y, w, h)
+    return restored
+
+
+class CacheStats:
+    """Счетчики попаданий и промахов кэша."""
+
+    def __init__(self) -> None:
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+
+    def as_dict(self) -> dict:
+        return {"memory_hits": self.memory_hits, "disk_hits": self.disk_hits,
+                "misses": self.misses, "evictions": self.evictions, "hit_rate": self.hit_rate}
+
+
+class PlanCache:
+    """Двухуровневый кэш результатов планирования.
+
+    memory_items - число записей в LRU в памяти; path - файл SQLite
+    (None - только память); max_bytes - предельный суммарный размер
+    записей на диске, сверх которого вытесняются давно не использованные."""
+
+    def __init__(self, memory_items: int = 1024, path: Optional[str] = None,
+                 max_bytes: int = 256 * 1024 * 1024, normalize: bool = False) -> None:
+        self.memory_items = memory_items
+        self.max_bytes = max_bytes
+        self.normalize = normalize
+        self.stats = CacheStats()
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._clock = 0  # Логическое время последнего обращения к записи на диске
+        self._disk_bytes = 0
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS plans "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, used INTEGER NOT NULL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS plans_used ON plans (used)")
+            self._disk_bytes, self._clock = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0), COALESCE(MAX(used), 0) FROM plans").fetchone()
+
+    def _remember(self, key: str, value: tuple) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _tick(self) -> int:
+        self._clock += 1
+        return self._clock
+
+    def _load(self, key: str) -> Optional[tuple]:
+        """Ищет запись в памяти, затем на диске; учитывает попадания и промахи."""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.stats.memory_hits += 1
+                return value
+            if self._db is not None:
+                row = self._db.execute("SELECT value FROM plans WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self._db.execute("UPDATE plans SET used = ? WHERE key = ?", (self._tick(), key))
+                    self._db.commit()
+                    positions, failures = json.loads(row[0])
+                    value = ({name: tuple(position) for name, position in positions.items()}, failures)
+                    self._remember(key, value)
+                    self.stats.disk_hits += 1
+                    return value
+            self.stats.misses += 1
+            return None
+
+    def _store(self, key: str, value: tuple) -> None:
+        with self._lock:
+            self._remember(key, value)
+            if self._db is None:
+                return
+            blob = _dumps(value).encode("utf-8")
+            old = self._db.execute("SELECT size FROM plans WHERE key = ?", (key,)).fetchone()
+            self._db.execute("INSERT OR REPLACE INTO plans (key, value, size, used) VALUES (?, ?, ?, ?)",
+                             (key, blob, len(blob), self._tick()))
+            self._disk_bytes += len(blob) - (old[0] if old else 0)
+            # Вытесняем давно не использованные записи, пока не уложимся в лимит
+            while self._disk_bytes > self.max_bytes:
+                victim = self._db.execute("SELECT key, size FROM plans ORDER BY used LIMIT 1").fetchone()
+                if victim is None or victim[0] == key:
+                    break
+                self._db.execute("DELETE FROM plans WHERE key = ?", (victim[0],))
+                self._disk_bytes -= victim[1]
+                self.stats.evictions += 1
+            self._db.commit()
+
+    def get(self, spec: dict, index: int = 0) -> Optional[PlanResult]:
+        """Результат для спецификации из кэша или None."""
+        key, transform = spec_key(spec, self.normalize)
+        value = self._load(key)
+        if value is None:
+            return None
+        positions, failures = value
+        return PlanResult(index, restore_positions(positions, transform, spec), list(failures))
+
+    def put(self, spec: dict, result: PlanResult) -> None:
+        """Сохраняет результат, полученный для спецификации spec."""
+        key, transform = spec_key(spec, self.normalize)
+        # Результат хранится в каноническом положении
+        positions = to_canonical_positions(result.furniture_positions, transform, spec)
+        self._store(key, (positions, list(result.failures)))
+
+    def plan(self, spec: dict, index: int = 0, scoring: str = "integral") -> PlanResult:
+        """Результат из кэша, а при промахе - планирование и сохранение в кэш."""
+        key, transform = spec_key(spec, self.normalize)
+        value = self._load(key)
+        if value is not None:
+            positions, failures = value
+            return PlanResult(index, restore_positions(positions, transform, spec), list(failures))
+        # Планируем комнату в каноническом положении, чтобы запись подошла всем ее отражениям
+        canonical = plan_result(index, canonical_spec(spec, transform), scoring=scoring)
+        self._store(key, (canonical.furniture_positions, list(canonical.failures)))
+        return canonical._replace(furniture_positions=restore_positions(canonical.furniture_positions, transform, spec))
+
+    def close(self) -> None:
+        """Закрывает файл дискового уровня."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,127 @@
+"""Потоковое планирование комнат из JSON Lines.
+
+Каждая строка входа - спецификация комнаты с полями room_size, doors,
+windows, furniture_list и необязательным cell_size (как в test_cases
+из test.py). На каждую комнату выводится строка JSON по мере готовности:
+
+    {"line": 1, "furniture_positions": {"Шкаф": [0, 0, 6, 3]}, "failures": []}
+
+Некорректные строки дают {"line": N, "error": "..."} и не прерывают обработку.
+Вход читается построчно, а в работе одновременно находится ограниченное
+число комнат, поэтому память не зависит от размера входа:
+
+    python -m app.cli specs.jsonl --workers 8 > results.jsonl
+    cat specs.jsonl | python -m app.cli - --render output/batch
+    python -m app.cli specs.jsonl --archive rooms.rplan  # дописать комнаты в архив app.storage"""
+import argparse
+import json
+import logging
+import sys
+from typing import IO, Iterator, Optional, Union
+
+from app.batch import InvalidSpec, plan_batch, validate_spec
+from app.roomplanner import SCORING_MODES
+from app.stats import PlannerStats
+from app.storage import LayoutWriter
+
+
+def _dumps(record: dict) -> str:
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+
+
+def read_specs(stream: IO[str], lines: dict) -> Iterator[Union[dict, InvalidSpec]]:
+    """Лениво читает спецификации из JSONL.
+
+    Вместо строки, которую не удалось разобрать или проверить, отдается
+    заглушка InvalidSpec с текстом ошибки: она проходит через plan_batch
+    вместе с остальными и выводится на своем месте. Для каждой отданной
+    записи в lines запоминается номер ее строки по порядковому номеру
+    в пакете; записи удаляются по мере вывода результатов."""
+    index = 0
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        lines[index] = line_number
+        index += 1
+        try:
+            spec = json.loads(line)
+            validate_spec(spec)
+        except (ValueError, TypeError) as error:
+            yield InvalidSpec(str(error))
+            continue
+        yield spec
+
+
+def run(stream: IO[str], output: IO[str], workers: Optional[int] = None, chunksize: int = 16,
+        scoring: str = "integral", ordered: bool = False, render_dir: Optional[str] = None,
+        stats: Optional[PlannerStats] = None, archive: Optional[str] = None) -> int:
+    """Планирует все комнаты из stream и пишет результаты в output; возвращает число спланированных комнат.
+
+    Если передан stats, в него складывается статистика планировщика по всем комнатам.
+    Если задан archive, комнаты дописываются в этот архив (app.storage) в порядке вывода."""
+    lines = {}
+    count = 0
+    results = plan_batch(read_specs(stream, lines), workers=workers, chunksize=chunksize,
+                         ordered=ordered, render_dir=render_dir, layouts=archive is not None,
+                         scoring=scoring, collect_stats=stats is not None)
+    writer = LayoutWriter(archive) if archive is not None else None
+    try:
+        for result in results:
+            line = lines.pop(result.index)
+            if result.error is not None:
+                output.write(_dumps({"line": line, "error": result.error}) + "\n")
+                output.flush()
+                continue
+            if stats is not None:
+                stats.merge(PlannerStats.from_dict(result.stats))
+            if writer is not None:
+                writer.write(result.layout)
+            record = {
+                "line": line,
+                "furniture_positions": {name: list(position) for name, position in result.furniture_positions.items()},
+                "failures": result.failures,
+            }
+            output.write(_dumps(record) + "\n")
+            output.flush()
+            count += 1
+    finally:
+        # Закрывает пакет и при досрочном выходе: пул и писатель PNG дописывают очередь
+        results.close()
+        if writer is not None:
+            writer.close()
+    return count
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Планирование комнат из JSON Lines.")
+    parser.add_argument("input", nargs="?", default="-", help="файл JSONL со спецификациями ('-' - stdin)")
+    parser.add_argument("-o", "--output", default="-", help="файл для результатов ('-' - stdout)")
+    parser.add_argument("--workers", type=int, default=None, help="число процессов (1 - без пула)")
+    parser.add_argument("--chunksize", type=int, default=16, help="комнат в одной задаче пула")
+    parser.add_argument("--scoring", choices=SCORING_MODES, default="integral", help="способ подсчета весов")
+    parser.add_argument("--ordered", action="store_true", help="выводить результаты в порядке входа")
+    parser.add_argument("--render", metavar="DIR", help="сохранять PNG комнат в DIR")
+    parser.add_argument("--log-level", default="WARNING", help="уровень сообщений планировщика в stderr")
+    parser.add_argument("--stats", action="store_true", help="вывести в stderr суммарную статистику планировщика")
+    parser.add_argument("--archive", metavar="FILE", help="дописывать комнаты в двоичный архив FILE (app.storage)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format="%(levelname)s %(name)s: %(message)s")
+
+    stream = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    stats = PlannerStats() if args.stats else None
+    try:
+        run(stream, output, workers=args.workers, chunksize=args.chunksize,
+            scoring=args.scoring, ordered=args.ordered, render_dir=args.render, stats=stats,
+            archive=args.archive)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        if output is not sys.stdout:
+            output.close()
+    if stats is not None:
+        sys.stderr.write(json.dumps(stats.as_dict(), ensure_ascii=False, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Поле влияния препятствий на веса клеток.
+
+Каждое препятствие (дверь, окно или препятствие другого вида) уменьшает
+вес клеток в радиусе своего влияния на kernel(d), где d - расстояние от
+клетки до прямоугольника препятствия. Вид препятствия задает ядро
+и радиус (ObstacleKind); радиус None означает радиус из calculate_weights.
+
+Расстояния по осям считаются сразу для всех препятствий одного вида
+(массивы число препятствий x ширина и число препятствий x высота),
+а квадрат расстояния в области препятствия - внешней суммой этих
+строк в заранее выделенный буфер. Влияния вычитаются по препятствиям
+в порядке списка, как в прежнем цикле, поэтому веса совпадают с ним
+до бита."""
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+
+Rect = Tuple[int, int, int, int]
+# Шаг квантования весов: суммы кратных 2**-20 величин вычисляются в float64
+# без погрешности, поэтому результат не зависит от порядка суммирования.
+# По умолчанию веса не квантуются (расстановка совпадает с перебором срезов
+# до бита); квантование включается параметром quantize у RoomPlanner и
+# обязательно в экономном режиме (lean). Оценки, которые до квантования
+# различались на погрешность округления (порядка 1e-15), при нем становятся
+# равными, и выбирается первое положение по строкам
+WEIGHT_QUANTUM = 2.0 ** -20
+
+
+def inverse_distance(distances: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """Ядро дверей и окон: 1 / (1 + d)."""
+    np.add(distances, 1.0, out=out)
+    return np.divide(1.0, out, out=out)
+
+
+class ObstacleKind(NamedTuple):
+    """Вид препятствия.
+
+    kernel(distances, out) возвращает влияние на клетки на расстояниях
+    distances; out - буфер той же формы, в который можно записать результат."""
+    radius: Optional[int] = None  # Радиус влияния в клетках; None - радиус из calculate_weights
+    kernel: Callable[[np.ndarray, np.ndarray], np.ndarray] = inverse_distance
+
+
+DEFAULT_KINDS: Dict[str, ObstacleKind] = {"door": ObstacleKind(), "window": ObstacleKind()}
+
+
+def _axis_distances(start: np.ndarray, size: np.ndarray, coords: np.ndarray) -> np.ndarray:
+    """Расстояния по оси от координат coords до отрезков [start, start + size] всех препятствий."""
+    start, end = start[:, None], (start + size)[:, None]
+    return np.maximum(0, np.maximum(start - coords, coords - end))
+
+
+class FieldEngine:
+    """Расчет весов области по списку препятствий с переиспользуемыми буферами."""
+
+    def __init__(self) -> None:
+        self._squared = np.empty(0, dtype=np.int64)
+        self._values = np.empty(0)
+        self._mask = np.empty(0, dtype=bool)
+
+    def _buffers(self, rows: int, cols: int):
+        """Буферы формы rows x cols; растут по мере надобности и не освобождаются."""
+        size = rows * cols
+        if self._squared.size < size:
+            self._squared = np.empty(size, dtype=np.int64)
+            self._values = np.empty(size)
+            self._mask = np.empty(size, dtype=bool)
+        shape = (rows, cols)
+        return self._squared[:size].reshape(shape), self._values[:size].reshape(shape), self._mask[:size].reshape(shape)
+
+    def weights(self, obstacles: Sequence[Tuple[Rect, ObstacleKind]], default_radius: int,
+                y_start: int, y_end: int, x_start: int, x_end: int) -> np.ndarray:
+        """1 минус сумма влияний всех препятствий на клетки области (без ограничения снизу)."""
+        weights = np.ones((y_end - y_start, x_end - x_start))
+        if not obstacles:
+            return weights
+        cols = np.arange(x_start, x_end)
+        rows = np.arange(y_start, y_end)
+        # Расстояния по осям - одним проходом для всех препятствий одного вида
+        groups: Dict[ObstacleKind, List[int]] = {}
+        for index, (_, kind) in enumerate(obstacles):
+            groups.setdefault(kind, []).append(index)
+        dist_x: List[Optional[np.ndarray]] = [None] * len(obstacles)
+        dist_y: List[Optional[np.ndarray]] = [None] * len(obstacles)
+        for indices in groups.values():
+            rects = np.array([obstacles[index][0] for index in indices], dtype=np.int64).reshape(-1, 4)
+            group_x = _axis_distances(rects[:, 0], rects[:, 2], cols)
+            group_y = _axis_distances(rects[:, 1], rects[:, 3], rows)
+            for position, index in enumerate(indices):
+                dist_x[index], dist_y[index] = group_x[position], group_y[position]
+
+        for index, ((obj_x, obj_y, obj_w, obj_h), kind) in enumerate(obstacles):
+            radius = default_radius if kind.radius is None else kind.radius
+            # Область влияния препятствия в пределах области расчета
+            area_x_start = max(x_start, obj_x - radius)
+            area_x_end = min(x_end, obj_x + obj_w + radius)
+            area_y_start = max(y_start, obj_y - radius)
+            area_y_end = min(y_end, obj_y + obj_h + radius)
+            if area_x_start >= area_x_end or area_y_start >= area_y_end:
+                continue
+            local_x = slice(area_x_start - x_start, area_x_end - x_start)
+            local_y = slice(area_y_start - y_start, area_y_end - y_start)
+            squared, values, mask = self._buffers(area_y_end - area_y_start, area_x_end - area_x_start)
+            dx, dy = dist_x[index][local_x], dist_y[index][local_y]
+            np.add((dy ** 2)[:, None], (dx ** 2)[None, :], out=squared)
+            np.less_equal(squared, radius ** 2, out=mask)
+            np.sqrt(squared, out=values)
+            influence = kind.kernel(values, values)
+            np.subtract(weights[local_y, local_x], influence, out=weights[local_y, local_x], where=mask)
+        return weights
+
+
+def quantize_weights(weights: np.ndarray) -> np.ndarray:
+    """Веса, округленные до ближайшего кратного WEIGHT_QUANTUM."""
+    return np.round(weights / WEIGHT_QUANTUM) * WEIGHT_QUANTUM
+
+
+def static_weights(engine: FieldEngine, obstacles: Sequence[Tuple[Rect, ObstacleKind]], default_radius: int,
+                   y_start: int, y_end: int, x_start: int, x_end: int, quantize: bool = False) -> np.ndarray:
+    """Статические веса области: веса поля, ограниченные снизу нулем
+    (и при quantize=True квантованные с шагом WEIGHT_QUANTUM)."""
+    weights = engine.weights(obstacles, default_radius, y_start, y_end, x_start, x_end)
+    weights = np.maximum(0, weights) # Гарантируем, что веса не будут отрицательными
+    return quantize_weights(weights) if quantize else weights
@@ -0,0 +1,209 @@
+from typing import Optional, Tuple
+import numpy as np
+
+from app.field import WEIGHT_QUANTUM, quantize_weights
+
+
+def rest_tolerance(height: int, width: int) -> float:
+    """Наибольшая погрешность суммы остатков весов прямоугольника в таблице
+    сетки height x width (остатки не больше WEIGHT_QUANTUM / 2)."""
+    return 2 * (height + width + 2) * np.finfo(np.float64).eps * height * width * WEIGHT_QUANTUM
+
+
+class _Table:
+    """Префиксные суммы одной составляющей сетки."""
+
+    def __init__(self, values: np.ndarray, lean: bool, dtype=np.float64) -> None:
+        # Накопленные суммы по столбцам нужны для инкрементального пересчета
+        self._columns = None if lean else np.empty(values.shape, dtype=dtype)
+        self.table = np.zeros((values.shape[0] + 1, values.shape[1] + 1), dtype=dtype)
+        self.rebuild(values)
+
+    def copy(self) -> "_Table":
+        table = _Table.__new__(_Table)
+        table._columns = self._columns.copy() if self._columns is not None else None
+        table.table = self.table.copy()
+        return table
+
+    @property
+    def nbytes(self) -> int:
+        return self.table.nbytes + (self._columns.nbytes if self._columns is not None else 0)
+
+    def rebuild(self, values: np.ndarray) -> None:
+        dtype = self.table.dtype
+        if self._columns is None:
+            np.cumsum(values, axis=0, dtype=dtype, out=self.table[1:, 1:])
+            np.cumsum(self.table[1:, 1:], axis=1, out=self.table[1:, 1:])
+            return
+        np.cumsum(values, axis=0, dtype=dtype, out=self._columns)
+        np.cumsum(self._columns, axis=1, out=self.table[1:, 1:])
+
+    def update(self, columns: np.ndarray, y_start: int, x_start: int, x_end: int) -> None:
+        """columns - новые значения составляющей в строках от y_start и столбцах x_start:x_end
+        (массив используется как буфер и меняется)."""
+        if self._columns is None:
+            # Суммы по столбцам - разности соседних элементов таблицы
+            rows = np.diff(self.table[y_start + 1:, x_start:], axis=1)
+            columns[0] += self.table[y_start, x_start + 1:x_end + 1] - self.table[y_start, x_start:x_end]
+            np.cumsum(columns, axis=0, out=rows[:, :x_end - x_start])
+        else:
+            # Суммы по столбцам меняются только в столбцах измененной области
+            if y_start > 0:
+                columns[0] += self._columns[y_start - 1, x_start:x_end]
+            np.cumsum(columns, axis=0, out=self._columns[y_start:, x_start:x_end])
+            rows = self._columns[y_start:, x_start:].copy()
+        # Суммы по строкам меняются во всех столбцах правее x_start
+        rows[:, 0] += self.table[y_start + 1:, x_start]
+        np.cumsum(rows, axis=1, out=self.table[y_start + 1:, x_start + 1:])
+
+    def rects(self, y_start, y_end, x_start, x_end):
+        """Суммы прямоугольников [y_start, y_end) x [x_start, x_end) (числа или массивы)."""
+        table = self.table
+        return table[y_end, x_end] - table[y_start, x_end] - table[y_end, x_start] + table[y_start, x_start]
+
+    def windows(self, width: int, height: int, y_start: int, y_end: int, x_start: int, x_end: int) -> np.ndarray:
+        """Суммы прямоугольников width x height с углами в [y_start, y_end) x [x_start, x_end)."""
+        table = self.table
+        return (table[y_start + height:y_end + height, x_start + width:x_end + width]
+                - table[y_start:y_end, x_start + width:x_end + width]
+                - table[y_start + height:y_end + height, x_start:x_end]
+                + table[y_start:y_end, x_start:x_end])
+
+
+class IntegralGrid:
+    """Таблица префиксных сумм (summed-area table) для сетки весов.
+
+    Позволяет получить сумму весов любого прямоугольника за O(1)
+    вместо суммирования среза сетки.
+
+    Вес клетки делится на точную часть, кратную field.WEIGHT_QUANTUM, и
+    остаток. Суммы точных частей вычисляются без погрешности, поэтому сумма
+    прямоугольника без остатков совпадает с суммой среза сетки до бита
+    (is_exact, exact_windows). Остатки суммируются отдельной таблицей,
+    и сумма прямоугольника с остатками отличается от суммы среза не больше
+    чем на погрешность суммирования; таблицы остатков и числа клеток с
+    остатком заводятся, только когда такие клетки появляются в сетке."""
+
+    def __init__(self, grid: np.ndarray, lean: bool = False) -> None:
+        """lean=True не хранит накопленные суммы по столбцам таблицы точных
+        частей, а восстанавливает их из самой таблицы разностью соседних
+        элементов. Это вдвое уменьшает память; результат update совпадает
+        с полным пересчетом, потому что частичные суммы точных частей
+        представимы в float64 без округления."""
+        self.height, self.width = grid.shape
+        self._lean = lean
+        self._exact: Optional[_Table] = None
+        self._rest: Optional[_Table] = None
+        self._inexact: Optional[_Table] = None
+        self.rebuild(grid)
+
+    def copy(self) -> "IntegralGrid":
+        """Независимая копия таблицы."""
+        integral = IntegralGrid.__new__(IntegralGrid)
+        integral.height, integral.width, integral._lean = self.height, self.width, self._lean
+        integral._exact = self._exact.copy()
+        integral._rest = self._rest.copy() if self._rest is not None else None
+        integral._inexact = self._inexact.copy() if self._inexact is not None else None
+        return integral
+
+    @property
+    def table(self) -> np.ndarray:
+        """Таблица префиксных сумм точных частей весов."""
+        return self._exact.table
+
+    def rebuild(self, grid: np.ndarray) -> None:
+        """Полностью пересчитывает таблицу по сетке."""
+        values = grid.astype(np.float64)
+        exact = quantize_weights(values)
+        if self._exact is None:
+            self._exact = _Table(exact, self._lean)
+        else:
+            self._exact.rebuild(exact)
+        inexact = values != exact
+        if inexact.any():
+            self._rest = _Table(values - exact, False)
+            # Числа клеток целые, поэтому обновление без сумм по столбцам точное
+            self._inexact = _Table(inexact, True, np.int32)
+        else:
+            self._rest = self._inexact = None
+
+    def update(self, grid: np.ndarray, y_start: int, y_end: int, x_start: int, x_end: int) -> None:
+        """Пересчитывает таблицу после изменения области grid[y_start:y_end, x_start:x_end].
+
+        Затрагиваются только строки ниже y_start и столбцы правее x_start,
+        результат побитово совпадает с полным пересчетом."""
+        if y_start >= y_end or x_start >= x_end:
+            return
+        values = grid[y_start:, x_start:x_end].astype(np.float64)
+        exact = quantize_weights(values)
+        inexact = values != exact
+        if self._rest is None and inexact.any():
+            self.rebuild(grid)
+            return
+        if self._rest is not None:
+            self._rest.update(values - exact, y_start, x_start, x_end)
+            self._inexact.update(inexact.astype(np.int32), y_start, x_start, x_end)
+        self._exact.update(exact, y_start, x_start, x_end)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(table.nbytes for table in (self._exact, self._rest, self._inexact) if table is not None)
+
+    @staticmethod
+    def _combine(sums, rest, exact):
+        """Суммы точных частей и остатков; остатки учитываются только там, где они есть."""
+        return sums + np.where(exact, 0.0, rest)
+
+    def rect_sum(self, x: int, y: int, width: int, height: int) -> float:
+        """Сумма весов прямоугольника с левым верхним углом (x, y)."""
+        bounds = (y, y + height, x, x + width)
+        exact = self._exact.rects(*bounds)
+        if self._rest is None or self._inexact.rects(*bounds) == 0:
+            return exact
+        return exact + self._rest.rects(*bounds)
+
+    def is_exact(self, x: int, y: int, width: int, height: int) -> bool:
+        """True, если rect_sum(x, y, width, height) совпадает с суммой среза сетки."""
+        return self._rest is None or self._inexact.rects(y, y + height, x, x + width) == 0
+
+    def rect_sums(self, y_start, y_end, x_start, x_end) -> np.ndarray:
+        """Суммы весов прямоугольников [y_start, y_end) x [x_start, x_end) (массивы индексов)."""
+        bounds = (y_start, y_end, x_start, x_end)
+        if self._rest is None:
+            return self._exact.rects(*bounds)
+        return self._combine(self._exact.rects(*bounds), self._rest.rects(*bounds), self._inexact.rects(*bounds) == 0)
+
+    def rects_exact(self, y_start, y_end, x_start, x_end) -> np.ndarray:
+        """Маска прямоугольников rect_sums без остатков весов."""
+        if self._rest is None:
+            return np.ones(np.broadcast(y_start, y_end, x_start, x_end).shape, dtype=bool)
+        return self._inexact.rects(y_start, y_end, x_start, x_end) == 0
+
+    def window_sums(self, width: int, height: int) -> np.ndarray:
+        """Суммы весов для всех положений прямоугольника width x height.
+
+        Элемент [y, x] результата совпадает с rect_sum(x, y, width, height)."""
+        return self.window_sums_exact(width, height)[0]
+
+    def exact_windows(self, width: int, height: int) -> np.ndarray:
+        """Маска положений window_sums, суммы которых совпадают с суммами срезов."""
+        return self.window_sums_exact(width, height)[1]
+
+    def window_sums_exact(self, width: int, height: int) -> Tuple[np.ndarray, np.ndarray]:
+        """window_sums и exact_windows за один проход."""
+        return self.region_sums_exact(width, height, 0, max(0, self.height - height + 1),
+                                      0, max(0, self.width - width + 1))
+
+    def region_sums(self, width: int, height: int, y_start: int, y_end: int, x_start: int, x_end: int) -> np.ndarray:
+        """Часть window_sums(width, height)[y_start:y_end, x_start:x_end] без расчета остальных позиций."""
+        return self.region_sums_exact(width, height, y_start, y_end, x_start, x_end)[0]
+
+    def region_sums_exact(self, width: int, height: int, y_start: int, y_end: int,
+                          x_start: int, x_end: int) -> Tuple[np.ndarray, np.ndarray]:
+        """region_sums и соответствующая часть exact_windows."""
+        bounds = (width, height, y_start, y_end, x_start, x_end)
+        sums = self._exact.windows(*bounds)
+        if self._rest is None:
+            return sums, np.ones(sums.shape, dtype=bool)
+        exact = self._inexact.windows(*bounds) == 0
+        return self._combine(sums, self._rest.windows(*bounds), exact), exact
@@ -0,0 +1,49 @@
+import numpy as np
+
+
+class PackedMask:
+    """Булева маска, упакованная по восемь клеток в байт (np.packbits по строкам).
+
+    Занимает в восемь раз меньше памяти, чем массив bool. Поддерживает
+    чтение и запись прямоугольных областей, заданных парой срезов:
+    mask[y_start:y_end, x_start:x_end]. Распаковываются только байты,
+    покрывающие столбцы области."""
+    __slots__ = ("shape", "bits")
+
+    def __init__(self, shape) -> None:
+        height, width = shape
+        self.shape = (height, width)
+        self.bits = np.zeros((height, (width + 7) // 8), dtype=np.uint8)
+
+    def copy(self) -> "PackedMask":
+        mask = PackedMask.__new__(PackedMask)
+        mask.shape = self.shape
+        mask.bits = self.bits.copy()
+        return mask
+
+    def _columns(self, cols: slice):
+        """Байты, покрывающие столбцы cols, и положение столбцов внутри распакованных байтов."""
+        x_start, x_end, _ = cols.indices(self.shape[1])
+        x_end = max(x_start, x_end)
+        byte_start = x_start // 8
+        return slice(byte_start, (x_end + 7) // 8), slice(x_start - 8 * byte_start, x_end - 8 * byte_start)
+
+    def __getitem__(self, region) -> np.ndarray:
+        rows, cols = region
+        byte_cols, local = self._columns(cols)
+        return np.unpackbits(self.bits[rows, byte_cols], axis=1)[:, local].view(bool)
+
+    def __setitem__(self, region, value) -> None:
+        rows, cols = region
+        byte_cols, local = self._columns(cols)
+        block = np.unpackbits(self.bits[rows, byte_cols], axis=1)
+        block[:, local] = value
+        self.bits[rows, byte_cols] = np.packbits(block, axis=1)
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        mask = self[:, :]
+        return mask if dtype is None else mask.astype(dtype)
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes
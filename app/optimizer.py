@@ -0,0 +1,199 @@
+"""Подбор расстановки: порядок предметов и повороты на 90°.
+
+Жадная расстановка ставит предметы в порядке списка и не поворачивает их,
+поэтому ранние предметы могут занять место, нужное поздним. optimize
+перебирает порядки и повороты лучевым поиском (beam search): каждая из
+beam_width лучших частичных расстановок продолжается каждым еще не
+поставленным предметом в обоих поворотах, и из всех продолжений снова
+остаются beam_width лучших. Предметы "near" и "around" ставятся только
+после своей целевой мебели.
+
+Расстановки сравниваются по layout_score: сначала число неудач, затем
+суммарный вес клеток под мебелью (чем больше, тем лучше). Жадная
+расстановка в исходном порядке тоже оценивается, поэтому результат
+не хуже нее.
+
+Продолжения оцениваются в пуле процессов: каждый процесс один раз строит
+планировщик с рассчитанными весами и ответвляет от него частичные
+расстановки (RoomPlanner.fork), а каждое продолжение ставит и отменяет
+через snapshot/restore - без копирования сеток и пересчета весов.
+При фиксированном seed результат детерминирован и не зависит от числа
+процессов. Если time_budget исчерпан,
+поиск останавливается, лучшая частичная расстановка достраивается жадно,
+и результат зависит от скорости машины.
+
+    result = optimize(spec, beam_width=4, workers=4, seed=0, time_budget=10)
+    visualize(result.planner)"""
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.batch import DEFAULT_CELL_SIZE, place_item
+from app.roomplanner import RoomPlanner
+
+Action = Tuple[int, bool]  # Номер предмета в furniture_list и признак поворота на 90°
+Score = Tuple[int, float]  # Число неудач и суммарный вес со знаком минус: меньше - лучше
+
+_template: Optional[RoomPlanner] = None  # Планировщик с весами в процессе пула
+
+
+class OptimizationResult(NamedTuple):
+    """Лучшая найденная расстановка."""
+    planner: RoomPlanner
+    order: List[Tuple[str, bool]]  # Имена предметов в порядке расстановки и признак поворота
+    score: Score
+
+
+def layout_score(planner: RoomPlanner) -> Score:
+    """Оценка расстановки: число неудач и суммарный статический вес клеток под мебелью со знаком минус."""
+    weight = 0.0
+    for x, y, width, height in planner.furniture_positions.values():
+        weight += float(planner.base_weights[y:y + height, x:x + width].sum(dtype=np.float64))
+    return len(planner.failures), -weight
+
+
+def _base_planner(spec: dict, planner_options: dict) -> RoomPlanner:
+    planner = RoomPlanner(tuple(spec["room_size"]), spec.get("cell_size", DEFAULT_CELL_SIZE),
+                          spec["doors"], spec["windows"], **planner_options)
+    planner.calculate_weights()
+    return planner
+
+
+def _init_worker(spec: dict, planner_options: dict) -> None:
+    global _template
+    _template = _base_planner(spec, planner_options)
+
+
+def _replay(template: RoomPlanner, furniture_list: Sequence[tuple], actions: Sequence[Action]) -> RoomPlanner:
+    """Ветка планировщика с предметами, поставленными действиями actions."""
+    planner = template.fork()
+    for index, rotated in actions:
+        place_item(planner, furniture_list[index], rotated)
+    return planner
+
+
+def _layout_key(actions: Sequence[Action], planner: RoomPlanner) -> tuple:
+    """Состояние частичной расстановки: разные порядки могут привести к одному и тому же."""
+    return (tuple(sorted(index for index, _ in actions)),
+            tuple(sorted((name, tuple(position)) for name, position in planner.furniture_positions.items())),
+            tuple(sorted(planner.failures)))
+
+
+def _expand(template: RoomPlanner, furniture_list: Sequence[tuple], actions: Tuple[Action, ...],
+            children: List[Action]) -> List[Tuple[Action, Score, tuple]]:
+    """Оценивает продолжения частичной расстановки actions каждым действием из children."""
+    planner = _replay(template, furniture_list, actions)
+    parent = planner.snapshot()
+    results = []
+    for action in children:
+        place_item(planner, furniture_list[action[0]], action[1])
+        results.append((action, layout_score(planner), _layout_key(actions + (action,), planner)))
+        planner.restore(parent)
+    return results
+
+
+def _expand_in_worker(furniture_list, actions, children):
+    return _expand(_template, furniture_list, actions, children)
+
+
+def _available(furniture_list: Sequence[tuple], done: set) -> List[int]:
+    """Номера еще не поставленных предметов, целевая мебель которых уже обработана."""
+    indices = {item[0]: index for index, item in enumerate(furniture_list)}
+    available = []
+    for index, (name, _, _, placement, *extra) in enumerate(furniture_list):
+        if index in done:
+            continue
+        if placement in ("near", "around") and extra and indices.get(extra[0], index) not in done | {index}:
+            continue
+        available.append(index)
+    return available
+
+
+def _children(furniture_list: Sequence[tuple], actions: Tuple[Action, ...], seed: int,
+              max_children: Optional[int]) -> List[Action]:
+    """Допустимые продолжения расстановки; не больше max_children, выбранных случайно по seed."""
+    children = []
+    for index in _available(furniture_list, {index for index, _ in actions}):
+        _, width, height = furniture_list[index][:3]
+        children.append((index, False))
+        if width != height:
+            children.append((index, True))
+    if max_children is not None and len(children) > max_children:
+        # Строковое зерно хэшируется детерминированно, независимо от PYTHONHASHSEED
+        rng = random.Random(f"{seed}:{actions}")
+        children = sorted(rng.sample(children, max_children))
+    return children
+
+
+def _complete(furniture_list: Sequence[tuple], actions: Tuple[Action, ...]) -> Tuple[Action, ...]:
+    """Достраивает расстановку жадно: оставшиеся предметы в исходном порядке без поворота."""
+    actions = tuple(actions)
+    while True:
+        available = _available(furniture_list, {index for index, _ in actions})
+        if not available:
+            return actions
+        actions += ((available[0], False),)
+
+
+def optimize(spec: dict, beam_width: int = 4, workers: Optional[int] = None, seed: int = 0,
+             time_budget: Optional[float] = None, max_children: Optional[int] = None,
+             **planner_options) -> OptimizationResult:
+    """Ищет порядок и повороты предметов спецификации spec (формат test_cases из test.py).
+
+    beam_width - число частичных расстановок, сохраняемых на каждом шаге;
+    max_children ограничивает число продолжений каждой из них (выбираются
+    случайно по seed); time_budget - ограничение времени поиска в секундах.
+    workers=1 считает в текущем процессе без пула. planner_options
+    передаются в RoomPlanner."""
+    if beam_width < 1:
+        raise ValueError("beam_width должен быть положительным")
+    furniture_list = [tuple(item) for item in spec["furniture_list"]]
+    deadline = None if time_budget is None else time.monotonic() + time_budget
+    template = _base_planner(spec, planner_options)
+    executor = None
+    if workers != 1:
+        executor = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                                       initializer=_init_worker, initargs=(spec, planner_options))
+    beam: List[Tuple[Action, ...]] = [()]
+    try:
+        for _ in range(len(furniture_list)):
+            if deadline is not None and time.monotonic() > deadline:
+                break
+            tasks = [(actions, _children(furniture_list, actions, seed, max_children)) for actions in beam]
+            if executor is None:
+                expanded = [_expand(template, furniture_list, actions, children) for actions, children in tasks]
+            else:
+                futures = [executor.submit(_expand_in_worker, furniture_list, actions, children)
+                           for actions, children in tasks]
+                expanded = [future.result() for future in futures]
+            candidates = []
+            for (actions, _), results in zip(tasks, expanded):
+                candidates += [(score, actions + (action,), key) for action, score, key in results]
+            if not candidates:
+                break
+            # Оценка, затем сами действия: порядок не зависит от того, какой процесс закончил первым
+            candidates.sort(key=lambda candidate: candidate[:2])
+            beam, seen = [], set()
+            for _, actions, key in candidates:
+                if key not in seen:
+                    seen.add(key)
+                    beam.append(actions)
+                if len(beam) == beam_width:
+                    break
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    greedy = tuple((index, False) for index in range(len(furniture_list)))
+    best_actions, best_score, best_planner = None, None, None
+    for actions in (greedy, _complete(furniture_list, beam[0])):
+        planner = _replay(template, furniture_list, actions)
+        score = layout_score(planner)
+        if best_score is None or score < best_score:
+            best_actions, best_score, best_planner = actions, score, planner
+    order = [(furniture_list[index][0], rotated) for index, rotated in best_actions]
+    return OptimizationResult(best_planner, order, best_score)
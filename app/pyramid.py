@@ -0,0 +1,212 @@
+"""Поиск позиции мебели от грубого уровня к точному (scoring="pyramid").
+
+Позиции мебели делятся на блоки factor x factor. Для каждого блока по
+уменьшенным сеткам (таблица сумм в углах блоков, занятость, сжатая
+в factor раз) считается верхняя граница оценки всех его позиций.
+Точные оценки считаются только в блоках с наибольшими границами.
+
+Границы вычисляются теми же операциями с плавающей точкой, что и сами
+оценки, а суммы точных частей весов (IntegralGrid) не имеют погрешности,
+поэтому граница блока никогда не меньше оценки перебора его позиций;
+блокам с остатками весов добавляется запас на погрешность суммирования.
+Почти равные оценки уточняются перебором срезов (scoring.settle), поэтому
+в точном режиме результат совпадает с полным перебором, включая выбор
+первой позиции в порядке строк при равных оценках."""
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+
+from app import scoring
+from app.integral import IntegralGrid
+
+# Если уточнять приходится больше этой доли блоков, полный перебор выгоднее
+FALLBACK_SHARE = 0.5
+
+
+class Blocks:
+    """Разбиение позиций rows x cols на блоки factor x factor (крайние блоки могут быть меньше)."""
+
+    def __init__(self, rows: int, cols: int, factor: int) -> None:
+        self.rows, self.cols, self.factor = rows, cols, factor
+        # Первая и последняя позиция каждого блока по осям
+        self.x_first = np.arange(0, cols, factor)
+        self.y_first = np.arange(0, rows, factor)
+        self.x_last = np.minimum(self.x_first + factor, cols) - 1
+        self.y_last = np.minimum(self.y_first + factor, rows) - 1
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.y_first), len(self.x_first)
+
+    def bounds(self, index: int) -> Tuple[int, int, int, int]:
+        """Позиции блока с номером index (в порядке строк): y_start, y_end, x_start, x_end."""
+        block_y, block_x = divmod(index, len(self.x_first))
+        return (int(self.y_first[block_y]), int(self.y_last[block_y]) + 1,
+                int(self.x_first[block_x]), int(self.x_last[block_x]) + 1)
+
+
+def area_bounds(integral: IntegralGrid, blocks: Blocks, width: int, height: int, max_weight: float,
+                slack: float = 0.0) -> np.ndarray:
+    """Верхняя граница суммы весов под мебелью для позиций каждого блока.
+
+    Все положения мебели в блоке накрывают общее ядро и лежат внутри
+    объединения; сумма вне ядра не больше суммы остальной части объединения
+    и не больше числа клеток вне ядра, умноженного на max_weight. Веса
+    неотрицательны; если в объединении нет остатков весов, все суммы точные,
+    иначе к границе прибавляется slack."""
+    x_first, y_first = blocks.x_first[None, :], blocks.y_first[:, None]
+    x_last, y_last = blocks.x_last[None, :], blocks.y_last[:, None]
+    union_bounds = (y_first, y_last + height, x_first, x_last + width)
+    union = integral.rect_sums(*union_bounds)
+    core_x_end = np.maximum(x_first + width, x_last)
+    core_y_end = np.maximum(y_first + height, y_last)
+    core = integral.rect_sums(y_last, core_y_end, x_last, core_x_end)
+    core_area = (core_x_end - x_last) * (core_y_end - y_last)
+    bounds = core + np.minimum(union - core, (width * height - core_area) * max_weight)
+    return bounds + np.where(integral.rects_exact(*union_bounds), 0.0, slack)
+
+
+def wall_bonus_bounds(blocks: Blocks, grid_width: int, grid_height: int, width: int, height: int) -> np.ndarray:
+    """Наибольший бонус за близость к стене 5 / (1 + d) среди позиций каждого блока."""
+    dist_x = np.minimum(blocks.x_first[None, :], grid_width - (blocks.x_last[None, :] + width))
+    dist_y = np.minimum(blocks.y_first[:, None], grid_height - (blocks.y_last[:, None] + height))
+    return 5.0 / (1 + np.minimum(dist_x, dist_y))
+
+
+def window_bonus_bounds(windows: List[Tuple[int, int, int, int]], blocks: Blocks, bounds: np.ndarray) -> None:
+    """Добавляет к границам наибольший бонус за близость к окнам среди позиций каждого блока."""
+    for window_x, window_y, window_w, window_h in windows:
+        # Ближайшая к окну позиция блока
+        dist_x = np.maximum(0, np.maximum(window_x - blocks.x_last[None, :], blocks.x_first[None, :] - (window_x + window_w)))
+        dist_y = np.maximum(0, np.maximum(window_y - blocks.y_last[:, None], blocks.y_first[:, None] - (window_y + window_h)))
+        distance = np.sqrt(dist_x**2 + dist_y**2)
+        bounds += np.where(distance <= 5, 20.0 / (1 + distance), 0.0)
+
+
+def downsample_any(mask: np.ndarray, factor: int) -> np.ndarray:
+    """Сжимает булеву маску в factor раз: клетка грубой сетки истинна, если истинна хотя бы одна исходная."""
+    height, width = mask.shape
+    coarse_height, coarse_width = -(-height // factor), -(-width // factor)
+    padded = np.zeros((coarse_height * factor, coarse_width * factor), dtype=bool)
+    padded[:height, :width] = mask
+    return padded.reshape(coarse_height, factor, coarse_width, factor).any(axis=(1, 3))
+
+
+def distance_bounds(occupied: np.ndarray, blocks: Blocks, width: int, height: int) -> np.ndarray:
+    """Верхняя граница scoring.occupied_distance для позиций каждого блока.
+
+    Считается по занятости, сжатой в factor раз: в занятой грубой клетке есть
+    занятая клетка, и расстояние до нее не больше наибольшего расстояния между
+    центрами мебели в блоке и клетками грубой клетки. В удвоенных координатах
+    это (2(factor - 1) + |2 factor t + size|) по каждой оси, где t - сдвиг
+    грубой клетки относительно блока. Минимум по занятым грубым клеткам ищется
+    в два прохода, как в occupied_distance."""
+    factor = blocks.factor
+    coarse = downsample_any(occupied, factor)
+    coarse_height, coarse_width = coarse.shape
+    block_rows, block_cols = blocks.shape
+    slack = 2 * (factor - 1)
+    # Заглушка для столбцов без занятых клеток: далеко за пределами грубой сетки
+    far = 4 * (coarse_height + coarse_width + 2)
+    row_index = np.arange(coarse_height)[:, None]
+    prev_occupied = np.maximum.accumulate(np.where(coarse, row_index, -far), axis=0)
+    next_occupied = np.minimum.accumulate(np.where(coarse, row_index, far)[::-1], axis=0)[::-1]
+    # Проход по столбцам: стоимость выпукла по строке грубой клетки, поэтому
+    # ближайшие занятые строки по обе стороны от ее минимума дают минимум
+    block_y = np.arange(block_rows)
+    lower = np.minimum(block_y + height // (2 * factor), coarse_height - 1)
+    upper = block_y + -(-height // (2 * factor))
+    candidates = [prev_occupied[lower]]
+    in_grid = upper < coarse_height
+    upper_rows = np.full((block_rows, coarse_width), far)
+    upper_rows[in_grid] = next_occupied[upper[in_grid]]
+    candidates.append(upper_rows)
+    vertical = np.minimum(*(slack + np.abs(2 * factor * (block_y[:, None] - rows) + height) for rows in candidates))
+    vertical = vertical.astype(np.int64) ** 2
+    # Проход по строкам: сдвиг t = блок - грубый столбец
+    best = np.full((block_rows, block_cols), np.iinfo(np.int64).max // 4, dtype=np.int64)
+    shifts = sorted(range(-(coarse_width - 1), block_cols), key=lambda t: abs(2 * factor * t + width))
+    for t in shifts:
+        horizontal = (slack + abs(2 * factor * t + width)) ** 2
+        if horizontal >= best.max():
+            break
+        block_start = max(0, t)
+        block_end = min(block_cols, coarse_width + t)
+        if block_start >= block_end:
+            continue
+        np.minimum(best[:, block_start:block_end], vertical[:, block_start - t:block_end - t] + horizontal,
+                   out=best[:, block_start:block_end])
+    return np.sqrt(best) / 2
+
+
+def search(bounds: np.ndarray, blocks: Blocks,
+           score_block: Callable[[int, int, int, int], Tuple[np.ndarray, np.ndarray]],
+           top_k: int, exact: bool, full_search: Optional[Callable[[], Optional[Tuple[int, int]]]],
+           tolerance: float = 0.0,
+           rescore: Optional[Callable[[int, int], Optional[float]]] = None) -> Tuple[Optional[Tuple[int, int]], int]:
+    """Ищет позицию с наибольшей оценкой; возвращает ее и число точно оцененных позиций.
+
+    score_block возвращает оценки позиций блока и маску оценок, совпадающих
+    с перебором срезов; остальные отличаются от него не больше чем на
+    tolerance и при почти равной лучшей оценке пересчитываются rescore
+    (scoring.settle). Границы bounds не меньше оценок перебора.
+
+    Сначала точно оцениваются top_k блоков с наибольшими границами. В точном
+    режиме затем уточняются все блоки, граница которых больше лучшей оценки
+    (или равна ей, если блок начинается раньше лучшей позиции в порядке строк),
+    пока такие остаются. Если уточнять пришлось бы больше FALLBACK_SHARE блоков,
+    выполняется full_search; если full_search равен None, блоки уточняются
+    до конца (так ищет ленивая сетка, для которой полный перебор по всей
+    сетке недоступен)."""
+    flat = bounds.ravel()
+    order = np.argsort(-flat, kind="stable")
+    refined = np.zeros(flat.size, dtype=bool)
+    block_y, block_x = np.divmod(np.arange(flat.size), blocks.shape[1])
+    first_y, first_x = blocks.y_first[block_y], blocks.x_first[block_x]
+    # Нижняя граница лучшей оценки перебора и первая позиция, где она достигается
+    best_score = -np.inf
+    best_position = None
+    # Позиции, оценки которых не меньше best_score с учетом погрешности
+    kept: List[Tuple[np.ndarray, ...]] = []
+    evaluated = 0
+
+    def refine(indices) -> None:
+        nonlocal best_score, best_position, evaluated
+        for index in indices:
+            refined[index] = True
+            y_start, y_end, x_start, x_end = blocks.bounds(int(index))
+            scores, exact_scores = score_block(y_start, y_end, x_start, x_end)
+            evaluated += scores.size
+            slack = np.where(exact_scores, 0.0, tolerance)
+            position = scoring.best_position(scores - slack)
+            if position is None:
+                continue
+            x, y = position[0] + x_start, position[1] + y_start
+            score = scores[y - y_start, x - x_start] - slack[y - y_start, x - x_start]
+            # При равных оценках побеждает позиция, идущая раньше в порядке строк
+            if score > best_score or (score == best_score and (y, x) < (best_position[1], best_position[0])):
+                best_score = score
+                best_position = (x, y)
+            ys, xs = np.nonzero(scores + slack >= best_score)
+            kept.append((ys + y_start, xs + x_start, scores[ys, xs], exact_scores[ys, xs]))
+
+    def result() -> Optional[Tuple[int, int]]:
+        if best_position is None or (tolerance == 0.0 and rescore is None):
+            return best_position
+        ys, xs, scores, exact_scores = (np.concatenate(parts) for parts in zip(*kept))
+        return scoring.settle(ys, xs, scores, exact_scores, tolerance, rescore)
+
+    refine(order[:top_k])
+    if not exact:
+        return result(), evaluated
+    while True:
+        candidates = ~refined & (flat >= best_score)
+        if best_position is not None:
+            best_x, best_y = best_position
+            precedes = (first_y < best_y) | ((first_y == best_y) & (first_x < best_x))
+            candidates &= (flat > best_score) | precedes
+        pending = order[candidates[order]]
+        if pending.size == 0:
+            return result(), evaluated
+        if full_search is not None and refined.sum() + pending.size > FALLBACK_SHARE * flat.size:
+            return full_search(), evaluated + blocks.rows * blocks.cols
+        refine(pending[:top_k])
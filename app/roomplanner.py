@@ -1,20 +1,317 @@
+"""Планировщик расстановки мебели в комнате на сетке весов.
+
+Способы подсчета (scoring) дают ту же расстановку, что и перебор срезов
+("brute"), до бита: оценки по таблице сумм, которые могут отличаться от
+перебора на погрешность округления, при почти равной лучшей оценке
+пересчитываются по срезам (app.integral, scoring.settle). quantize=True
+округляет статические веса до кратных field.WEIGHT_QUANTUM: такие оценки
+не имеют погрешности, но почти равные оценки становятся равными, и
+расстановка может отличаться от прежней выбором первой позиции по строкам.
+
+lean=True уменьшает память планировщика: веса хранятся во float32,
+занятость - в битовой маске PackedMask, таблица сумм - без накопленных
+сумм по столбцам. Экономный режим всегда квантует веса: они лежат в [0, 1]
+и точно представимы во float32, поэтому расстановка совпадает
+с расстановкой в float64 с quantize=True без допуска.
+
+Для scoring="pyramid" позиции делятся на блоки pyramid_factor x pyramid_factor,
+и сначала точно оцениваются pyramid_k блоков с наибольшими верхними
+границами. С pyramid_exact=True (по умолчанию) затем уточняются все блоки,
+которые еще могут содержать лучшую позицию, и результат совпадает
+с остальными способами; с pyramid_exact=False поиск ограничивается
+pyramid_k блоками и может вернуть не лучшую позицию.
+
+obstacle_kinds дополняет виды препятствий (field.ObstacleKind с ядром
+и радиусом влияния) к дверям и окнам; препятствия этих видов добавляются
+через add_obstacle.
+
+lazy=True - ленивая сетка для очень больших комнат (app.tiles): статические
+веса считаются плитками tile_size x tile_size, только когда расстановка
+читает их область, и в памяти остается не больше max_tiles плиток;
+занятость не хранится, а берется из furniture_index. Расстановка совпадает
+с обычной. Ленивая сетка работает только со scoring="brute"; place_furniture
+и place_wardrobe при этом оценивают позиции блоками tile_size x tile_size
+по таблице сумм области блока. np.asarray(planner.grid) и сохранение весов
+в архив собирают сетку целиком.
+
+При scoring="brute" и "integral" перебор в place_furniture и place_wardrobe
+идет с отсечением (prune=True, по умолчанию): для каждой позиции считается
+верхняя граница оценки - число клеток с ненулевым весом под мебелью,
+умноженное на наибольший вес, плюс бонусы за стену, окна и расстояние
+до занятых клеток. Позиции проверяются от больших границ к меньшим, а те,
+чья граница не выше лучшей найденной оценки, пропускаются. Расстановка
+совпадает с полным перебором; доля отсеченных позиций - в stats
+(pruned_share). Ленивая сетка отсекает так целые блоки позиций, не
+рассчитывая их плитки."""
+import logging
 import os
-from typing import Optional, Tuple
+from functools import partial
+from typing import List, NamedTuple, Optional, Tuple
 import numpy as np
 import matplotlib.pyplot as plt
 
+from app import pyramid
+from app.field import DEFAULT_KINDS, FieldEngine, quantize_weights, static_weights
+from app import scoring as vectorized
+from app.integral import IntegralGrid, rest_tolerance
+from app.mask import PackedMask
+from app.spatial import SpatialIndex, nearest_distances
+from app.stats import PlannerStats, timed
+from app.tiles import FootprintMask, LazyGrid, TiledWeights, array_region
+
+logger = logging.getLogger(__name__)
+
+# Способы подсчета веса области: "brute" - суммирование среза сетки,
+# "integral" - таблица префиксных сумм, "vectorized" - карты оценок
+# для всех позиций сразу, "pyramid" - оценки только в блоках позиций
+# с наибольшими верхними границами (place_furniture и place_wardrobe)
+SCORING_MODES = ("brute", "integral", "vectorized", "pyramid")
+
+
+def _quantized_region(source, y_start: int, y_end: int, x_start: int, x_end: int) -> np.ndarray:
+    """Источник плиток ленивой сетки: веса области source, квантованные с шагом field.WEIGHT_QUANTUM."""
+    return quantize_weights(np.asarray(source(y_start, y_end, x_start, x_end), dtype=np.float64))
+
+
+class FurnitureRecord(NamedTuple):
+    """Положение мебели в клетках; сравнивается и распаковывается как кортеж (x, y, w, h)."""
+    x: int
+    y: int
+    width: int
+    height: int
+
+
+class _Edit(NamedTuple):
+    """Запись журнала отмены: состояние планировщика перед одним изменением."""
+    serial: int  # Номер записи, по нему проверяется, что снимок относится к этой истории
+    region: Tuple[int, int, int, int]  # Изменяемая область сетки: y_start, y_end, x_start, x_end
+    occupancy: Optional[np.ndarray]  # Занятость в области до изменения (None - не менялась)
+    base_weights: np.ndarray  # Слой статических весов (массив не меняется на месте)
+    influence_radius: Optional[int]
+    furniture_positions: dict
+    failures: int  # Число неудач до изменения
+    doors: int
+    windows: int
+    obstacles: int
+
+
+class Snapshot(NamedTuple):
+    """Снимок состояния планировщика для RoomPlanner.restore."""
+    log: list  # Журнал отмены, к которому относится снимок
+    depth: int  # Число записей журнала на момент снимка
+    serial: int  # Номер последней из них
+
+
 class RoomPlanner:
-    def __init__(self, room_size, cell_size, doors, windows, empty=2) -> None:
-        """Инициализация параметров комнаты."""
+    __slots__ = ("room_width", "room_height", "cell_size", "grid_width", "grid_height",
+                 "base_weights", "occupancy", "grid", "doors", "windows", "obstacles", "obstacle_kinds", "influence_radius",
+                 "furniture_positions", "furniture_index", "failures", "empty", "scoring", "lean", "quantize", "integral", "stats",
+                 "pyramid_factor", "pyramid_k", "pyramid_exact", "_undo", "_serial", "_owners", "_field", "lazy", "prune")
+
+    def __init__(self, room_size, cell_size, doors, windows, empty=2, scoring: str = "integral",
+                 collect_stats: bool = False, lean: bool = False, pyramid_factor: int = 8,
+                 pyramid_k: int = 4, pyramid_exact: bool = True, obstacle_kinds: Optional[dict] = None,
+                 lazy: bool = False, tile_size: int = 256, max_tiles: int = 64, prune: bool = True,
+                 quantize: bool = False) -> None:
+        """Инициализация параметров комнаты.
+
+        room_size - (ширина, высота) в сантиметрах, cell_size - размер клетки,
+        doors и windows - прямоугольники (x, y, w, h) в сантиметрах, empty -
+        отступ вокруг мебели в клетках. scoring - способ подсчета веса области
+        из SCORING_MODES; collect_stats включает сбор статистики в self.stats;
+        lean - экономный по памяти режим; quantize - квантование статических
+        весов; pyramid_factor, pyramid_k и pyramid_exact настраивают
+        scoring="pyramid"; obstacle_kinds дополняет виды препятствий для
+        add_obstacle; lazy, tile_size и max_tiles включают и настраивают
+        ленивую сетку; prune - отсечение позиций по верхней границе оценки.
+        Подробнее о режимах - в описании модуля."""
+        if scoring not in SCORING_MODES:
+            raise ValueError(f"Неизвестный способ подсчета весов: {scoring}")
+        if lazy and scoring != "brute":
+            raise ValueError("Ленивая сетка работает только со scoring=\"brute\"")
+        if pyramid_factor < 2 or pyramid_k < 1:
+            raise ValueError("pyramid_factor должен быть не меньше 2, а pyramid_k - не меньше 1")
         self.room_width, self.room_height = room_size
         self.cell_size = cell_size
         self.grid_width = int(self.room_width / self.cell_size)
         self.grid_height = int(self.room_height / self.cell_size)
-        self.grid = np.ones((self.grid_height, self.grid_width))
-        self.doors = [(x // cell_size, y // cell_size, (w + cell_size - 1) // cell_size, (h + cell_size - 1) // cell_size) for (x, y, w, h) in doors]
-        self.windows = [(x // cell_size, y // cell_size, (w + cell_size - 1) // cell_size, (h + cell_size - 1) // cell_size) for (x, y, w, h) in windows]
+        # Сетка хранится слоями: статические веса от дверей и окон и занятость
+        # мебелью (вместе с отступом empty). self.grid - итоговые веса,
+        # в занятых клетках равные 0
+        shape = (self.grid_height, self.grid_width)
+        self.lean = lean
+        self.quantize = quantize or lean
+        self.lazy = lazy
+        dtype = np.float32 if lean else np.float64
+        if lazy:
+            self.base_weights = TiledWeights(shape, partial(static_weights, FieldEngine(), [], None),
+                                             dtype, tile_size, max_tiles)
+            self.occupancy = FootprintMask(self)
+            self.grid = LazyGrid(self)
+        else:
+            self.base_weights = np.ones(shape, dtype=dtype)
+            self.occupancy = PackedMask(shape) if lean else np.zeros(shape, dtype=bool)
+            self.grid = self.base_weights.copy()
+        self.doors = [self._to_cells(door) for door in doors]
+        self.windows = [self._to_cells(window) for window in windows]
+        self.obstacle_kinds = dict(DEFAULT_KINDS, **(obstacle_kinds or {}))
+        self.obstacles = []  # Препятствия других видов: (вид, прямоугольник в клетках)
+        self.influence_radius = None  # Задается в calculate_weights
         self.furniture_positions = {}
+        # Те же прямоугольники мебели в пространственном индексе для запросов по месту
+        self.furniture_index = SpatialIndex()
+        self.failures = []  # Мебель, для которой не нашлось места
         self.empty = empty
+        self.scoring = scoring
+        self.integral = IntegralGrid(self.grid, lean=lean) if scoring != "brute" else None
+        self.stats = PlannerStats() if collect_stats else None
+        self.pyramid_factor = pyramid_factor
+        self.pyramid_k = pyramid_k
+        self.pyramid_exact = pyramid_exact
+        self.prune = prune
+        self._undo: Optional[List[_Edit]] = None  # Журнал отмены, ведется после первого snapshot()
+        self._serial = 0
+        self._owners = [1]  # Число планировщиков, разделяющих занятость, сетку и таблицу сумм
+        self._field = FieldEngine()
+
+    def snapshot(self) -> Snapshot:
+        """Запоминает текущее состояние, чтобы вернуться к нему через restore.
+
+        С первого снимка планировщик ведет журнал отмены: каждое изменение
+        сохраняет прежнюю занятость только своей области, поэтому снимок
+        и возврат стоят пропорционально числу и размеру изменений, а не
+        размеру сетки."""
+        if self._undo is None:
+            self._undo = []
+        return Snapshot(self._undo, len(self._undo), self._undo[-1].serial if self._undo else 0)
+
+    def restore(self, snapshot: Snapshot) -> None:
+        """Возвращает планировщик к состоянию снимка, отменяя изменения после него.
+
+        Снимки, сделанные позже, после restore и новых изменений становятся
+        недействительными."""
+        log = self._undo
+        if (snapshot.log is not log or snapshot.depth > len(log)
+                or (snapshot.depth and log[snapshot.depth - 1].serial != snapshot.serial)):
+            raise ValueError("Снимок не относится к текущей истории планировщика.")
+        if len(log) == snapshot.depth:
+            return
+        self._detach()
+        y_start, y_end, x_start, x_end = self.grid_height, 0, self.grid_width, 0
+        while len(log) > snapshot.depth:
+            edit = log.pop()
+            edit_y_start, edit_y_end, edit_x_start, edit_x_end = edit.region
+            if edit.occupancy is not None:
+                self.occupancy[edit_y_start:edit_y_end, edit_x_start:edit_x_end] = edit.occupancy
+            self.base_weights = edit.base_weights
+            self.influence_radius = edit.influence_radius
+            self.furniture_positions = edit.furniture_positions
+            del self.failures[edit.failures:]
+            del self.doors[edit.doors:]
+            del self.windows[edit.windows:]
+            del self.obstacles[edit.obstacles:]
+            if edit_y_start < edit_y_end and edit_x_start < edit_x_end:
+                y_start, y_end = min(y_start, edit_y_start), max(y_end, edit_y_end)
+                x_start, x_end = min(x_start, edit_x_start), max(x_end, edit_x_end)
+        self.furniture_index.sync(self.furniture_positions)
+        # Итоговые веса и таблица сумм пересчитываются один раз по общей области изменений
+        if y_start < y_end:
+            self._refresh(y_start, y_end, x_start, x_end)
+
+    def release_snapshots(self) -> None:
+        """Прекращает вести журнал отмены; сделанные снимки становятся недействительными."""
+        self._undo = None
+
+    def _record(self, y_start: int = 0, y_end: int = 0, x_start: int = 0, x_end: int = 0,
+                occupancy_changes: bool = False) -> None:
+        """Добавляет в журнал отмены состояние перед изменением области, если журнал ведется."""
+        if self._undo is None:
+            return
+        self._serial += 1
+        occupancy = self.occupancy[y_start:y_end, x_start:x_end].copy() if occupancy_changes else None
+        self._undo.append(_Edit(self._serial, (y_start, y_end, x_start, x_end), occupancy,
+                                self.base_weights, self.influence_radius, dict(self.furniture_positions),
+                                len(self.failures), len(self.doors), len(self.windows), len(self.obstacles)))
+
+    def fork(self) -> "RoomPlanner":
+        """Независимый планировщик с тем же состоянием для проверки вариантов.
+
+        Статические веса дверей и окон разделяются всегда (они не меняются
+        на месте). Занятость, итоговые веса и таблица сумм тоже разделяются,
+        пока один из планировщиков их не изменит: тогда он получает свою копию.
+        Поэтому сама развилка не копирует сеток. Журнал отмены у новой
+        ветки свой, снимки оригинала к ней не относятся."""
+        branch = RoomPlanner.__new__(RoomPlanner)
+        for slot in RoomPlanner.__slots__:
+            setattr(branch, slot, getattr(self, slot))
+        if self.lazy:
+            # Ленивые занятость и итоговые веса читают мебель своей ветки
+            branch._owners = [1]
+            branch.occupancy = FootprintMask(branch)
+            branch.grid = LazyGrid(branch)
+        else:
+            self._owners[0] += 1
+        branch.doors = list(self.doors)
+        branch.windows = list(self.windows)
+        branch.obstacles = list(self.obstacles)
+        branch._field = FieldEngine()
+        branch.furniture_positions = dict(self.furniture_positions)
+        branch.furniture_index = self.furniture_index.copy()
+        branch.failures = list(self.failures)
+        branch.stats = PlannerStats() if self.stats is not None else None
+        branch._undo = None
+        branch._serial = 0
+        return branch
+
+    def copy(self) -> "RoomPlanner":
+        """Копия планировщика, сразу получившая собственные сетки (см. fork)."""
+        clone = self.fork()
+        clone._detach()
+        return clone
+
+    def _detach(self) -> None:
+        """Перед изменением забирает себе копию сеток, разделяемых с другими ветками fork."""
+        if self._owners[0] == 1:
+            return
+        self._owners[0] -= 1
+        self._owners = [1]
+        self.occupancy = self.occupancy.copy()
+        self.grid = self.grid.copy()
+        self.integral = self.integral.copy() if self.integral is not None else None
+
+    def _count(self, method: str, **counters: int) -> None:
+        """Добавляет счетчики позиций в статистику, если она собирается."""
+        if self.stats is not None:
+            self.stats.count(method, **counters)
+
+    @property
+    def nbytes(self) -> int:
+        """Память, занятая сетками планировщика, в байтах."""
+        integral = self.integral.nbytes if self.integral is not None else 0
+        return self.base_weights.nbytes + self.grid.nbytes + self.occupancy.nbytes + integral
+
+    def _to_cells(self, rect_cm: Tuple[int, int, int, int]) -> Tuple[int, int, int, int]:
+        """Переводит прямоугольник двери или окна из сантиметров в клетки."""
+        x, y, w, h = rect_cm
+        cell_size = self.cell_size
+        return (x // cell_size, y // cell_size, (w + cell_size - 1) // cell_size, (h + cell_size - 1) // cell_size)
+
+    def _footprint(self, x: int, y: int, width: int, height: int) -> Tuple[int, int, int, int]:
+        """Область сетки, которую занимает мебель вместе с отступом empty."""
+        x_start = max(0, x - self.empty)
+        y_start = max(0, y - self.empty)
+        x_end = min(self.grid_width, x + width + self.empty)
+        y_end = min(self.grid_height, y + height + self.empty)
+        return y_start, y_end, x_start, x_end
+
+    def _refresh(self, y_start: int, y_end: int, x_start: int, x_end: int) -> None:
+        """Пересобирает итоговые веса области из слоев и обновляет таблицу сумм."""
+        if self.lazy:
+            return  # Ленивая сетка собирает итоговые веса при чтении
+        region = (slice(y_start, y_end), slice(x_start, x_end))
+        self.grid[region] = np.where(self.occupancy[region], 0, self.base_weights[region])
+        if self.integral is not None:
+            self.integral.update(self.grid, y_start, y_end, x_start, x_end)
 
     def _update_grid(self, name: str, best_position: Optional[Tuple[int, int]], width: int, height: int):
         """В случае если найдено подходящее место для мебели:
@@ -22,14 +319,59 @@ class RoomPlanner:
            Если нет - уведомляет об этом сообщением"""
         if best_position:
             x, y = best_position
-            self.furniture_positions[name] = (x, y, width, height)
-            x_start = max(0, x - self.empty)
-            y_start = max(0, y - self.empty)
-            x_end = min(self.grid_width, x + width + self.empty)
-            y_end = min(self.grid_height, y + height + self.empty)
-            self.grid[y_start:y_end, x_start:x_end] = 0
+            y_start, y_end, x_start, x_end = self._footprint(x, y, width, height)
+            self._detach()
+            self._record(y_start, y_end, x_start, x_end, occupancy_changes=True)
+            self.furniture_positions[name] = FurnitureRecord(x, y, width, height)
+            self.furniture_index.insert(name, self.furniture_positions[name])
+            self.occupancy[y_start:y_end, x_start:x_end] = True
+            self._refresh(y_start, y_end, x_start, x_end)
             return        
-        print(f"Не удалось найти подходящее место для {name}.")
+        self._add_failure(name)
+        logger.warning("Не удалось найти подходящее место для %s.", name)
+
+    def _add_failure(self, name: str) -> None:
+        self._record()
+        self.failures.append(name)
+
+
+    @timed
+    def remove_furniture(self, name: str) -> FurnitureRecord:
+        """Убирает мебель из плана и освобождает занятую ею область.
+
+        Пересчитывается только область мебели с отступом: занятость в ней
+        восстанавливается по оставшейся мебели, которая ее пересекает
+        (соседи ищутся в furniture_index)."""
+        if name not in self.furniture_positions:
+            raise KeyError(f"Мебель '{name}' не найдена.")
+        y_start, y_end, x_start, x_end = self._footprint(*self.furniture_positions[name])
+        self._detach()
+        self._record(y_start, y_end, x_start, x_end, occupancy_changes=True)
+        position = self.furniture_positions.pop(name)
+        self.furniture_index.remove(name)
+        self.occupancy[y_start:y_end, x_start:x_end] = False
+        # Отступы пересекаются, только если мебель ближе 2 * empty клеток
+        empty = self.empty
+        neighbours = self.furniture_index.overlapping(x_start - empty, y_start - empty,
+                                                      x_end - x_start + 2 * empty, y_end - y_start + 2 * empty)
+        for other in neighbours:
+            other_y_start, other_y_end, other_x_start, other_x_end = self._footprint(*self.furniture_index[other])
+            self.occupancy[max(y_start, other_y_start):min(y_end, other_y_end),
+                           max(x_start, other_x_start):min(x_end, other_x_end)] = True
+        self._refresh(y_start, y_end, x_start, x_end)
+        return position
+
+
+    @timed
+    def move_furniture(self, name: str, x: int, y: int) -> None:
+        """Переносит мебель в клетку (x, y) без пересчета всей комнаты."""
+        if name not in self.furniture_positions:
+            raise KeyError(f"Мебель '{name}' не найдена.")
+        _, _, width, height = self.furniture_positions[name]
+        if not self._can_place_furniture(x, y, width, height):
+            raise ValueError(f"Мебель '{name}' не помещается в позицию ({x}, {y}).")
+        self.remove_furniture(name)
+        self._update_grid(name, (x, y), width, height)
 
 
     def _can_place_furniture(self, x: int, y: int, width: int, height: int) -> bool:
@@ -39,69 +381,326 @@ class RoomPlanner:
         return True      
 
 
+    def _area_sum(self, x: int, y: int, width: int, height: int) -> float:
+        """Возвращает суммарный вес области, в которую ставится мебель.
+
+        Таблица сумм используется, только если ее сумма совпадает с суммой
+        среза (в области нет остатков весов, см. IntegralGrid)."""
+        if self.integral is not None and self.integral.is_exact(x, y, width, height):
+            return self.integral.rect_sum(x, y, width, height)
+        if self.lazy:
+            # Срез плотной сетки суммируется по строкам длины grid_width; сумма
+            # копии другой формы может отличаться в последнем бите
+            rows = np.empty((height, self.grid_width), dtype=self.grid.dtype)
+            rows[:, x:x + width] = self.grid[y:y + height, x:x + width]
+            return rows[:, x:x + width].sum(dtype=np.float64)
+        return self.grid[y:y + height, x:x + width].sum(dtype=np.float64)
+
+
+    def _tolerance(self, width: int, height: int, max_weight: float) -> float:
+        """Наибольшее отличие оценки позиции по таблице сумм от оценки перебора срезов.
+
+        Складывается из погрешности суммы остатков весов в таблице, погрешности
+        суммирования среза и округления при прибавлении бонусов к оценке."""
+        scale = (width * height * max_weight + 20.0 * len(self.windows) + 5.0
+                 + self.grid_width + self.grid_height)
+        return (rest_tolerance(self.grid_height, self.grid_width)
+                + (width * height + 8) * np.finfo(np.float64).eps * scale)
+
+
+    def _compute_base_weights(self, y_start: int, y_end: int, x_start: int, x_end: int) -> np.ndarray:
+        """Рассчитывает статические веса области с учетом влияния дверей, окон и других препятствий.
+
+        Влияние препятствий вычитается в том же порядке, что и при расчете
+        всей сетки, поэтому пересчет области дает те же значения."""
+        return static_weights(self._field, self._field_obstacles(), self.influence_radius,
+                              y_start, y_end, x_start, x_end, self.quantize)
+
+
+    def _field_obstacles(self) -> list:
+        """Все препятствия с их видами одним списком: двери, окна, затем остальные."""
+        kinds = self.obstacle_kinds
+        return ([(door, kinds["door"]) for door in self.doors]
+                + [(window, kinds["window"]) for window in self.windows]
+                + [(rect, kinds[kind]) for kind, rect in self.obstacles])
+
+
+    def _tile_source(self):
+        """Расчет плиток ленивой сетки по текущим препятствиям; список препятствий фиксируется."""
+        return partial(static_weights, FieldEngine(), self._field_obstacles(), self.influence_radius,
+                       quantize=self.quantize)
+
+
+    @timed
     def calculate_weights(self, influence_radius=8):
         """Рассчитывает веса для всех клеток сетки с учетом влияния дверей и окон."""
-        # Собираем все препятствия (двери и окна) в один список
-        obstacles = self.doors + self.windows
-        radius_sq = influence_radius**2
-        for obj_x, obj_y, obj_w, obj_h in obstacles:
-            # Рассчитываем область влияния препятствия
-            x_start = max(0, obj_x - influence_radius)
-            x_end = min(self.grid_width, obj_x + obj_w + influence_radius)
-            y_start = max(0, obj_y - influence_radius)
-            y_end = min(self.grid_height, obj_y + obj_h + influence_radius)
-            # Создаем сетки координат для области влияния
-            y_coords, x_coords = np.meshgrid(
-                np.arange(y_start, y_end),
-                np.arange(x_start, x_end),
-                indexing="ij")
-            # Вычисляем расстояние от текущей точки до препятствия
-            dist_x = np.maximum(0, np.maximum(obj_x - x_coords, x_coords - (obj_x + obj_w)))
-            dist_y = np.maximum(0, np.maximum(obj_y - y_coords, y_coords - (obj_y + obj_h)))
-            distances_sq = dist_x**2 + dist_y**2
-            # Учет влияния только в пределах радиуса
-            influence_mask = distances_sq <= radius_sq
-            distances = np.sqrt(distances_sq[influence_mask])
-            # Обновляем веса: чем ближе к препятствию, тем меньше вес
-            self.grid[y_coords[influence_mask], x_coords[influence_mask]] -= 1.0 / (1.0 + distances)
-        self.grid = np.maximum(0, self.grid) # Гарантируем, что веса не будут отрицательными
+        self._detach()
+        self._record(0, self.grid_height, 0, self.grid_width)
+        self.influence_radius = influence_radius
+        if self.lazy:
+            self.base_weights = self.base_weights.with_source(self._tile_source())
+            return
+        self._set_base_weights(self._compute_base_weights(0, self.grid_height, 0, self.grid_width))
+
+
+    def _set_base_weights(self, base_weights: np.ndarray) -> None:
+        """Заменяет статические веса всей сетки и пересобирает итоговые веса и таблицу сумм."""
+        if self.lazy:
+            # Плитки читаются из массива по мере надобности, он не копируется
+            source = partial(array_region, base_weights)
+            if self.quantize:
+                source = partial(_quantized_region, source)
+            self.base_weights = self.base_weights.with_source(source)
+            return
+        if self.quantize:
+            base_weights = quantize_weights(np.asarray(base_weights, dtype=np.float64))
+        self.base_weights = np.array(base_weights, dtype=self.grid.dtype)
+        self.grid = np.where(self.occupancy[:, :], 0, self.base_weights).astype(self.base_weights.dtype, copy=False)
+        if self.integral is not None:
+            self.integral.rebuild(self.grid)
+
+
+    def _add_obstacle(self, kind: str, rect_cm: Tuple[int, int, int, int]) -> None:
+        """Добавляет препятствие и пересчитывает веса только в области его влияния."""
+        obstacle = self._to_cells(rect_cm)
+        if kind in ("door", "window"):
+            target, entry = (self.doors if kind == "door" else self.windows), obstacle
+        else:
+            target, entry = self.obstacles, (kind, obstacle)
+        if self.influence_radius is None:
+            self._record()
+            target.append(entry)
+            return
+        radius = self.obstacle_kinds[kind].radius
+        radius = self.influence_radius if radius is None else radius
+        obj_x, obj_y, obj_w, obj_h = obstacle
+        x_start = max(0, obj_x - radius)
+        x_end = min(self.grid_width, obj_x + obj_w + radius)
+        y_start = max(0, obj_y - radius)
+        y_end = min(self.grid_height, obj_y + obj_h + radius)
+        self._record(y_start, y_end, x_start, x_end)
+        target.append(entry)
+        if x_start >= x_end or y_start >= y_end:
+            return
+        self._detach()
+        # Статические веса не меняются на месте: их разделяют ветки fork и снимки
+        if self.lazy:
+            self.base_weights = self.base_weights.with_source(self._tile_source(), (y_start, y_end, x_start, x_end))
+        else:
+            base_weights = self.base_weights.copy()
+            base_weights[y_start:y_end, x_start:x_end] = self._compute_base_weights(y_start, y_end, x_start, x_end)
+            self.base_weights = base_weights
+        self._refresh(y_start, y_end, x_start, x_end)
+
+
+    def add_door(self, rect_cm: Tuple[int, int, int, int]) -> None:
+        """Добавляет дверь (x, y, w, h в сантиметрах)."""
+        self._add_obstacle("door", rect_cm)
+
+
+    def add_window(self, rect_cm: Tuple[int, int, int, int]) -> None:
+        """Добавляет окно (x, y, w, h в сантиметрах)."""
+        self._add_obstacle("window", rect_cm)
+
+
+    def add_obstacle(self, kind: str, rect_cm: Tuple[int, int, int, int]) -> None:
+        """Добавляет препятствие вида kind из obstacle_kinds (x, y, w, h в сантиметрах).
+
+        Препятствие влияет только на веса клеток: мебель ставится с учетом
+        этих весов, но не запрещена в его прямоугольнике."""
+        if kind not in self.obstacle_kinds:
+            raise ValueError(f"Неизвестный вид препятствия: {kind}")
+        self._add_obstacle(kind, rect_cm)
 
 
+    @timed
     def place_furniture(self, name: str, width_cm:int, height_cm:int, prefer_window: bool=False, prefer_wall: bool=False):
         """Размещение мебели с учетом приоритетов."""
         best_score = -np.inf
         best_position = None
         width = int(np.ceil(width_cm / self.cell_size))
         height = int(np.ceil(height_cm / self.cell_size))
+        if self.scoring == "pyramid":
+            best_position, evaluated = self._place_furniture_pyramid(width, height, prefer_window, prefer_wall)
+            self._count("place_furniture", candidates=evaluated)
+            self._update_grid(name, best_position, width, height)
+            return
+        self._count("place_furniture", candidates=max(0, self.grid_height - height) * max(0, self.grid_width - width))
+        if self.scoring == "vectorized":
+            best_position = self._place_furniture_vectorized(width, height, prefer_window, prefer_wall)
+            self._update_grid(name, best_position, width, height)
+            return
+        if self.lazy:
+            best_position = self._place_furniture_tiled(width, height, prefer_window, prefer_wall)
+            self._update_grid(name, best_position, width, height)
+            return
+        if self.prune:
+            best_position = self._place_furniture_bounded(width, height, prefer_window, prefer_wall)
+            self._update_grid(name, best_position, width, height)
+            return
         for y in range(self.grid_height - height):
             for x in range(self.grid_width - width):
-                total_score = self.grid[y:y+height, x:x+width].sum()  # Общий вес области
-                # Увеличиваем приоритет для областей возле окон
-                if prefer_window:
-                    for window in self.windows:
-                        window_x, window_y, window_w, window_h = window
-                        dist_x = max(0, max(window_x - x, x - (window_x + window_w)))
-                        dist_y = max(0, max(window_y - y, y - (window_y + window_h)))
-                        distance = np.sqrt(dist_x**2 + dist_y**2)
-                        if distance <= 5:
-                            # Чем ближе к окну, тем лучше
-                            total_score += 20.0 / (1 + distance)
-                # Увеличиваем приоритет для областей возле стен
-                if prefer_wall:
-                    dist_to_wall = min(
-                        x, self.grid_width - (x + width), y, self.grid_height - (y + height))
-                    # Чем ближе к стене, тем лучше
-                    total_score += 5.0 / (1 + dist_to_wall)
+                total_score = self._furniture_score(x, y, width, height, prefer_window, prefer_wall)
                 if total_score > best_score:
                     best_score = total_score
                     best_position = (x, y)
         self._update_grid(name, best_position, width, height)
 
 
+    def _furniture_score(self, x: int, y: int, width: int, height: int, prefer_window: bool, prefer_wall: bool) -> float:
+        """Оценка позиции (x, y) в place_furniture."""
+        total_score = self._area_sum(x, y, width, height)  # Общий вес области
+        # Увеличиваем приоритет для областей возле окон
+        if prefer_window:
+            for window in self.windows:
+                window_x, window_y, window_w, window_h = window
+                dist_x = max(0, max(window_x - x, x - (window_x + window_w)))
+                dist_y = max(0, max(window_y - y, y - (window_y + window_h)))
+                distance = np.sqrt(dist_x**2 + dist_y**2)
+                if distance <= 5:
+                    # Чем ближе к окну, тем лучше
+                    total_score += 20.0 / (1 + distance)
+        # Увеличиваем приоритет для областей возле стен
+        if prefer_wall:
+            dist_to_wall = min(
+                x, self.grid_width - (x + width), y, self.grid_height - (y + height))
+            # Чем ближе к стене, тем лучше
+            total_score += 5.0 / (1 + dist_to_wall)
+        return total_score
+
+
+    def _area_bounds(self, width: int, height: int, rows: int, cols: int) -> np.ndarray:
+        """Верхние границы суммы весов под мебелью для позиций rows x cols.
+
+        Для позиций с остатками весов граница увеличена на погрешность суммирования."""
+        max_weight = float(self.grid.max())
+        if self.integral is not None:
+            exact = self.integral.exact_windows(width, height)[:rows, :cols]
+        else:
+            inexact = self.grid != quantize_weights(self.grid)
+            exact = vectorized.window_counts(inexact, width, height, rows, cols) == 0
+        bounds = vectorized.free_counts(self.grid, width, height, rows, cols) * max_weight
+        return bounds + np.where(exact, 0.0, self._tolerance(width, height, max_weight))
+
+
+    def _place_furniture_bounded(self, width: int, height: int, prefer_window: bool, prefer_wall: bool) -> Optional[Tuple[int, int]]:
+        """Перебор place_furniture с отсечением позиций по верхней границе оценки.
+
+        Бонусы за окна и стену в границе точные и прибавляются в том же
+        порядке, что и в оценке, поэтому граница не меньше оценки."""
+        rows = self.grid_height - height
+        cols = self.grid_width - width
+        if rows <= 0 or cols <= 0:
+            return None
+        bounds = self._area_bounds(width, height, rows, cols)
+        if prefer_window:
+            vectorized.window_bonus(self.windows, bounds)
+        if prefer_wall:
+            bounds += 5.0 / (1 + vectorized.wall_distance(self.grid_width, self.grid_height, width, height, rows, cols))
+        best_position, evaluated = vectorized.bounded_search(
+            bounds, lambda x, y: self._furniture_score(x, y, width, height, prefer_window, prefer_wall))
+        self._count("place_furniture", pruned=bounds.size - evaluated)
+        return best_position
+
+
+    def _place_furniture_vectorized(self, width: int, height: int, prefer_window: bool, prefer_wall: bool) -> Optional[Tuple[int, int]]:
+        """Векторизованный вариант перебора в place_furniture."""
+        rows = self.grid_height - height
+        cols = self.grid_width - width
+        if rows <= 0 or cols <= 0:
+            return None
+        scores, exact = self.integral.window_sums_exact(width, height)
+        scores, exact = scores[:rows, :cols].copy(), exact[:rows, :cols]
+        if prefer_window:
+            vectorized.window_bonus(self.windows, scores)
+        if prefer_wall:
+            dist_to_wall = vectorized.wall_distance(self.grid_width, self.grid_height, width, height, rows, cols)
+            scores += 5.0 / (1 + dist_to_wall)
+        return vectorized.settle_map(
+            scores, exact, self._tolerance(width, height, float(self.grid.max())),
+            lambda x, y: self._furniture_score(x, y, width, height, prefer_window, prefer_wall))
+
+
+    def _place_furniture_pyramid(self, width: int, height: int, prefer_window: bool,
+                                 prefer_wall: bool) -> Tuple[Optional[Tuple[int, int]], int]:
+        """Перебор place_furniture от грубого уровня к точному; возвращает позицию и число оцененных позиций."""
+        rows = self.grid_height - height
+        cols = self.grid_width - width
+        if rows <= 0 or cols <= 0:
+            return None, 0
+        blocks = pyramid.Blocks(rows, cols, self.pyramid_factor)
+        max_weight = float(self.grid.max())
+        tolerance = self._tolerance(width, height, max_weight)
+        bounds = pyramid.area_bounds(self.integral, blocks, width, height, max_weight, tolerance)
+        if prefer_window:
+            pyramid.window_bonus_bounds(self.windows, blocks, bounds)
+        if prefer_wall:
+            bounds += pyramid.wall_bonus_bounds(blocks, self.grid_width, self.grid_height, width, height)
+
+        def score_block(y_start: int, y_end: int, x_start: int, x_end: int) -> Tuple[np.ndarray, np.ndarray]:
+            scores, exact = self.integral.region_sums_exact(width, height, y_start, y_end, x_start, x_end)
+            if prefer_window:
+                vectorized.window_bonus(self.windows, scores, x_start, y_start)
+            if prefer_wall:
+                dist_to_wall = vectorized.wall_distance(self.grid_width, self.grid_height, width, height,
+                                                        y_end - y_start, x_end - x_start, x_start, y_start)
+                scores += 5.0 / (1 + dist_to_wall)
+            return scores, exact
+
+        return pyramid.search(bounds, blocks, score_block, self.pyramid_k, self.pyramid_exact,
+                              lambda: self._place_furniture_vectorized(width, height, prefer_window, prefer_wall),
+                              tolerance, lambda x, y: self._furniture_score(x, y, width, height, prefer_window, prefer_wall))
+
+
+    def _place_furniture_tiled(self, width: int, height: int, prefer_window: bool,
+                               prefer_wall: bool) -> Optional[Tuple[int, int]]:
+        """Перебор place_furniture в ленивой сетке блоками позиций tile_size x tile_size.
+
+        Оценки блока считаются сразу по таблице сумм его области сетки.
+        С prune=True блоки перебираются от больших верхних границ к меньшим
+        (pyramid.search), а граница блока - площадь мебели, умноженная
+        на наибольший вес, плюс наибольшие бонусы за окна и стену; блоки,
+        которые не могут содержать лучшую позицию, не читаются вовсе."""
+        rows = self.grid_height - height
+        cols = self.grid_width - width
+        if rows <= 0 or cols <= 0:
+            return None
+        blocks = pyramid.Blocks(rows, cols, self.base_weights.tile_size)
+        weight_bound = self._weight_bound()
+        tolerance = self._tolerance(width, height, weight_bound)
+        if self.prune:
+            bounds = self._tiled_area_bounds(blocks, width, height, weight_bound, tolerance)
+            if prefer_window:
+                pyramid.window_bonus_bounds(self.windows, blocks, bounds)
+            if prefer_wall:
+                bounds += pyramid.wall_bonus_bounds(blocks, self.grid_width, self.grid_height, width, height)
+        else:
+            bounds = np.full(blocks.shape, np.inf)
+
+        def score_block(y_start: int, y_end: int, x_start: int, x_end: int) -> Tuple[np.ndarray, np.ndarray]:
+            region = IntegralGrid(self.grid[y_start:y_end + height - 1, x_start:x_end + width - 1], lean=True)
+            scores, exact = region.window_sums_exact(width, height)
+            if prefer_window:
+                vectorized.window_bonus(self.windows, scores, x_start, y_start)
+            if prefer_wall:
+                dist_to_wall = vectorized.wall_distance(self.grid_width, self.grid_height, width, height,
+                                                        y_end - y_start, x_end - x_start, x_start, y_start)
+                scores += 5.0 / (1 + dist_to_wall)
+            return scores, exact
+
+        best_position, evaluated = pyramid.search(
+            bounds, blocks, score_block, 1, True, None, tolerance,
+            lambda x, y: self._furniture_score(x, y, width, height, prefer_window, prefer_wall))
+        self._count("place_furniture", pruned=rows * cols - evaluated)
+        return best_position
+
+
+    @timed
     def place_furniture_near(self, name: str, width_cm: int, height_cm: int, near_name: str) -> None:
         """Размещение мебели рядом с другой, с учетом примыкания к ней."""
         if near_name not in self.furniture_positions:
-            print(f"Мебель '{near_name}' не найдена для размещения рядом.")
+            self._add_failure(name)
+            logger.warning("Мебель '%s' не найдена для размещения рядом.", near_name)
             return        
         # Получаем координаты и размеры мебели, рядом с которой нужно разместить
         x_near, y_near, w_near, h_near = self.furniture_positions[near_name]
@@ -109,14 +708,18 @@ class RoomPlanner:
         height = int(np.ceil(height_cm / self.cell_size))
         best_score = -np.inf
         best_position = None
+        evaluated = rejected = 0
         # Функция для оценки возможных позиций для мебели
         def evaluate_position(x: int, y:int) -> None:
-            nonlocal best_score, best_position
+            nonlocal best_score, best_position, evaluated, rejected
+            evaluated += 1
             if self._can_place_furniture(x, y, width, height):
-                area_weights = self.grid[y:y + height, x:x + width].sum()
+                area_weights = self._area_sum(x, y, width, height)
                 if area_weights > best_score:
                     best_score = area_weights
                     best_position = (x, y)
+            else:
+                rejected += 1
         # Примыкание снизу
         for x in range(x_near, x_near + w_near - width + 1):
             for y in range(y_near + h_near, min(self.grid_height, y_near + h_near + height)):
@@ -133,12 +736,15 @@ class RoomPlanner:
         for y in range(y_near, y_near + h_near - height + 1):
             for x in range(max(0, x_near - width), x_near):
                 evaluate_position(x, y)    
+        self._count("place_furniture_near", candidates=evaluated, rejected_bounds=rejected)
         self._update_grid(name, best_position, width, height)
 
 
+    @timed
     def place_furniture_around(self, name: str, width_cm: int, height_cm:int, target_name: str) -> None:
         if target_name not in self.furniture_positions:
-            print(f"Мебель '{target_name}' не найдена для размещения рядом.")
+            self._add_failure(name)
+            logger.warning("Мебель '%s' не найдена для размещения рядом.", target_name)
             return
         width = int(np.ceil(width_cm / self.cell_size))
         height = int(np.ceil(height_cm / self.cell_size))
@@ -149,57 +755,352 @@ class RoomPlanner:
             best_score = -np.inf
             best_position = None
             name_num = f"{name} {num}"
+            rejected = 0
             for x in [target_x + dx for dx in range(target_w)]:
                 if not self._can_place_furniture(x, y, width, height):
+                    rejected += 1
                     continue
                 #  Расстояние от текущей области до ближайшей стены
                 dist_from_walls = min(x, self.grid_width - (x + width), y, self.grid_height - (y + height))
-                total_score = self.grid[y:y+height, x:x+width].sum() - dist_from_walls         
+                total_score = self._area_sum(x, y, width, height) - dist_from_walls         
                 # Если это лучшая позиция, запоминаем её
                 if total_score > best_score:
                     best_score = total_score
                     best_position = (x, y)
+            self._count("place_furniture_around", candidates=target_w, rejected_bounds=rejected)
             self._update_grid(name_num, best_position, width,height)
     
+    @timed
     def place_wardrobe(self, name: str, width_cm: int, height_cm: int):
         """Place a wardrobe along the wall with clearance for doors and preference for distance from occupied cells."""
         width = int(np.ceil(width_cm / self.cell_size))
         height = int(np.ceil(height_cm / self.cell_size))
         door_clearance = width//2
+        if self.scoring == "pyramid":
+            best_position, evaluated = self._place_wardrobe_pyramid(width, height, door_clearance)
+            self._count("place_wardrobe", candidates=evaluated)
+            self._update_grid(name, best_position, width, height)
+            return
+        self._count("place_wardrobe", candidates=max(0, self.grid_height - height + 1) * max(0, self.grid_width - width + 1))
+        if self.scoring == "vectorized":
+            best_position = self._place_wardrobe_vectorized(width, height, door_clearance)
+            self._update_grid(name, best_position, width, height)
+            return
+        if self.lazy:
+            best_position = self._place_wardrobe_tiled(width, height, door_clearance)
+            self._update_grid(name, best_position, width, height)
+            return
+        if self.prune:
+            best_position = self._place_wardrobe_bounded(width, height, door_clearance)
+            self._update_grid(name, best_position, width, height)
+            return
         best_score = -np.inf
         best_position = None
-        # Найти занятые клетки
-        occupied_cells = np.argwhere(self.grid == 0)
+        rejected = 0
+        # Расстояния до занятых клеток сразу для всех позиций
+        distance_map = None
+        occupied = self.grid == 0
+        rows, cols = self.grid_height - height + 1, self.grid_width - width + 1
+        if occupied.any() and rows > 0 and cols > 0:
+            distance_map = vectorized.occupied_distance(occupied, width, height, rows, cols)
         # Перебираем все возможные клетки размещения шкафа
-        for y in range(self.grid_height - height + 1):
-            for x in range(self.grid_width - width + 1):
+        for y in range(rows):
+            for x in range(cols):
                 # Проверяем, умещается ли шкаф в текущую область
                 if not self._can_place_furniture(x, y, width, height):
                     continue
-                # Убедимся, что перед шкафом есть необходимое пространство для открывания дверей
-                clearance_y_start = max(0, y - door_clearance)
-                clearance_y_end = min(self.grid_height, y + height + door_clearance)
-                clearance_x_start = max(0, x - door_clearance)
-                clearance_x_end = min(self.grid_width, x + width + door_clearance)
-                clearance_area = self.grid[clearance_y_start:clearance_y_end, clearance_x_start:clearance_x_end]
-                if np.any(clearance_area < 0):  # Если область занята
-                    continue
-                # Рассчитываем общий вес области
-                area_weights = self.grid[y:y + height, x:x + width].sum()
-                # Преимущество для размещения вдоль стен
-                dist_to_wall = min(x, self.grid_width - (x + width), y, self.grid_height - (y + height))
-                wall_score = 5.0 / (1 + dist_to_wall)
                 # Учет расстояния от занятых ячеек
-                if len(occupied_cells) > 0:
-                    center_x = x + width / 2
-                    center_y = y + height / 2
-                    distances = np.sqrt((occupied_cells[:, 1] - center_x) ** 2 + (occupied_cells[:, 0] - center_y) ** 2)
-                    distance_score = distances.min()  # Минимальное расстояние до занятой ячейки
+                if distance_map is not None:
+                    distance_score = distance_map[y, x]  # Минимальное расстояние до занятой ячейки
                 else:
                     distance_score = self.grid_width + self.grid_height  # Максимальный возможный при пустой сетке
-                total_score = area_weights + wall_score + distance_score # Итоговый вес
+                total_score = self._wardrobe_score(x, y, width, height, door_clearance, distance_score)
+                if total_score is None:  # Перед шкафом нет места для дверей
+                    rejected += 1
+                    continue
                 if total_score > best_score:
                     best_score = total_score
                     best_position = (x, y)
 
-        self._update_grid(name, best_position, width, height)
\ No newline at end of file
+        self._count("place_wardrobe", rejected_clearance=rejected)
+        self._update_grid(name, best_position, width, height)
+
+
+    def _wardrobe_score(self, x: int, y: int, width: int, height: int, door_clearance: int,
+                        distance_score: float) -> Optional[float]:
+        """Оценка позиции (x, y) в place_wardrobe; None, если перед шкафом нет места для открывания дверей."""
+        # Убедимся, что перед шкафом есть необходимое пространство для открывания дверей
+        clearance_y_start = max(0, y - door_clearance)
+        clearance_y_end = min(self.grid_height, y + height + door_clearance)
+        clearance_x_start = max(0, x - door_clearance)
+        clearance_x_end = min(self.grid_width, x + width + door_clearance)
+        clearance_area = self.grid[clearance_y_start:clearance_y_end, clearance_x_start:clearance_x_end]
+        if np.any(clearance_area < 0):  # Если область занята
+            return None
+        # Рассчитываем общий вес области
+        area_weights = self._area_sum(x, y, width, height)
+        # Преимущество для размещения вдоль стен
+        dist_to_wall = min(x, self.grid_width - (x + width), y, self.grid_height - (y + height))
+        wall_score = 5.0 / (1 + dist_to_wall)
+        return area_weights + wall_score + distance_score # Итоговый вес
+
+
+    def _place_wardrobe_bounded(self, width: int, height: int, door_clearance: int) -> Optional[Tuple[int, int]]:
+        """Перебор place_wardrobe с отсечением позиций по верхней границе оценки.
+
+        Расстояния до занятых клеток и бонус за стену в границе точные, поэтому
+        отсеченные позиции не проверяются ни на место для дверей, ни по сумме весов."""
+        rows, cols = self.grid_height - height + 1, self.grid_width - width + 1
+        if rows <= 0 or cols <= 0:
+            return None
+        distances = None
+        occupied = self.grid == 0
+        if occupied.any():
+            distances = vectorized.occupied_distance(occupied, width, height, rows, cols)
+        if distances is None:
+            # Максимальный возможный при пустой сетке
+            distances = np.full((rows, cols), float(self.grid_width + self.grid_height))
+        wall_score = 5.0 / (1 + vectorized.wall_distance(self.grid_width, self.grid_height, width, height, rows, cols))
+        bounds = self._area_bounds(width, height, rows, cols) + wall_score + distances
+        rejected = 0
+
+        def evaluate(x: int, y: int) -> Optional[float]:
+            nonlocal rejected
+            score = self._wardrobe_score(x, y, width, height, door_clearance, distances[y, x])
+            if score is None:
+                rejected += 1
+            return score
+
+        best_position, evaluated = vectorized.bounded_search(bounds, evaluate)
+        self._count("place_wardrobe", rejected_clearance=rejected, pruned=bounds.size - evaluated)
+        return best_position
+
+
+    def _influence_blocks(self):
+        """Статические веса ленивой сетки в областях влияния препятствий частями плиток: (y_start, x_start, веса).
+
+        Вне этих областей препятствия не меняют веса, и они равны 1, поэтому
+        нулевые и наибольшие веса ищутся только здесь, не читая всю сетку."""
+        for region in self._influence_regions():
+            yield from self.base_weights.blocks(region)
+
+
+    def _influence_regions(self) -> List[Tuple[int, int, int, int]]:
+        """Области влияния препятствий в пределах сетки: y_start, y_end, x_start, x_end."""
+        if self.influence_radius is None:
+            return []  # Веса еще не рассчитаны и везде равны 1
+        regions = []
+        for (obj_x, obj_y, obj_w, obj_h), kind in self._field_obstacles():
+            radius = self.influence_radius if kind.radius is None else kind.radius
+            regions.append((max(0, obj_y - radius), min(self.grid_height, obj_y + obj_h + radius),
+                            max(0, obj_x - radius), min(self.grid_width, obj_x + obj_w + radius)))
+        return regions
+
+
+    def _tiled_area_bounds(self, blocks: pyramid.Blocks, width: int, height: int,
+                           weight_bound: float, tolerance: float) -> np.ndarray:
+        """Верхняя граница суммы весов под мебелью для блоков позиций ленивой сетки.
+
+        Вне областей влияния препятствий веса равны 0 или 1 и суммируются
+        точно, поэтому запас на погрешность нужен только блокам, позиции
+        которых задевают эти области."""
+        near = np.zeros(blocks.shape, dtype=bool)
+        for y_start, y_end, x_start, x_end in self._influence_regions():
+            near |= ((blocks.y_first[:, None] < y_end) & (blocks.y_last[:, None] + height > y_start)
+                     & (blocks.x_first[None, :] < x_end) & (blocks.x_last[None, :] + width > x_start))
+        return width * height * weight_bound + np.where(near, tolerance, 0.0)
+
+
+    def _weight_bound(self) -> float:
+        """Верхняя граница весов ленивой сетки (наибольший вес, не меньше 1)."""
+        return max([1.0] + [float(block.max()) for _, _, block in self._influence_blocks() if block.size])
+
+
+    def _occupied_index(self) -> SpatialIndex:
+        """Занятые клетки ленивой сетки (где итоговый вес равен 0) в пространственном индексе.
+
+        Это области мебели из furniture_index с отступом empty и отрезки строк
+        с нулевым статическим весом в областях влияния дверей, окон и других
+        препятствий. Прямоугольников намного меньше, чем клеток в них, а запросы
+        к индексу просматривают только прямоугольники рядом с позициями."""
+        index = SpatialIndex(self.base_weights.tile_size)
+        rects = []
+        for _, position in self.furniture_index.items():
+            y_start, y_end, x_start, x_end = self._footprint(*position)
+            rects.append((x_start, y_start, x_end - x_start, y_end - y_start))
+        for block_y, block_x, block in self._influence_blocks():
+            zero = block == 0
+            for y in np.flatnonzero(zero.any(axis=1)):
+                row = np.concatenate(([False], zero[y], [False]))
+                edges = np.flatnonzero(row[1:] != row[:-1])
+                rects += [(block_x + x_start, block_y + y, x_end - x_start, 1)
+                          for x_start, x_end in zip(edges[::2], edges[1::2])]
+        for number, rect in enumerate(rects):
+            index.insert(str(number), rect)
+        return index
+
+
+    def _distance_bound(self, index: SpatialIndex, width: int, height: int,
+                        y_start: int, y_end: int, x_start: int, x_end: int) -> float:
+        """Верхняя граница расстояния до занятых клеток для позиций [y_start, y_end) x [x_start, x_end).
+
+        Расстояние любой позиции не больше расстояния первой позиции до ближайшего
+        прямоугольника индекса (index.nearest) плюс смещение до первой позиции."""
+        if len(index) == 0:
+            return float(self.grid_width + self.grid_height)  # Максимальный возможный при пустой сетке
+        _, distance = index.nearest(x_start + width / 2, y_start + height / 2)
+        # Запас в клетку покрывает погрешность округления расстояний
+        return distance + (y_end - y_start - 1) + (x_end - x_start - 1) + 1
+
+
+    def _occupied_distances(self, index: SpatialIndex, width: int, height: int,
+                            y_start: int, y_end: int, x_start: int, x_end: int) -> np.ndarray:
+        """Расстояния от центров мебели до занятых клеток для позиций [y_start, y_end) x [x_start, x_end).
+
+        Ближайшие прямоугольники всех позиций лежат не дальше _distance_bound
+        от них, поэтому расстояния считаются только до прямоугольников,
+        пересекающих область позиций, расширенную на эту границу. Результат
+        совпадает с scoring.occupied_distance."""
+        rows, cols = y_end - y_start, x_end - x_start
+        radius = self._distance_bound(index, width, height, y_start, y_end, x_start, x_end)
+        if len(index) == 0:
+            return np.full((rows, cols), radius)
+        left = int(np.floor(x_start + width / 2 - radius))
+        top = int(np.floor(y_start + height / 2 - radius))
+        right = int(np.ceil(x_end - 1 + width / 2 + radius))
+        bottom = int(np.ceil(y_end - 1 + height / 2 + radius))
+        rects = np.array([index[name] for name in index.overlapping(left, top, right - left + 1, bottom - top + 1)],
+                         dtype=np.int64).reshape(-1, 4)
+        centers_x = np.arange(x_start, x_end) + width / 2
+        return np.array([nearest_distances(rects, centers_x, y + height / 2) for y in range(y_start, y_end)])
+
+
+    def _place_wardrobe_vectorized(self, width: int, height: int, door_clearance: int) -> Optional[Tuple[int, int]]:
+        """Векторизованный вариант перебора в place_wardrobe."""
+        rows = self.grid_height - height + 1
+        cols = self.grid_width - width + 1
+        if rows <= 0 or cols <= 0:
+            return None
+        area_weights, exact = self.integral.window_sums_exact(width, height)
+        dist_to_wall = vectorized.wall_distance(self.grid_width, self.grid_height, width, height, rows, cols)
+        occupied = self.grid == 0
+        if occupied.any():
+            distance_score = vectorized.occupied_distance(occupied, width, height, rows, cols)
+        else:
+            distance_score = self.grid_width + self.grid_height
+        scores = area_weights + 5.0 / (1 + dist_to_wall) + distance_score
+        valid = vectorized.clearance_valid(self.grid, width, height, door_clearance, rows, cols)
+        scores[~valid] = -np.inf
+        self._count("place_wardrobe", rejected_clearance=int(valid.size - np.count_nonzero(valid)))
+
+        def rescore(x: int, y: int) -> Optional[float]:
+            distance = distance_score[y, x] if np.ndim(distance_score) else distance_score
+            return self._wardrobe_score(x, y, width, height, door_clearance, distance)
+
+        return vectorized.settle_map(scores, exact, self._tolerance(width, height, float(self.grid.max())), rescore)
+
+
+    def _place_wardrobe_pyramid(self, width: int, height: int,
+                                door_clearance: int) -> Tuple[Optional[Tuple[int, int]], int]:
+        """Перебор place_wardrobe от грубого уровня к точному; возвращает позицию и число оцененных позиций."""
+        rows = self.grid_height - height + 1
+        cols = self.grid_width - width + 1
+        if rows <= 0 or cols <= 0:
+            return None, 0
+        blocks = pyramid.Blocks(rows, cols, self.pyramid_factor)
+        max_weight = float(self.grid.max())
+        tolerance = self._tolerance(width, height, max_weight)
+        bounds = pyramid.area_bounds(self.integral, blocks, width, height, max_weight, tolerance)
+        bounds = bounds + pyramid.wall_bonus_bounds(blocks, self.grid_width, self.grid_height, width, height)
+        occupied = self.grid == 0
+        nearest = None
+        if occupied.any():
+            bounds = bounds + pyramid.distance_bounds(occupied, blocks, width, height)
+            nearest = vectorized.nearest_occupied(occupied)
+        else:
+            bounds = bounds + (self.grid_width + self.grid_height)
+        negative = bool((self.grid < 0).any())
+
+        def score_block(y_start: int, y_end: int, x_start: int, x_end: int) -> Tuple[np.ndarray, np.ndarray]:
+            block_rows, block_cols = y_end - y_start, x_end - x_start
+            area_weights, exact = self.integral.region_sums_exact(width, height, y_start, y_end, x_start, x_end)
+            dist_to_wall = vectorized.wall_distance(self.grid_width, self.grid_height, width, height,
+                                                    block_rows, block_cols, x_start, y_start)
+            if nearest is not None:
+                distance_score = vectorized.occupied_distance(occupied, width, height, block_rows, block_cols,
+                                                              x_start, y_start, nearest)
+            else:
+                distance_score = self.grid_width + self.grid_height
+            scores = area_weights + 5.0 / (1 + dist_to_wall) + distance_score
+            if negative:
+                valid = vectorized.clearance_valid(self.grid, width, height, door_clearance,
+                                                   block_rows, block_cols, x_start, y_start)
+                scores[~valid] = -np.inf
+            return scores, exact
+
+        def rescore(x: int, y: int) -> Optional[float]:
+            if nearest is None:
+                distance = self.grid_width + self.grid_height
+            else:
+                distance = vectorized.occupied_distance(occupied, width, height, 1, 1, x, y, nearest)[0, 0]
+            return self._wardrobe_score(x, y, width, height, door_clearance, distance)
+
+        return pyramid.search(bounds, blocks, score_block, self.pyramid_k, self.pyramid_exact,
+                              lambda: self._place_wardrobe_vectorized(width, height, door_clearance),
+                              tolerance, rescore)
+
+
+    def _place_wardrobe_tiled(self, width: int, height: int, door_clearance: int) -> Optional[Tuple[int, int]]:
+        """Перебор place_wardrobe в ленивой сетке блоками позиций tile_size x tile_size.
+
+        Как и в _place_furniture_tiled, оценки блока считаются по таблице сумм
+        его области, а с prune=True блоки перебираются по верхним границам;
+        граница расстояния до занятых клеток - _distance_bound блока."""
+        rows = self.grid_height - height + 1
+        cols = self.grid_width - width + 1
+        if rows <= 0 or cols <= 0:
+            return None
+        blocks = pyramid.Blocks(rows, cols, self.base_weights.tile_size)
+        occupied_index = self._occupied_index()
+        weight_bound = self._weight_bound()
+        tolerance = self._tolerance(width, height, weight_bound)
+        if self.prune:
+            bounds = self._tiled_area_bounds(blocks, width, height, weight_bound, tolerance)
+            bounds = bounds + pyramid.wall_bonus_bounds(blocks, self.grid_width, self.grid_height, width, height)
+            bounds += np.array([self._distance_bound(occupied_index, width, height, *blocks.bounds(index))
+                                for index in range(bounds.size)]).reshape(blocks.shape)
+        else:
+            bounds = np.full(blocks.shape, np.inf)
+        rejected = 0
+
+        def score_block(y_start: int, y_end: int, x_start: int, x_end: int) -> Tuple[np.ndarray, np.ndarray]:
+            nonlocal rejected
+            block_rows, block_cols = y_end - y_start, x_end - x_start
+            # Область сетки под мебелью всех позиций блока вместе с местом для дверей
+            region_y_start = max(0, y_start - door_clearance)
+            region_y_end = min(self.grid_height, y_end - 1 + height + door_clearance)
+            region_x_start = max(0, x_start - door_clearance)
+            region_x_end = min(self.grid_width, x_end - 1 + width + door_clearance)
+            region = self.grid[region_y_start:region_y_end, region_x_start:region_x_end]
+            offset_y, offset_x = y_start - region_y_start, x_start - region_x_start
+            integral = IntegralGrid(region, lean=True)
+            area_weights, exact = integral.region_sums_exact(width, height, offset_y, offset_y + block_rows,
+                                                             offset_x, offset_x + block_cols)
+            dist_to_wall = vectorized.wall_distance(self.grid_width, self.grid_height, width, height,
+                                                    block_rows, block_cols, x_start, y_start)
+            distance_score = self._occupied_distances(occupied_index, width, height, y_start, y_end, x_start, x_end)
+            scores = area_weights + 5.0 / (1 + dist_to_wall) + distance_score
+            # Область с местом для дверей обрезана только краями сетки, поэтому проверка совпадает с плотной
+            valid = vectorized.clearance_valid(region, width, height, door_clearance, block_rows, block_cols,
+                                               offset_x, offset_y)
+            scores[~valid] = -np.inf
+            rejected += int(valid.size - np.count_nonzero(valid))
+            return scores, exact
+
+        def rescore(x: int, y: int) -> Optional[float]:
+            distance = self._occupied_distances(occupied_index, width, height, y, y + 1, x, x + 1)[0, 0]
+            return self._wardrobe_score(x, y, width, height, door_clearance, distance)
+
+        best_position, evaluated = pyramid.search(bounds, blocks, score_block, 1, True, None, tolerance, rescore)
+        self._count("place_wardrobe", rejected_clearance=rejected, pruned=rows * cols - evaluated)
+        return best_position
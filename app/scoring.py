@@ -0,0 +1,214 @@
+"""Векторизованный подсчет оценок для всех положений мебели сразу.
+
+Каждая функция возвращает карту размера (число позиций по y, число позиций по x),
+элемент [y, x] которой совпадает со значением, которое циклы RoomPlanner
+вычисляют для позиции (x, y). Смещения x_start и y_start задают левый верхний
+угол окна позиций, если карта нужна не для всей комнаты."""
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+
+
+def best_position(scores: np.ndarray) -> Optional[Tuple[int, int]]:
+    """Выбирает позицию с максимальной оценкой.
+
+    np.argmax возвращает первый максимум в порядке строк, что совпадает
+    с построчным перебором и строгим сравнением в циклах."""
+    if scores.size == 0:
+        return None
+    index = int(np.argmax(scores))
+    if scores.flat[index] == -np.inf:
+        return None
+    y, x = divmod(index, scores.shape[1])
+    return x, y
+
+
+def window_bonus(windows: List[Tuple[int, int, int, int]], scores: np.ndarray,
+                 x_start: int = 0, y_start: int = 0) -> None:
+    """Добавляет к оценкам бонус за близость к окнам (prefer_window)."""
+    rows, cols = scores.shape
+    y = y_start + np.arange(rows)[:, None]
+    x = x_start + np.arange(cols)[None, :]
+    for window_x, window_y, window_w, window_h in windows:
+        dist_x = np.maximum(0, np.maximum(window_x - x, x - (window_x + window_w)))
+        dist_y = np.maximum(0, np.maximum(window_y - y, y - (window_y + window_h)))
+        distance = np.sqrt(dist_x**2 + dist_y**2)
+        # Чем ближе к окну, тем лучше
+        scores += np.where(distance <= 5, 20.0 / (1 + distance), 0.0)
+
+
+def wall_distance(grid_width: int, grid_height: int, width: int, height: int, rows: int, cols: int,
+                  x_start: int = 0, y_start: int = 0) -> np.ndarray:
+    """Расстояние от каждой позиции мебели до ближайшей стены."""
+    y = y_start + np.arange(rows)[:, None]
+    x = x_start + np.arange(cols)[None, :]
+    dist_x = np.minimum(x, grid_width - (x + width))
+    dist_y = np.minimum(y, grid_height - (y + height))
+    return np.minimum(dist_x, dist_y)
+
+
+def clearance_valid(grid: np.ndarray, width: int, height: int, clearance: int, rows: int, cols: int,
+                    x_start: int = 0, y_start: int = 0) -> np.ndarray:
+    """Маска позиций, вокруг которых нет клеток с отрицательным весом."""
+    negative = grid < 0
+    if not negative.any():
+        return np.ones((rows, cols), dtype=bool)
+    grid_height, grid_width = grid.shape
+    table = np.zeros((grid_height + 1, grid_width + 1), dtype=np.int64)
+    np.cumsum(np.cumsum(negative, axis=0), axis=1, out=table[1:, 1:])
+    y = y_start + np.arange(rows)[:, None]
+    x = x_start + np.arange(cols)[None, :]
+    y_start = np.maximum(0, y - clearance)
+    y_end = np.minimum(grid_height, y + height + clearance)
+    x_start = np.maximum(0, x - clearance)
+    x_end = np.minimum(grid_width, x + width + clearance)
+    counts = table[y_end, x_end] - table[y_start, x_end] - table[y_end, x_start] + table[y_start, x_start]
+    return counts == 0
+
+
+def nearest_occupied(occupied: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Для каждой клетки - строка ближайшей занятой клетки того же столбца сверху и снизу.
+
+    Строки без занятых клеток заменяются заглушкой, заведомо дальше любой клетки.
+    Нижний массив дополнен строкой заглушек: для мебели высотой в одну клетку
+    центр может лежать на нижней границе сетки."""
+    grid_height, grid_width = occupied.shape
+    far = 2 * (grid_height + grid_width) + 4
+    row_index = np.arange(grid_height)[:, None]
+    prev_occupied = np.maximum.accumulate(np.where(occupied, row_index, -far), axis=0)
+    next_occupied = np.minimum.accumulate(np.where(occupied, row_index, far)[::-1], axis=0)[::-1]
+    next_occupied = np.vstack([next_occupied, np.full((1, grid_width), far)])
+    return prev_occupied, next_occupied
+
+
+def occupied_distance(occupied: np.ndarray, width: int, height: int, rows: int, cols: int,
+                      x_start: int = 0, y_start: int = 0,
+                      nearest: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> np.ndarray:
+    """Минимальное евклидово расстояние от центра мебели до занятых клеток.
+
+    Точное преобразование расстояний в два прохода: сначала по столбцам
+    ищется ближайшая занятая клетка сверху и снизу от центра, затем по строкам
+    перебираются сдвиги в порядке роста горизонтального расстояния, пока они
+    могут что-то улучшить. Вычисления ведутся в удвоенных целых координатах,
+    поэтому результат совпадает с перебором по np.argwhere(occupied).
+
+    nearest - заранее посчитанный nearest_occupied(occupied), чтобы не повторять
+    проход по столбцам для нескольких окон позиций."""
+    grid_height, grid_width = occupied.shape
+    # Заглушка для столбцов без занятых клеток, заведомо больше любого расстояния
+    far = 2 * (grid_height + grid_width) + 4
+    prev_occupied, next_occupied = nearest if nearest is not None else nearest_occupied(occupied)
+    # Удвоенная координата центра по вертикали для каждой позиции: 2*y + height
+    y = y_start + np.arange(rows)
+    center_y2 = 2 * y[:, None] + height
+    y_floor = y + height // 2
+    y_ceil = y + (height + 1) // 2
+    vertical = np.minimum(center_y2 - 2 * prev_occupied[y_floor], 2 * next_occupied[y_ceil] - center_y2)
+    vertical = vertical.astype(np.int64) ** 2
+    # Проход по строкам: сдвиг столбца k относительно x дает вклад (2k - width)^2
+    best = np.full((rows, cols), far**2 * 2, dtype=np.int64)
+    shifts = sorted(range(-(x_start + cols - 1), grid_width - x_start), key=lambda k: abs(2 * k - width))
+    for k in shifts:
+        horizontal = (2 * k - width) ** 2
+        if horizontal >= best.max():
+            break
+        # Позиции x_start + j, у которых столбец x_start + j + k лежит в сетке
+        j_start = max(0, -k - x_start)
+        j_end = min(cols, grid_width - k - x_start)
+        if j_start >= j_end:
+            continue
+        np.minimum(best[:, j_start:j_end], vertical[:, x_start + j_start + k:x_start + j_end + k] + horizontal,
+                   out=best[:, j_start:j_end])
+    return np.sqrt(best) / 2
+
+
+def window_counts(mask: np.ndarray, width: int, height: int, rows: int, cols: int) -> np.ndarray:
+    """Число истинных клеток mask под мебелью для каждой позиции."""
+    grid_height, grid_width = mask.shape
+    table = np.zeros((grid_height + 1, grid_width + 1), dtype=np.int64)
+    np.cumsum(np.cumsum(mask, axis=0), axis=1, out=table[1:, 1:])
+    return (table[height:height + rows, width:width + cols] - table[:rows, width:width + cols]
+            - table[height:height + rows, :cols] + table[:rows, :cols])
+
+
+def free_counts(grid: np.ndarray, width: int, height: int, rows: int, cols: int) -> np.ndarray:
+    """Число клеток с ненулевым весом под мебелью для каждой позиции.
+
+    Умноженное на наибольший вес сетки, оно ограничивает сверху сумму
+    весов под мебелью (с точностью до погрешности суммирования)."""
+    return window_counts(grid != 0, width, height, rows, cols)
+
+
+def settle(ys: np.ndarray, xs: np.ndarray, scores: np.ndarray, exact: np.ndarray, tolerance: float,
+           rescore: Callable[[int, int], Optional[float]]) -> Optional[Tuple[int, int]]:
+    """Лучшая позиция среди кандидатов (xs, ys) по оценкам перебора срезов.
+
+    scores - оценки кандидатов по таблице сумм; там, где exact ложно, они
+    отличаются от оценок перебора не больше чем на tolerance. Оценки,
+    которые еще могут оказаться лучшими, пересчитываются rescore(x, y)
+    (None - позиция отклонена), остальные кандидаты отбрасываются.
+    При равных оценках побеждает позиция, идущая раньше в порядке строк."""
+    if scores.size == 0:
+        return None
+    slack = np.where(exact, 0.0, tolerance)
+    # Нижняя граница лучшей оценки перебора
+    least = np.max(scores - slack)
+    if least == -np.inf:
+        return None
+    keep = scores + slack >= least
+    ys, xs, scores, exact = ys[keep], xs[keep], scores[keep].astype(np.float64), exact[keep]
+    for index in np.flatnonzero(~exact):
+        score = rescore(int(xs[index]), int(ys[index]))
+        scores[index] = -np.inf if score is None else score
+    order = np.lexsort((xs, ys))
+    index = order[int(np.argmax(scores[order]))]
+    if scores[index] == -np.inf:
+        return None
+    return int(xs[index]), int(ys[index])
+
+
+def settle_map(scores: np.ndarray, exact: np.ndarray, tolerance: float,
+               rescore: Callable[[int, int], Optional[float]]) -> Optional[Tuple[int, int]]:
+    """best_position для карты оценок по таблице сумм с уточнением почти равных оценок (settle)."""
+    if exact.all() or scores.size == 0:
+        return best_position(scores)
+    slack = np.where(exact, 0.0, tolerance)
+    ys, xs = np.nonzero(scores + slack >= np.max(scores - slack))
+    return settle(ys, xs, scores[ys, xs], exact[ys, xs], tolerance, rescore)
+
+
+def bounded_search(bounds: np.ndarray,
+                   evaluate: Callable[[int, int], Optional[float]]) -> Tuple[Optional[Tuple[int, int]], int]:
+    """Перебор позиций с отсечением по верхним границам оценок (метод ветвей и границ).
+
+    evaluate(x, y) возвращает оценку позиции, не большую bounds[y, x],
+    или None, если позиция отклонена. Позиции перебираются от больших
+    границ к меньшим, при равных границах - в порядке строк. Перебор
+    останавливается на первой позиции, граница которой меньше лучшей
+    оценки или равна ей, но позиция идет позже лучшей в порядке строк:
+    остальные позиции не могут ее превзойти. Поэтому результат совпадает
+    с построчным перебором со строгим сравнением.
+
+    Возвращает позицию и число оцененных позиций; остальные отсечены."""
+    flat = bounds.ravel()
+    order = np.argsort(-flat, kind="stable").tolist()
+    flat = flat.tolist()
+    cols = bounds.shape[1]
+    best_score = -np.inf
+    best_index = -1
+    evaluated = 0
+    for index in order:
+        bound = flat[index]
+        if bound < best_score or (bound == best_score and index > best_index):
+            break
+        evaluated += 1
+        y, x = divmod(index, cols)
+        score = evaluate(x, y)
+        if score is None:
+            continue
+        if score > best_score or (score == best_score and index < best_index):
+            best_score = score
+            best_index = index
+    if best_index < 0:
+        return None, evaluated
+    y, x = divmod(best_index, cols)
+    return (x, y), evaluated
@@ -0,0 +1,158 @@
+"""Асинхронный сервис планирования для веб-обработчиков.
+
+Планировщик - долгие вычисления на процессоре, поэтому сервис выполняет
+их в ограниченном пуле процессов, а цикл событий только ждет результатов:
+
+    async with PlanningService(workers=4, max_pending=64) as service:
+        result = await service.plan(spec)          # PlanResult
+        png = await service.image(spec)            # PNG, рисуется по запросу
+
+Спецификация - словарь в формате run_test_case из test.py (room_size,
+doors, windows, furniture_list и необязательный cell_size).
+
+Одновременные запросы одинаковых комнат (одинаковый ключ cache.spec_key)
+объединяются: считается одна задача, и все запросы получают ее результат.
+Готовые результаты не хранятся - для этого есть PlanCache, его можно
+передать в cache. Обращения к кэшу (SQLite) выполняются в потоках,
+а не в цикле событий; результат общей задачи сохраняет сама задача,
+один раз для всех объединенных запросов.
+
+Число разных задач в работе и в очереди пула ограничено max_pending.
+Когда очередь заполнена, новый запрос ждет освобождения места не дольше
+queue_timeout секунд (None - без ограничения, 0 - не ждет) и затем
+получает ServiceBusy; обработчик может ответить на него кодом 503."""
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.batch import PlanResult, plan_result, plan_room, validate_spec
+from app.cache import PlanCache, spec_key
+
+
+class ServiceBusy(RuntimeError):
+    """Очередь сервиса заполнена, запрос не принят."""
+
+
+def _plan(spec: dict, planner_options: dict) -> PlanResult:
+    return plan_result(0, spec, **planner_options)
+
+
+def _render(spec: dict, planner_options: dict) -> bytes:
+    from app.visualizer import render_png
+
+    return render_png(plan_room(spec, **planner_options))
+
+
+class PlanningService:
+    """Планирование комнат в пуле процессов с объединением одинаковых запросов.
+
+    planner_options (scoring, lean, ...) передаются в RoomPlanner для всех
+    комнат. Счетчики работы сервиса - в self.counters: requests (запросы),
+    computations (задачи пула), coalesced (запросы, получившие результат
+    чужой задачи), cache_hits и rejected (отказы ServiceBusy)."""
+
+    def __init__(self, workers: Optional[int] = None, max_pending: int = 64,
+                 queue_timeout: Optional[float] = None, cache: Optional[PlanCache] = None,
+                 **planner_options) -> None:
+        if max_pending < 1:
+            raise ValueError("max_pending должен быть положительным")
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self.cache = cache
+        self.planner_options = planner_options
+        self.counters = dict.fromkeys(("requests", "computations", "coalesced", "cache_hits", "rejected"), 0)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._running: Dict[tuple, asyncio.Future] = {}
+
+    async def start(self) -> None:
+        """Запускает пул процессов; вызывается автоматически в async with."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            self._slots = asyncio.Semaphore(self.max_pending)
+
+    async def close(self) -> None:
+        """Дожидается задач пула и останавливает его."""
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+    async def __aenter__(self) -> "PlanningService":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    @property
+    def pending(self) -> int:
+        """Число разных задач в работе и в очереди пула."""
+        return len(self._running)
+
+    async def plan(self, spec: dict) -> PlanResult:
+        """Планирует комнату и возвращает позиции мебели и неудачи."""
+        validate_spec(spec)
+        self.counters["requests"] += 1
+        if self.cache is None:
+            return await self._submit("plan", spec, _plan)
+        cached = await asyncio.get_running_loop().run_in_executor(None, self.cache.get, spec)
+        if cached is not None:
+            self.counters["cache_hits"] += 1
+            return cached
+        return await self._submit("plan", spec, _plan, self.cache.put)
+
+    async def image(self, spec: dict) -> bytes:
+        """Планирует и рисует комнату; возвращает PNG.
+
+        Изображение рисуется только по этому запросу и в процессе пула,
+        поэтому plan не тратит время на отрисовку."""
+        validate_spec(spec)
+        self.counters["requests"] += 1
+        return await self._submit("image", spec, _render)
+
+    async def _compute(self, function: Callable, spec: dict, store: Optional[Callable]) -> Any:
+        """Общая задача: вычисление в пуле и, если задан store, сохранение результата в потоке."""
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(self._executor, function, spec, self.planner_options)
+        if store is not None:
+            await loop.run_in_executor(None, store, spec, result)
+        return result
+
+    async def _submit(self, kind: str, spec: dict, function: Callable, store: Optional[Callable] = None) -> Any:
+        if self._executor is None:
+            raise RuntimeError("Сервис не запущен: используйте async with PlanningService(...)")
+        key = (kind, spec_key(spec)[0])
+        running = self._running.get(key)
+        if running is not None:
+            self.counters["coalesced"] += 1
+            # shield: отмена одного из ожидающих запросов не отменяет общую задачу
+            return await asyncio.shield(running)
+        if not self._slots.locked():
+            await self._slots.acquire()
+        else:
+            try:
+                if self.queue_timeout == 0:
+                    raise asyncio.TimeoutError
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.counters["rejected"] += 1
+                raise ServiceBusy(f"В очереди уже {self.max_pending} задач") from None
+        # Пока запрос ждал места, такую же задачу мог запустить другой запрос
+        running = self._running.get(key)
+        if running is not None:
+            self._slots.release()
+            self.counters["coalesced"] += 1
+            return await asyncio.shield(running)
+        self.counters["computations"] += 1
+        future = asyncio.ensure_future(self._compute(function, spec, store))
+        self._running[key] = future
+
+        def finished(_) -> None:
+            del self._running[key]
+            self._slots.release()
+
+        future.add_done_callback(finished)
+        return await asyncio.shield(future)
+
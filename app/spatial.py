@@ -0,0 +1,203 @@
+"""Пространственный индекс расставленной мебели.
+
+Прямоугольники (x, y, w, h) в клетках раскладываются по корзинам
+равномерной сетки со стороной bucket_size клеток; прямоугольник,
+накрывающий несколько корзин, попадает в каждую из них. Запросы
+просматривают только корзины рядом с точкой или областью запроса,
+поэтому их время зависит от числа предметов поблизости, а не от числа
+всех предметов и не от размера комнаты.
+
+Расстояние от точки до прямоугольника - расстояние до ближайшей клетки
+прямоугольника (клетки имеют целые координаты x .. x + w - 1). Оно
+точное, как и scoring.occupied_distance, поэтому place_wardrobe в ленивой
+сетке, где занятые клетки собраны в такой индекс, находит те же расстояния,
+что и в плотной, без погрешности."""
+import math
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+import numpy as np
+
+Rect = Tuple[int, int, int, int]
+
+
+def _axis_distance(value: float, start: int, end: int) -> float:
+    """Расстояние по оси от value до ближайшей целой координаты из start .. end - 1."""
+    if value <= start:
+        return start - value
+    if value >= end - 1:
+        return value - (end - 1)
+    return min(value - math.floor(value), math.ceil(value) - value)
+
+
+def rect_distance(rect: Rect, x: float, y: float) -> float:
+    """Расстояние от точки (x, y) до ближайшей клетки прямоугольника rect."""
+    rect_x, rect_y, width, height = rect
+    dist_x = _axis_distance(x, rect_x, rect_x + width)
+    dist_y = _axis_distance(y, rect_y, rect_y + height)
+    return math.sqrt(dist_x ** 2 + dist_y ** 2)
+
+
+def _axis_distances(values: np.ndarray, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    """_axis_distance для массивов: values по первой оси, отрезки start .. end - 1 по второй."""
+    values = values[:, None]
+    inner = np.minimum(values - np.floor(values), np.ceil(values) - values)
+    return np.where(values <= start, start - values, np.where(values >= end - 1, values - (end - 1), inner))
+
+
+def nearest_distances(rects: np.ndarray, xs: np.ndarray, y: float) -> np.ndarray:
+    """Расстояние от каждой точки (xs[i], y) до ближайшей клетки прямоугольников rects.
+
+    rects - массив (n, 4) строк x, y, w, h; n должно быть больше нуля.
+    Результат совпадает с rect_distance до ближайшего прямоугольника."""
+    dist_x = _axis_distances(xs, rects[:, 0], rects[:, 0] + rects[:, 2])
+    dist_y = _axis_distances(np.array([y], dtype=np.float64), rects[:, 1], rects[:, 1] + rects[:, 3])
+    return np.sqrt(dist_x ** 2 + dist_y ** 2).min(axis=1)
+
+
+class SpatialIndex:
+    """Индекс прямоугольников по именам с запросами ближайшего, в радиусе и пересечения.
+
+        index = SpatialIndex()
+        index.insert("Кровать", (2, 3, 10, 9))
+        index.nearest(0, 0)            # ("Кровать", 3.605...)
+        index.within(5, 5, radius=2)   # ["Кровать"]
+        index.overlapping(0, 0, 4, 4)  # ["Кровать"]"""
+    __slots__ = ("bucket_size", "_items", "_buckets")
+
+    def __init__(self, bucket_size: int = 8) -> None:
+        if bucket_size < 1:
+            raise ValueError("bucket_size должен быть положительным")
+        self.bucket_size = bucket_size
+        self._items: Dict[str, Rect] = {}
+        self._buckets: Dict[Tuple[int, int], Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._items
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._items)
+
+    def __getitem__(self, name: str) -> Rect:
+        return self._items[name]
+
+    def get(self, name: str, default=None) -> Optional[Rect]:
+        return self._items.get(name, default)
+
+    def items(self):
+        return self._items.items()
+
+    def copy(self) -> "SpatialIndex":
+        index = SpatialIndex(self.bucket_size)
+        index._items = dict(self._items)
+        index._buckets = {key: set(names) for key, names in self._buckets.items()}
+        return index
+
+    def _keys(self, x: int, y: int, width: int, height: int) -> Iterator[Tuple[int, int]]:
+        """Корзины, которые накрывает прямоугольник."""
+        size = self.bucket_size
+        for bucket_y in range(y // size, (y + max(height, 1) - 1) // size + 1):
+            for bucket_x in range(x // size, (x + max(width, 1) - 1) // size + 1):
+                yield bucket_x, bucket_y
+
+    def insert(self, name: str, rect: Rect) -> None:
+        """Добавляет прямоугольник; прежний прямоугольник с тем же именем заменяется."""
+        if name in self._items:
+            self.remove(name)
+        rect = tuple(int(value) for value in rect)
+        self._items[name] = rect
+        for key in self._keys(*rect):
+            self._buckets.setdefault(key, set()).add(name)
+
+    def remove(self, name: str) -> Rect:
+        """Убирает прямоугольник из индекса и возвращает его."""
+        rect = self._items.pop(name)
+        for key in self._keys(*rect):
+            names = self._buckets[key]
+            names.discard(name)
+            if not names:
+                del self._buckets[key]
+        return rect
+
+    def sync(self, rects: Dict[str, Rect]) -> None:
+        """Приводит индекс в соответствие со словарем rects, меняя только отличающиеся записи."""
+        for name in [name for name, rect in self._items.items() if rects.get(name) != rect]:
+            self.remove(name)
+        for name, rect in rects.items():
+            if name not in self._items:
+                self.insert(name, rect)
+
+    def _candidates(self, x_start: int, y_start: int, x_end: int, y_end: int) -> Set[str]:
+        """Имена из корзин, накрывающих клетки x_start .. x_end, y_start .. y_end включительно."""
+        size = self.bucket_size
+        names = set()
+        for bucket_y in range(y_start // size, y_end // size + 1):
+            for bucket_x in range(x_start // size, x_end // size + 1):
+                names |= self._buckets.get((bucket_x, bucket_y), set())
+        return names
+
+    def overlapping(self, x: int, y: int, width: int, height: int) -> List[str]:
+        """Имена прямоугольников, пересекающихся с прямоугольником (x, y, width, height), по алфавиту."""
+        if width <= 0 or height <= 0:
+            return []
+        found = []
+        for name in self._candidates(x, y, x + width - 1, y + height - 1):
+            rect_x, rect_y, rect_w, rect_h = self._items[name]
+            if rect_x < x + width and x < rect_x + rect_w and rect_y < y + height and y < rect_y + rect_h:
+                found.append(name)
+        return sorted(found)
+
+    def within(self, x: float, y: float, radius: float) -> List[str]:
+        """Имена прямоугольников не дальше radius от точки (x, y), от ближних к дальним."""
+        if radius < 0:
+            return []
+        candidates = self._candidates(math.floor(x - radius), math.floor(y - radius),
+                                      math.floor(x + radius), math.floor(y + radius))
+        found = [(rect_distance(self._items[name], x, y), name) for name in candidates]
+        return [name for distance, name in sorted(found) if distance <= radius]
+
+    def nearest(self, x: float, y: float) -> Optional[Tuple[str, float]]:
+        """Ближайший к точке (x, y) прямоугольник и расстояние до него; None, если индекс пуст.
+
+        Корзины просматриваются кольцами вокруг корзины точки. Клетки кольца r
+        не ближе (r - 1) * bucket_size, поэтому поиск останавливается, как
+        только эта граница превысит найденное расстояние. Если в очередном
+        кольце корзин больше, чем непустых корзин во всем индексе, оставшиеся
+        прямоугольники проверяются перебором - так запрос в пустой части
+        комнаты не обходит пустые кольца. При равных расстояниях выбирается
+        имя, меньшее по алфавиту."""
+        if not self._items:
+            return None
+        size = self.bucket_size
+        items, buckets = self._items, self._buckets
+        center_x, center_y = math.floor(x) // size, math.floor(y) // size
+        best = None
+        seen = set()
+
+        def check(names) -> None:
+            nonlocal best
+            for name in names:
+                if name in seen:
+                    continue
+                seen.add(name)
+                candidate = (rect_distance(items[name], x, y), name)
+                if best is None or candidate < best:
+                    best = candidate
+
+        check(buckets.get((center_x, center_y), ()))
+        ring = 1
+        while len(seen) < len(items):
+            if best is not None and (ring - 1) * size > best[0]:
+                break
+            if 8 * ring > len(buckets):
+                check(items)
+                break
+            for dy in (-ring, ring):
+                for bucket_x in range(center_x - ring, center_x + ring + 1):
+                    check(buckets.get((bucket_x, center_y + dy), ()))
+            for dx in (-ring, ring):
+                for bucket_y in range(center_y - ring + 1, center_y + ring):
+                    check(buckets.get((center_x + dx, bucket_y), ()))
+            ring += 1
+        return best[1], best[0]
@@ -0,0 +1,105 @@
+"""Сбор статистики работы планировщика: время методов и число проверенных позиций."""
+import functools
+import time
+from typing import Dict, Iterable, Optional
+
+COUNTERS = ("candidates", "rejected_bounds", "rejected_clearance", "pruned")
+
+
+class MethodStats:
+    """Статистика одного метода планировщика."""
+    __slots__ = ("calls", "seconds") + COUNTERS
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.seconds = 0.0
+        self.candidates = 0  # Оцененные позиции мебели
+        self.rejected_bounds = 0  # Позиции, выходящие за пределы комнаты
+        self.rejected_clearance = 0  # Позиции без свободного места для дверей шкафа
+        self.pruned = 0  # Позиции, отсеченные по верхней границе оценки без точного подсчета
+
+    @property
+    def pruned_share(self) -> float:
+        """Доля позиций, отсеченных по верхней границе."""
+        return self.pruned / self.candidates if self.candidates else 0.0
+
+    def as_dict(self) -> dict:
+        data = {field: getattr(self, field) for field in self.__slots__}
+        data["pruned_share"] = self.pruned_share
+        return data
+
+
+class PlannerStats:
+    """Статистика планировщика по методам; складывается по пакету комнат.
+
+    Собирается, только если RoomPlanner создан с collect_stats=True,
+    иначе методы не тратят время на замеры."""
+
+    def __init__(self) -> None:
+        self.methods: Dict[str, MethodStats] = {}
+
+    def _method(self, name: str) -> MethodStats:
+        stats = self.methods.get(name)
+        if stats is None:
+            stats = self.methods[name] = MethodStats()
+        return stats
+
+    def record(self, name: str, seconds: float) -> None:
+        """Учитывает один вызов метода name длительностью seconds."""
+        stats = self._method(name)
+        stats.calls += 1
+        stats.seconds += seconds
+
+    def count(self, name: str, **counters: int) -> None:
+        """Добавляет счетчики позиций (candidates, rejected_bounds, ...) методу name."""
+        stats = self._method(name)
+        for counter, value in counters.items():
+            setattr(stats, counter, getattr(stats, counter) + value)
+
+    def merge(self, other: "PlannerStats") -> "PlannerStats":
+        """Прибавляет статистику другого планировщика."""
+        for name, other_stats in other.methods.items():
+            stats = self._method(name)
+            for field in MethodStats.__slots__:
+                setattr(stats, field, getattr(stats, field) + getattr(other_stats, field))
+        return self
+
+    def as_dict(self) -> dict:
+        """Компактное представление для передачи между процессами и вывода в JSON."""
+        return {name: stats.as_dict() for name, stats in self.methods.items()}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PlannerStats":
+        stats = cls()
+        for name, fields in data.items():
+            method = stats._method(name)
+            for field, value in fields.items():
+                if field in MethodStats.__slots__:  # pruned_share вычисляется
+                    setattr(method, field, value)
+        return stats
+
+    @classmethod
+    def aggregate(cls, items: Iterable[Optional[object]]) -> "PlannerStats":
+        """Суммирует статистику пакета: PlannerStats, словари as_dict() или None."""
+        total = cls()
+        for item in items:
+            if item is None:
+                continue
+            total.merge(item if isinstance(item, PlannerStats) else cls.from_dict(item))
+        return total
+
+
+def timed(method):
+    """Замеряет время метода RoomPlanner, если у планировщика включена статистика."""
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.stats is None:
+            return method(self, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.stats.record(name, time.perf_counter() - start)
+    return wrapper
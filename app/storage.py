@@ -0,0 +1,271 @@
+"""Сохранение расставленных комнат в двоичный архив с отображением в память.
+
+Архив - файл из заголовка и записей, по одной на комнату:
+
+    заголовок файла   MAGIC, версия формата
+    запись            заголовок записи (размер записи, размеры и тип сетки весов),
+                      описание комнаты в JSON (UTF-8),
+                      статические веса сетки как сырой массив (необязательно)
+
+Описание содержит размер комнаты и ячейки, двери, окна и препятствия
+других видов в клетках, отступ empty, радиус влияния, позиции мебели
+в порядке расстановки и неудачи.
+Начало каждого блока выровнено на ALIGNMENT байт, поэтому веса читаются
+из отображенного в память файла без копирования:
+
+    save(planner, "room.rplan")
+    planner = load("room.rplan")
+
+    with LayoutWriter("rooms.rplan") as writer:      # дописывает в конец архива
+        for planner in planners:
+            writer.write(planner)
+
+    archive = LayoutArchive("rooms.rplan")
+    archive[10].furniture_positions                  # читается только описание
+    render_to_file(archive[10].view(), "10.png")
+
+LayoutArchive при открытии читает только заголовки записей; описание
+и веса комнаты разбираются при обращении к ней. Записи, дописанные после
+открытия архива, в нем не видны."""
+import json
+import mmap
+import os
+import struct
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from app.roomplanner import FurnitureRecord, RoomPlanner
+
+MAGIC = b"RPLANARC"
+VERSION = 1
+ALIGNMENT = 64
+
+_FILE_HEADER = struct.Struct("<8sH6x")
+# Метка, длина описания, полная длина записи, высота и ширина сетки весов, тип весов
+_RECORD_HEADER = struct.Struct("<4sIQII1s7x")
+_RECORD_TAG = b"ROOM"
+_DTYPES = {b"d": np.dtype("<f8"), b"f": np.dtype("<f4")}
+_NO_WEIGHTS = b"-"
+
+
+def _padding(size: int) -> int:
+    return -size % ALIGNMENT
+
+
+class StoredLayout(NamedTuple):
+    """Комната из архива: описание и, если сохранены, статические веса (отображение файла)."""
+    room_size: Tuple[int, int]
+    cell_size: int
+    grid_width: int
+    grid_height: int
+    empty: int
+    doors: List[Tuple[int, int, int, int]]  # В клетках, как RoomPlanner.doors
+    windows: List[Tuple[int, int, int, int]]
+    obstacles: List[Tuple[str, Tuple[int, int, int, int]]]  # Препятствия других видов (RoomPlanner.obstacles)
+    influence_radius: Optional[int]
+    furniture_positions: Dict[str, FurnitureRecord]
+    failures: List[str]
+    weights: Optional[np.ndarray]  # Только для чтения
+
+    def planner(self, **planner_options) -> RoomPlanner:
+        """Восстанавливает планировщик; planner_options (scoring, lean, ...) передаются в RoomPlanner.
+
+        Если веса не сохранены, они пересчитываются по препятствиям
+        с сохраненным радиусом влияния; ядра и радиусы видов препятствий
+        кроме дверей и окон не сохраняются и передаются в obstacle_kinds."""
+        planner = RoomPlanner(self.room_size, self.cell_size, [], [], empty=self.empty, **planner_options)
+        if (planner.grid_width, planner.grid_height) != (self.grid_width, self.grid_height):
+            raise ValueError("Размер сетки не соответствует размеру комнаты и ячейки.")
+        planner.doors = list(self.doors)
+        planner.windows = list(self.windows)
+        planner.obstacles = list(self.obstacles)
+        if self.weights is not None:
+            planner.influence_radius = self.influence_radius
+            planner._set_base_weights(self.weights)
+        elif self.influence_radius is not None:
+            planner.calculate_weights(self.influence_radius)
+        for name, (x, y, width, height) in self.furniture_positions.items():
+            planner._update_grid(name, (x, y), width, height)
+        planner.failures = list(self.failures)
+        return planner
+
+    def view(self):
+        """Снимок для отрисовки (visualizer.RoomView) без восстановления планировщика."""
+        from app.visualizer import RoomView
+
+        if self.weights is not None:
+            grid = np.array(self.weights, dtype=np.float64)
+        else:
+            grid = np.ones((self.grid_height, self.grid_width))
+        for x, y, width, height in self.furniture_positions.values():
+            grid[max(0, y - self.empty):y + height + self.empty, max(0, x - self.empty):x + width + self.empty] = 0
+        return RoomView(grid, list(self.doors), list(self.windows),
+                        {name: tuple(position) for name, position in self.furniture_positions.items()})
+
+
+def encode(planner: RoomPlanner, weights: bool = True) -> bytes:
+    """Запись архива для одной комнаты; weights=False не сохраняет сетку весов.
+
+    Запись - обычные байты, поэтому ее можно собрать в процессе пула
+    и передать в LayoutWriter.write."""
+    meta = {
+        "room_size": [planner.room_width, planner.room_height],
+        "cell_size": planner.cell_size,
+        "empty": planner.empty,
+        "doors": [list(door) for door in planner.doors],
+        "windows": [list(window) for window in planner.windows],
+        "obstacles": [[kind, *rect] for kind, rect in planner.obstacles],
+        "influence_radius": planner.influence_radius,
+        "furniture_positions": [[name, *map(int, position)]
+                                for name, position in planner.furniture_positions.items()],
+        "failures": list(planner.failures),
+    }
+    meta_bytes = json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if weights:
+        array = planner.base_weights
+        code = b"f" if array.dtype == np.float32 else b"d"
+        data = np.ascontiguousarray(array, dtype=_DTYPES[code]).tobytes()
+    else:
+        code, data = _NO_WEIGHTS, b""
+    meta_end = _RECORD_HEADER.size + len(meta_bytes)
+    length = meta_end + _padding(meta_end) + len(data)
+    length += _padding(length)
+    header = _RECORD_HEADER.pack(_RECORD_TAG, len(meta_bytes), length, planner.grid_height, planner.grid_width, code)
+    record = header + meta_bytes + bytes(_padding(meta_end)) + data
+    return record + bytes(length - len(record))
+
+
+class LayoutWriter:
+    """Запись комнат в архив; по умолчанию дописывает в конец существующего.
+
+    append=False создает архив заново. Пишет буферизованно, поэтому подходит
+    для пакетной записи большого числа комнат."""
+
+    def __init__(self, path: str, append: bool = True) -> None:
+        exists = append and os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            with open(path, "rb") as file:
+                _read_file_header(file.read(ALIGNMENT))
+        self._file = open(path, "ab" if exists else "wb")
+        if not exists:
+            header = _FILE_HEADER.pack(MAGIC, VERSION)
+            self._file.write(header + bytes(_padding(len(header))))
+        self.count = 0  # Записано комнат этим объектом
+
+    def write(self, room: Union[RoomPlanner, bytes], weights: bool = True) -> None:
+        """Дописывает комнату: планировщик или готовую запись из encode."""
+        self._file.write(room if isinstance(room, bytes) else encode(room, weights))
+        self.count += 1
+
+    def write_many(self, rooms: Iterable[Union[RoomPlanner, bytes]], weights: bool = True) -> int:
+        """Дописывает все комнаты и возвращает их число."""
+        start = self.count
+        for room in rooms:
+            self.write(room, weights)
+        return self.count - start
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "LayoutWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _read_file_header(data: bytes) -> int:
+    if len(data) < _FILE_HEADER.size:
+        raise ValueError("Файл не является архивом комнат.")
+    magic, version = _FILE_HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Файл не является архивом комнат.")
+    if version > VERSION:
+        raise ValueError(f"Версия архива {version} не поддерживается (поддерживается до {VERSION}).")
+    return version
+
+
+class LayoutArchive:
+    """Архив комнат, отображенный в память; archive[i] - StoredLayout i-й записи."""
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as file:
+            _read_file_header(file.read(_FILE_HEADER.size))
+            self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.version = _read_file_header(self._data[:_FILE_HEADER.size])
+        self._offsets: List[int] = []
+        offset = _FILE_HEADER.size + _padding(_FILE_HEADER.size)
+        while offset < len(self._data):
+            if offset + _RECORD_HEADER.size > len(self._data):
+                raise ValueError(f"Архив поврежден: неполная запись по смещению {offset}.")
+            tag, _, length, _, _, _ = _RECORD_HEADER.unpack_from(self._data, offset)
+            if tag != _RECORD_TAG or offset + length > len(self._data):
+                raise ValueError(f"Архив поврежден: неверная запись по смещению {offset}.")
+            self._offsets.append(offset)
+            offset += length
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __getitem__(self, index: int) -> StoredLayout:
+        offset = self._offsets[index]
+        _, meta_length, _, height, width, code = _RECORD_HEADER.unpack_from(self._data, offset)
+        meta_start = offset + _RECORD_HEADER.size
+        meta = json.loads(self._data[meta_start:meta_start + meta_length].decode("utf-8"))
+        weights = None
+        if code != _NO_WEIGHTS:
+            data_start = meta_start + meta_length
+            data_start += _padding(data_start)
+            weights = np.frombuffer(self._data, dtype=_DTYPES[code], count=height * width,
+                                    offset=data_start).reshape(height, width)
+        return StoredLayout(
+            room_size=tuple(meta["room_size"]),
+            cell_size=meta["cell_size"],
+            grid_width=width,
+            grid_height=height,
+            empty=meta["empty"],
+            doors=[tuple(door) for door in meta["doors"]],
+            windows=[tuple(window) for window in meta["windows"]],
+            obstacles=[(kind, tuple(rect)) for kind, *rect in meta.get("obstacles", [])],
+            influence_radius=meta["influence_radius"],
+            furniture_positions={name: FurnitureRecord(*position)
+                                 for name, *position in meta["furniture_positions"]},
+            failures=meta["failures"],
+            weights=weights,
+        )
+
+    def __iter__(self) -> Iterator[StoredLayout]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def close(self) -> None:
+        """Закрывает отображение файла.
+
+        Пока живы массивы весов, полученные из архива, отображение остается
+        открытым и закрывается вместе с последним из них."""
+        try:
+            self._data.close()
+        except BufferError:
+            pass
+
+    def __enter__(self) -> "LayoutArchive":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def save(planner: RoomPlanner, path: str, weights: bool = True) -> None:
+    """Сохраняет одну комнату в новый архив path."""
+    with LayoutWriter(path, append=False) as writer:
+        writer.write(planner, weights)
+
+
+def load(path: str, index: int = 0, **planner_options) -> RoomPlanner:
+    """Восстанавливает планировщик комнаты index из архива path."""
+    archive = LayoutArchive(path)
+    try:
+        return archive[index].planner(**planner_options)
+    finally:
+        archive.close()
@@ -0,0 +1,205 @@
+"""Ленивые сетки для больших комнат (RoomPlanner(lazy=True)).
+
+TiledWeights - статические веса, которые считаются плитками tile_size x tile_size
+только тогда, когда чтение области их затрагивает. Рассчитанные плитки
+хранятся в кэше не больше max_tiles штук; при переполнении вытесняется
+плитка, которую дольше всех не читали, и при следующем чтении считается
+заново. FootprintMask - занятость, которая при чтении области рисуется
+по прямоугольникам мебели из furniture_index. LazyGrid - итоговые веса
+области, собранные из этих двух слоев.
+
+Все три объекта читаются как массивы - парой срезов grid[y_start:y_end, x_start:x_end] -
+и через np.asarray целиком (например, для отрисовки). Поэтому память
+ленивого планировщика ограничена кэшем плиток и не зависит от размера
+комнаты, а методы расстановки работают с ним без изменений. place_furniture
+и place_wardrobe читают сетку не по позициям, а областями блоков позиций
+размером с плитку (RoomPlanner._place_furniture_tiled)."""
+from collections import OrderedDict
+from typing import Callable, Iterator, Optional, Tuple
+import numpy as np
+
+# compute(y_start, y_end, x_start, x_end) -> веса области
+Source = Callable[[int, int, int, int], np.ndarray]
+
+
+def array_region(array: np.ndarray, y_start: int, y_end: int, x_start: int, x_end: int) -> np.ndarray:
+    """Источник плиток из готового массива (например, весов из архива, отображенного в память)."""
+    return array[y_start:y_end, x_start:x_end]
+
+
+def _bounds(region, shape) -> Tuple[int, int, int, int]:
+    """Границы области, заданной парой срезов, в пределах shape."""
+    rows, cols = region
+    y_start, y_end, _ = rows.indices(shape[0])
+    x_start, x_end, _ = cols.indices(shape[1])
+    return y_start, max(y_start, y_end), x_start, max(x_start, x_end)
+
+
+class TiledWeights:
+    """Статические веса, рассчитываемые плитками по запросу, с кэшем из max_tiles плиток.
+
+    Объект, как и плотный массив статических весов, не меняется: новые
+    препятствия дают новый объект (with_source), который забирает из кэша
+    прежнего плитки вне области их влияния. Поэтому его, как и массив,
+    разделяют ветки fork и журнал отмены."""
+    __slots__ = ("shape", "dtype", "tile_size", "max_tiles", "computed", "_source", "_tiles")
+
+    def __init__(self, shape, source: Source, dtype=np.float64, tile_size: int = 256, max_tiles: int = 64) -> None:
+        if tile_size < 1 or max_tiles < 1:
+            raise ValueError("tile_size и max_tiles должны быть положительными")
+        height, width = shape
+        self.shape = (height, width)
+        self.dtype = np.dtype(dtype)
+        self.tile_size = tile_size
+        self.max_tiles = max_tiles
+        self.computed = 0  # Рассчитано плиток, включая повторные расчеты вытесненных
+        self._source = source
+        self._tiles: "OrderedDict[Tuple[int, int], np.ndarray]" = OrderedDict()
+
+    def with_source(self, source: Source, region: Optional[Tuple[int, int, int, int]] = None) -> "TiledWeights":
+        """Новые веса с источником source и теми же размерами плиток.
+
+        Если задана область region (y_start, y_end, x_start, x_end), в которой
+        источники различаются, рассчитанные плитки вне нее переходят в новый объект."""
+        weights = TiledWeights(self.shape, source, self.dtype, self.tile_size, self.max_tiles)
+        if region is not None:
+            y_start, y_end, x_start, x_end = region
+            size = self.tile_size
+            for (tile_y, tile_x), tile in self._tiles.items():
+                if (tile_y * size >= y_end or (tile_y + 1) * size <= y_start
+                        or tile_x * size >= x_end or (tile_x + 1) * size <= x_start):
+                    weights._tiles[tile_y, tile_x] = tile
+        return weights
+
+    def _tile(self, tile_y: int, tile_x: int) -> np.ndarray:
+        """Плитка из кэша; отсутствующая рассчитывается, а самая старая при переполнении вытесняется."""
+        key = (tile_y, tile_x)
+        tile = self._tiles.get(key)
+        if tile is not None:
+            self._tiles.move_to_end(key)
+            return tile
+        size = self.tile_size
+        y_start, x_start = tile_y * size, tile_x * size
+        tile = np.array(self._source(y_start, min(y_start + size, self.shape[0]),
+                                     x_start, min(x_start + size, self.shape[1])), dtype=self.dtype)
+        tile.flags.writeable = False
+        self.computed += 1
+        self._tiles[key] = tile
+        if len(self._tiles) > self.max_tiles:
+            self._tiles.popitem(last=False)
+        return tile
+
+    def __getitem__(self, region) -> np.ndarray:
+        y_start, y_end, x_start, x_end = _bounds(region, self.shape)
+        size = self.tile_size
+        if y_start == y_end or x_start == x_end:
+            return np.empty((y_end - y_start, x_end - x_start), dtype=self.dtype)
+        first_y, last_y = y_start // size, (y_end - 1) // size
+        first_x, last_x = x_start // size, (x_end - 1) // size
+        if first_y == last_y and first_x == last_x:
+            # Область внутри одной плитки - срез плитки без копирования (только для чтения)
+            offset_y, offset_x = first_y * size, first_x * size
+            return self._tile(first_y, first_x)[y_start - offset_y:y_end - offset_y,
+                                                x_start - offset_x:x_end - offset_x]
+        result = np.empty((y_end - y_start, x_end - x_start), dtype=self.dtype)
+        for tile_y in range(first_y, last_y + 1):
+            for tile_x in range(first_x, last_x + 1):
+                tile = self._tile(tile_y, tile_x)
+                offset_y, offset_x = tile_y * size, tile_x * size
+                part_y_start, part_y_end = max(y_start, offset_y), min(y_end, offset_y + size)
+                part_x_start, part_x_end = max(x_start, offset_x), min(x_end, offset_x + size)
+                result[part_y_start - y_start:part_y_end - y_start, part_x_start - x_start:part_x_end - x_start] = \
+                    tile[part_y_start - offset_y:part_y_end - offset_y, part_x_start - offset_x:part_x_end - offset_x]
+        return result
+
+    def blocks(self, region: Optional[Tuple[int, int, int, int]] = None) -> Iterator[Tuple[int, int, np.ndarray]]:
+        """Плитки сетки по строкам плиток: (y_start, x_start, плитка).
+
+        Если задана область region (y_start, y_end, x_start, x_end), читаются
+        только плитки, которые ее пересекают, и возвращаются их части внутри нее."""
+        y_start, y_end, x_start, x_end = region if region is not None else (0, self.shape[0], 0, self.shape[1])
+        size = self.tile_size
+        if y_start >= y_end or x_start >= x_end:
+            return
+        for tile_y in range(y_start // size, (y_end - 1) // size + 1):
+            for tile_x in range(x_start // size, (x_end - 1) // size + 1):
+                offset_y, offset_x = tile_y * size, tile_x * size
+                part_y, part_x = max(y_start, offset_y), max(x_start, offset_x)
+                yield part_y, part_x, self._tile(tile_y, tile_x)[part_y - offset_y:y_end - offset_y,
+                                                                 part_x - offset_x:x_end - offset_x]
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        weights = self[:, :]
+        return weights if dtype is None else weights.astype(dtype)
+
+    @property
+    def nbytes(self) -> int:
+        """Память рассчитанных плиток в кэше."""
+        return sum(tile.nbytes for tile in self._tiles.values())
+
+
+class FootprintMask:
+    """Занятость ленивого планировщика: области мебели из furniture_index с отступом empty.
+
+    Занятость однозначно задается расставленной мебелью, поэтому не хранится.
+    Методы планировщика меняют furniture_index вместе с записью в занятость,
+    так что запись в маску ничего не делает."""
+    __slots__ = ("_planner",)
+    nbytes = 0
+
+    def __init__(self, planner) -> None:
+        self._planner = planner
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self._planner.grid_height, self._planner.grid_width
+
+    def __getitem__(self, region) -> np.ndarray:
+        planner = self._planner
+        y_start, y_end, x_start, x_end = _bounds(region, self.shape)
+        mask = np.zeros((y_end - y_start, x_end - x_start), dtype=bool)
+        empty = planner.empty
+        index = planner.furniture_index
+        for name in index.overlapping(x_start - empty, y_start - empty,
+                                      x_end - x_start + 2 * empty, y_end - y_start + 2 * empty):
+            other_y_start, other_y_end, other_x_start, other_x_end = planner._footprint(*index[name])
+            # Область мебели с отступом пересекается с областью чтения, раз пересекается мебель с расширенной областью
+            mask[max(y_start, other_y_start) - y_start:min(y_end, other_y_end) - y_start,
+                 max(x_start, other_x_start) - x_start:min(x_end, other_x_end) - x_start] = True
+        return mask
+
+    def __setitem__(self, region, value) -> None:
+        pass
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        mask = self[:, :]
+        return mask if dtype is None else mask.astype(dtype)
+
+
+class LazyGrid:
+    """Итоговые веса ленивого планировщика: статические веса области, обнуленные в занятых клетках."""
+    __slots__ = ("_planner",)
+    nbytes = 0
+
+    def __init__(self, planner) -> None:
+        self._planner = planner
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self._planner.grid_height, self._planner.grid_width
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self._planner.base_weights.dtype
+
+    def __getitem__(self, region) -> np.ndarray:
+        base_weights = self._planner.base_weights[region]
+        return np.where(self._planner.occupancy[region], 0, base_weights).astype(base_weights.dtype, copy=False)
+
+    def copy(self) -> np.ndarray:
+        """Плотная копия всей сетки."""
+        return self[:, :]
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        grid = self[:, :]
+        return grid if dtype is None else grid.astype(dtype)
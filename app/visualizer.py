@@ -1,50 +1,189 @@
+import atexit
+import io
+import logging
 import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+from matplotlib.patches import Rectangle
 
 from app.roomplanner import RoomPlanner
 
-def visualize(room: RoomPlanner, save_to_file: bool = False, filename: str = "План комнаты.png") -> None:
-    _, ax = plt.subplots(figsize=(8, 8))
-
-    # Отображение сетки комнаты
-    ax.imshow(room.grid, cmap='coolwarm', origin='upper', alpha=0.5)
-    ax.set_title("Визуализация комнаты", fontsize=16)
-    ax.set_xlabel("Ширина (ячейки)")
-    ax.set_ylabel("Высота (ячейки)")
-    ax.set_xticks(np.arange(-0.5, room.grid_width, 1), minor=True)
-    ax.set_yticks(np.arange(-0.5, room.grid_height, 1), minor=True)
-    ax.grid(which='minor', color='gray', linestyle='-', linewidth=0.5)
-
-    # Функция для добавления элементов на график
-    def add_rectangle(x, y, w, h, edge_color, fill_color, label, text_color) -> None:
-        rect = plt.Rectangle((x, y), w, h, edgecolor=edge_color, facecolor=fill_color, linewidth=2, alpha=0.8)
-        ax.add_patch(rect)
+logger = logging.getLogger(__name__)
+
+class RoomView(NamedTuple):
+    """Снимок комнаты, достаточный для отрисовки (без ссылки на планировщик)."""
+    grid: np.ndarray
+    doors: List[Tuple[int, int, int, int]]
+    windows: List[Tuple[int, int, int, int]]
+    furniture_positions: Dict[str, Tuple[int, int, int, int]]
+
+    @classmethod
+    def from_room(cls, room: RoomPlanner) -> "RoomView":
+        return cls(room.grid.copy(), list(room.doors), list(room.windows),
+                   {name: tuple(position) for name, position in room.furniture_positions.items()})
+
+
+class Renderer:
+    """Отрисовка комнат на одном переиспользуемом шаблоне фигуры.
+
+    Фигура создается один раз на бэкенде Agg без pyplot, поэтому рендерер
+    работает без дисплея и не копит фигуры. Между комнатами меняются только
+    данные изображения, линии сетки (одна коллекция) и прямоугольники мебели."""
+
+    def __init__(self, figure: Optional[Figure] = None) -> None:
+        if figure is None:
+            figure = Figure(figsize=(8, 8))
+            FigureCanvasAgg(figure)
+        self.figure = figure
+        self.ax = self.figure.add_subplot()
+        self.ax.set_title("Визуализация комнаты", fontsize=16)
+        self.ax.set_xlabel("Ширина (ячейки)")
+        self.ax.set_ylabel("Высота (ячейки)")
+        self.image = self.ax.imshow(np.zeros((1, 1)), cmap='coolwarm', origin='upper', alpha=0.5)
+        self.grid_lines = LineCollection([], colors='gray', linestyles='-', linewidths=0.5)
+        self.ax.add_collection(self.grid_lines)
+        self._artists = []  # Мебель, двери и окна текущей комнаты
+
+    def _add_rectangle(self, x, y, w, h, edge_color, fill_color, label, text_color) -> None:
+        rect = Rectangle((x, y), w, h, edgecolor=edge_color, facecolor=fill_color, linewidth=2, alpha=0.8)
+        self._artists.append(self.ax.add_patch(rect))
         if label:
-            ax.text(
+            self._artists.append(self.ax.text(
                 x + w / 2, y + h / 2, label,
                 ha='center', va='center', color=text_color, fontsize=10, fontweight='bold'
-            )
+            ))
+
+    def draw(self, room) -> None:
+        """Переносит комнату (RoomPlanner или RoomView) на шаблон фигуры."""
+        for artist in self._artists:
+            artist.remove()
+        self._artists.clear()
+        grid_height, grid_width = room.grid.shape
+
+        # Отображение сетки комнаты
+        self.image.set_data(room.grid)
+        self.image.set_extent((-0.5, grid_width - 0.5, grid_height - 0.5, -0.5))
+        self.image.autoscale()
+        vertical = [[(x, -0.5), (x, grid_height - 0.5)] for x in np.arange(-0.5, grid_width, 1)]
+        horizontal = [[(-0.5, y), (grid_width - 0.5, y)] for y in np.arange(-0.5, grid_height, 1)]
+        self.grid_lines.set_segments(vertical + horizontal)
+
+        # Отображение мебели
+        for name, (x, y, w, h) in room.furniture_positions.items():
+            self._add_rectangle(x, y, w, h, edge_color='black', fill_color='green', label=name, text_color='white')
+
+        # Отображение дверей
+        for door_x, door_y, door_w, door_h in room.doors:
+            self._add_rectangle(door_x - 0.5, door_y - 0.5, door_w, door_h, edge_color='blue', fill_color='blue', label='Дверь', text_color='black')
+
+        # Отображение окон
+        for window_x, window_y, window_w, window_h in room.windows:
+            self._add_rectangle(window_x - 0.5, window_y - 0.5, window_w, window_h, edge_color='cyan', fill_color='cyan', label='Окно', text_color='black')
+
+        # Настройки отображения
+        self.ax.set_xlim(-0.5, grid_width - 0.5)
+        self.ax.set_ylim(-0.5, grid_height - 0.5)
+
+    def save(self, room, path) -> None:
+        """Рисует комнату и сохраняет PNG в файл path (путь или файловый объект)."""
+        self.draw(room)
+        self.figure.savefig(path, format="png")
+
+
+_local = threading.local()
+
+
+def _thread_renderer() -> Renderer:
+    """Рендерер текущего потока или процесса (фигуры Matplotlib не делятся между потоками)."""
+    renderer = getattr(_local, "renderer", None)
+    if renderer is None:
+        renderer = _local.renderer = Renderer()
+    return renderer
 
-    # Отображение мебели
-    for name, (x, y, w, h) in room.furniture_positions.items():
-        add_rectangle(x, y, w, h, edge_color='black', fill_color='green', label=name, text_color='white')
-        print(name, x, y)
 
-    # Отображение дверей
-    for door_x, door_y, door_w, door_h in room.doors:
-        add_rectangle(door_x - 0.5, door_y - 0.5, door_w, door_h, edge_color='blue', fill_color='blue', label='Дверь', text_color='black')
+def render_to_file(room, path: str) -> str:
+    """Сохраняет комнату в PNG рендерером текущего потока."""
+    _thread_renderer().save(room, path)
+    return path
 
-    # Отображение окон
-    for window_x, window_y, window_w, window_h in room.windows:
-        add_rectangle(window_x - 0.5, window_y - 0.5, window_w, window_h, edge_color='cyan', fill_color='cyan', label='Окно', text_color='black')
 
-    # Настройки отображения
-    ax.set_xlim(-0.5, room.grid_width - 0.5)
-    ax.set_ylim(-0.5, room.grid_height - 0.5)
-    
+def render_png(room) -> bytes:
+    """Рисует комнату рендерером текущего потока и возвращает PNG в байтах."""
+    buffer = io.BytesIO()
+    _thread_renderer().save(room, buffer)
+    return buffer.getvalue()
+
+
+class ImageWriter:
+    """Фоновая запись PNG, чтобы планирование не ждало отрисовки и кодирования.
+
+    По умолчанию изображения рисует один фоновый поток; processes > 0 включает
+    пул процессов для больших пакетов. Очередь ограничена max_pending
+    изображениями: при ее заполнении submit ждет, и память не растет."""
+
+    def __init__(self, directory: str = "output", processes: int = 0, max_pending: int = 32) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        if processes > 0:
+            self._executor = ProcessPoolExecutor(max_workers=processes)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, room, filename: str) -> Future:
+        """Ставит комнату в очередь на запись в directory/filename."""
+        view = room if isinstance(room, RoomView) else RoomView.from_room(room)
+        self._slots.acquire()
+        future = self._executor.submit(render_to_file, view, os.path.join(self.directory, filename))
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: Future) -> None:
+        self._slots.release()
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("Не удалось сохранить изображение: %s", future.exception())
+
+    def close(self) -> None:
+        """Дожидается записи всех изображений."""
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> "ImageWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+_default_writer: Optional[ImageWriter] = None
+
+
+def default_writer() -> ImageWriter:
+    """Общий фоновый писатель в каталог output; дописывает очередь при выходе из программы."""
+    global _default_writer
+    if _default_writer is None:
+        _default_writer = ImageWriter("output")
+        atexit.register(_default_writer.close)
+    return _default_writer
+
+
+def visualize(room: RoomPlanner, save_to_file: bool = False, filename: str = "План комнаты.png",
+              writer: Optional[ImageWriter] = None) -> Optional[Future]:
+    """Показывает комнату или, с save_to_file=True, ставит ее PNG в очередь writer
+    (по умолчанию default_writer) и возвращает Future записи, не дожидаясь ее."""
+    for name, (x, y, w, h) in room.furniture_positions.items():
+        logger.debug("%s: %s, %s", name, x, y)
+
     if save_to_file:
-        os.makedirs("output", exist_ok=True) 
-        plt.savefig(os.path.join("output", filename))
-    else:
-        plt.show()
\ No newline at end of file
+        return (writer or default_writer()).submit(room, filename)
+
+    # Интерактивный просмотр через pyplot; фигура закрывается после показа
+    figure = plt.figure(figsize=(8, 8))
+    Renderer(figure).draw(room)
+    plt.show()
+    plt.close(figure)
@@ -0,0 +1,221 @@
+"""Бенчмарк планировщика: время calculate_weights и методов place_*, пиковая память.
+
+Корпус состоит из сценариев test.py и синтетических комнат, в которых
+от базовой комнаты по одному меняются размер комнаты, размер ячейки
+(от 20 до 1 см), число дверей и окон и число предметов каждого способа
+расстановки. Результаты пишутся в JSON и сравниваются с сохраненной
+базой; замедление больше чем в threshold раз считается регрессией:
+
+    python -m benchmarks.bench_planner --output results.json
+    python -m benchmarks.bench_planner --quick
+    python -m benchmarks.bench_planner --update-baseline
+
+Время каждого метода - минимум по --repeat прогонам (сумма по всем
+вызовам метода в комнате). Память - пик tracemalloc за отдельный прогон,
+чтобы трассировка не искажала время."""
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.batch import plan_room
+from app.roomplanner import SCORING_MODES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+METHODS = ("calculate_weights", "place_furniture", "place_furniture_near",
+           "place_furniture_around", "place_wardrobe")
+
+BASE = {"room_size": (400, 600), "cell_size": 10, "openings": 2, "items": 1}
+
+# Значения, которые перебираются по одному от базовой комнаты
+SWEEPS = {
+    "room_size": [(400, 600), (800, 1200), (1600, 2400)],
+    "cell_size": [20, 10, 5, 2, 1],
+    "openings": [2, 8, 32],
+    "items": [1, 4, 8],
+}
+QUICK_SWEEPS = {
+    "room_size": [(400, 600), (800, 1200)],
+    "cell_size": [20, 10, 5],
+    "openings": [2, 8],
+    "items": [1, 4],
+}
+
+
+def load_scenarios() -> List[dict]:
+    """Сценарии test_cases из test.py в корне репозитория (размер ячейки 20 см, как в test.py)."""
+    # test.py загружается по пути: имя test занято пакетом стандартной библиотеки
+    spec = importlib.util.spec_from_file_location("planner_scenarios", os.path.join(ROOT, "test.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return [dict(case, cell_size=20) for case in module.test_cases]
+
+
+def _spread(count: int, length: int, size: int) -> List[int]:
+    """Координаты count проемов размером size, равномерно распределенных по стене длиной length."""
+    step = length / count
+    return [int(step * i + max(step - size, 0) / 2) for i in range(count)]
+
+
+def synthetic_spec(room_size=(400, 600), cell_size=10, openings=2, items=1) -> dict:
+    """Синтетическая комната.
+
+    openings проемов делятся поровну между дверями на боковых стенах и окнами
+    на верхней и нижней; для каждого способа расстановки добавляется items предметов."""
+    width, height = room_size
+    doors_count = openings // 2
+    windows_count = openings - doors_count
+    doors, windows = [], []
+    for side, count in ((0, (doors_count + 1) // 2), (width - 20, doors_count // 2)):
+        doors += [(side, y, 20, 90) for y in _spread(count, height, 90)] if count else []
+    for side, count in ((0, (windows_count + 1) // 2), (height - 20, windows_count // 2)):
+        windows += [(x, side, 120, 20) for x in _spread(count, width, 120)] if count else []
+
+    furniture = []
+    for i in range(1, items + 1):
+        furniture += [
+            (f"Столик {i}", 60, 30, "window"),
+            (f"Комод {i}", 80, 40, "wall"),
+            (f"Стул {i}", 20, 20, "near", f"Столик {i}"),
+            (f"Тумбочка {i}", 30, 30, "around", f"Комод {i}"),
+            (f"Шкаф {i}", 100, 50, "wardrobe"),
+        ]
+    return {"room_size": room_size, "cell_size": cell_size, "doors": doors,
+            "windows": windows, "furniture_list": furniture}
+
+
+def corpus(quick: bool = False) -> Dict[str, dict]:
+    """Все комнаты бенчмарка по именам: сценарии test.py и синтетические комнаты."""
+    cases = {f"test-{i}": spec for i, spec in enumerate(load_scenarios(), 1)}
+    for parameter, values in (QUICK_SWEEPS if quick else SWEEPS).items():
+        for value in values:
+            params = dict(BASE, **{parameter: value})
+            (width, height), cell_size = params["room_size"], params["cell_size"]
+            name = f"room-{width}x{height}-cell-{cell_size}-openings-{params['openings']}-items-{params['items']}"
+            cases.setdefault(name, synthetic_spec(**params))
+    return cases
+
+
+def measure(spec: dict, scoring: str, repeat: int, lean: bool = False) -> dict:
+    """Замеры одной комнаты: минимальное время методов, полное время и пик памяти."""
+    methods = {method: float("inf") for method in METHODS}
+    total = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        planner = plan_room(spec, scoring=scoring, collect_stats=True, lean=lean)
+        total = min(total, time.perf_counter() - start)
+        for method in METHODS:
+            stats = planner.stats.methods.get(method)
+            methods[method] = min(methods[method], stats.seconds if stats else 0.0)
+
+    tracemalloc.start()
+    planner = plan_room(spec, scoring=scoring, lean=lean)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "grid": [planner.grid_width, planner.grid_height],
+        "items": len(spec["furniture_list"]),
+        "placed": len(planner.furniture_positions),
+        "seconds": methods,
+        "total_seconds": total,
+        "peak_memory_mb": peak / 2 ** 20,
+        "state_memory_mb": planner.nbytes / 2 ** 20,
+    }
+
+
+def run(cases: Dict[str, dict], scoring: str, repeat: int, lean: bool = False, verbose: bool = True) -> dict:
+    """Прогоняет корпус и возвращает результаты вместе с описанием окружения."""
+    results = {}
+    for name, spec in cases.items():
+        results[name] = result = measure(spec, scoring, repeat, lean)
+        if verbose:
+            print(f"{name:>50}: {result['total_seconds'] * 1000:9.1f} мс, "
+                  f"{result['peak_memory_mb']:7.1f} МБ", file=sys.stderr)
+    return {
+        "environment": {"python": platform.python_version(), "numpy": np.__version__,
+                        "machine": platform.machine(), "processor": platform.processor()},
+        "scoring": scoring,
+        "lean": lean,
+        "repeat": repeat,
+        "cases": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = 1.25, min_delta: float = 0.005) -> List[str]:
+    """Регрессии относительно базы: время метода или пик памяти выросли больше чем в threshold раз.
+
+    Изменения времени меньше min_delta секунд не учитываются - это шум таймера.
+    Комнаты, которых нет в одном из прогонов, пропускаются."""
+    regressions = []
+    for option in ("scoring", "lean"):
+        before, now = baseline.get(option, False), current.get(option, False)
+        if before != now:
+            return [f"база снята с {option}={before}, текущий прогон - с {now}"]
+    for name, result in current["cases"].items():
+        base = baseline["cases"].get(name)
+        if base is None:
+            continue
+        timings = dict(result["seconds"], total=result["total_seconds"])
+        base_timings = dict(base["seconds"], total=base["total_seconds"])
+        for method, seconds in timings.items():
+            before = base_timings.get(method)
+            if before is not None and seconds > before * threshold and seconds - before > min_delta:
+                regressions.append(f"{name}: {method} {before * 1000:.1f} -> {seconds * 1000:.1f} мс")
+        before, peak = base["peak_memory_mb"], result["peak_memory_mb"]
+        if peak > before * threshold and peak - before > 1:
+            regressions.append(f"{name}: память {before:.1f} -> {peak:.1f} МБ")
+    return regressions
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="сокращенный корпус")
+    parser.add_argument("--scoring", choices=SCORING_MODES, default="vectorized", help="способ подсчета весов")
+    parser.add_argument("--lean", action="store_true", help="экономный по памяти режим планировщика")
+    parser.add_argument("--repeat", type=int, default=3, help="число прогонов каждой комнаты")
+    parser.add_argument("--case", action="append", help="прогнать только комнаты с этой подстрокой в имени")
+    parser.add_argument("-o", "--output", help="файл для результатов в JSON")
+    parser.add_argument("--baseline", default=BASELINE, help="файл базы для сравнения")
+    parser.add_argument("--threshold", type=float, default=1.25, help="допустимое замедление относительно базы")
+    parser.add_argument("--update-baseline", action="store_true", help="записать результаты как новую базу")
+    args = parser.parse_args(argv)
+    # Неудачи расстановки в синтетических комнатах ожидаемы и не должны засорять вывод
+    logging.getLogger("app").setLevel(logging.ERROR)
+
+    cases = corpus(args.quick)
+    if args.case:
+        cases = {name: spec for name, spec in cases.items() if any(part in name for part in args.case)}
+    current = run(cases, args.scoring, args.repeat, args.lean)
+    text = json.dumps(current, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+        print(f"База записана в {args.baseline}", file=sys.stderr)
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"Нет базы {args.baseline}; запустите с --update-baseline", file=sys.stderr)
+        return 0
+    with open(args.baseline, encoding="utf-8") as file:
+        regressions = compare(current, json.load(file), args.threshold)
+    for line in regressions:
+        print(f"РЕГРЕССИЯ {line}", file=sys.stderr)
+    if not regressions:
+        print("Регрессий нет", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
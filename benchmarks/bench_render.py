@@ -0,0 +1,145 @@
+"""Бенчмарк отрисовки: комнат в секунду и пиковая память (RSS).
+
+Каждый режим запускается в отдельном процессе, чтобы пиковая память
+не смешивалась между режимами:
+
+    python -m benchmarks.bench_render --rooms 200
+
+Режимы:
+    legacy   - прежний visualize: новая фигура pyplot на каждую комнату,
+               линия сетки через minor-тики, фигура не закрывается;
+    renderer - один шаблон Renderer на бэкенде Agg в текущем потоке;
+    writer   - ImageWriter: отрисовка и кодирование PNG в фоновом потоке;
+    pool     - ImageWriter с пулом из двух процессов."""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ("legacy", "renderer", "writer", "pool")
+
+SPECS = [
+    {
+        "room_size": (400, 600),
+        "doors": [(0, 200, 20, 90)],
+        "windows": [(100, 0, 180, 20)],
+        "furniture_list": [
+            ("Туалетный столик", 60, 30, "window"),
+            ("Двуспальная кровать", 200, 180, "wall"),
+            ("Стул", 20, 20, "near", "Туалетный столик"),
+            ("Прикроватная тумбочка", 30, 30, "around", "Двуспальная кровать"),
+            ("Шкаф 1", 120, 60, "wardrobe"),
+        ]
+    },
+    {
+        "room_size": (700, 900),
+        "doors": [(0, 300, 60, 120)],
+        "windows": [(200, 0, 300, 50)],
+        "furniture_list": [
+            ("Двуспальная кровать", 200, 180, "window"),
+            ("Тумбочка", 30, 30, "around", "Двуспальная кровать"),
+            ("Шкаф", 120, 60, "wardrobe"),
+        ]
+    },
+    {
+        "room_size": (550, 750),
+        "doors": [(50, 400, 50, 100)],
+        "windows": [(200, 0, 200, 40)],
+        "furniture_list": [
+            ("Стол для компьютера", 100, 60, "wall"),
+            ("Офисный стул", 60, 60, "near", "Стол для компьютера"),
+            ("Шкаф", 120, 60, "wardrobe"),
+        ]
+    },
+]
+
+
+def legacy_render(room, path: str) -> None:
+    """Отрисовка так, как ее делал visualize до появления Renderer."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    _, ax = plt.subplots(figsize=(8, 8))
+    ax.imshow(room.grid, cmap='coolwarm', origin='upper', alpha=0.5)
+    ax.set_title("Визуализация комнаты", fontsize=16)
+    ax.set_xlabel("Ширина (ячейки)")
+    ax.set_ylabel("Высота (ячейки)")
+    ax.set_xticks(np.arange(-0.5, room.grid_width, 1), minor=True)
+    ax.set_yticks(np.arange(-0.5, room.grid_height, 1), minor=True)
+    ax.grid(which='minor', color='gray', linestyle='-', linewidth=0.5)
+    for name, (x, y, w, h) in room.furniture_positions.items():
+        ax.add_patch(plt.Rectangle((x, y), w, h, edgecolor='black', facecolor='green', linewidth=2, alpha=0.8))
+        ax.text(x + w / 2, y + h / 2, name, ha='center', va='center', color='white', fontsize=10, fontweight='bold')
+    for x, y, w, h in room.doors + room.windows:
+        ax.add_patch(plt.Rectangle((x - 0.5, y - 0.5), w, h, edgecolor='blue', facecolor='blue', linewidth=2, alpha=0.8))
+    ax.set_xlim(-0.5, room.grid_width - 0.5)
+    ax.set_ylim(-0.5, room.grid_height - 0.5)
+    plt.savefig(path)
+
+
+def run_mode(mode: str, rooms: int) -> dict:
+    """Отрисовывает rooms комнат в режиме mode и возвращает замеры."""
+    from app.batch import plan_room
+    from app.visualizer import ImageWriter, Renderer
+
+    planners = [plan_room(spec) for spec in SPECS]
+    directory = tempfile.mkdtemp(prefix="bench_render_")
+    blocked = 0.0  # Время, которое планирующий поток провел в ожидании отрисовки
+    start = time.perf_counter()
+    if mode == "legacy":
+        for index in range(rooms):
+            began = time.perf_counter()
+            legacy_render(planners[index % len(planners)], os.path.join(directory, f"{index}.png"))
+            blocked += time.perf_counter() - began
+    elif mode == "renderer":
+        renderer = Renderer()
+        for index in range(rooms):
+            began = time.perf_counter()
+            renderer.save(planners[index % len(planners)], os.path.join(directory, f"{index}.png"))
+            blocked += time.perf_counter() - began
+    else:
+        processes = 2 if mode == "pool" else 0
+        with ImageWriter(directory, processes=processes) as writer:
+            for index in range(rooms):
+                began = time.perf_counter()
+                writer.submit(planners[index % len(planners)], f"{index}.png")
+                blocked += time.perf_counter() - began
+    elapsed = time.perf_counter() - start
+    shutil.rmtree(directory)
+    return {
+        "mode": mode,
+        "rooms": rooms,
+        "rooms_per_second": rooms / elapsed,
+        "blocked_seconds": blocked,
+        # ru_maxrss в Linux измеряется в килобайтах
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=200, help="число отрисовываемых комнат")
+    parser.add_argument("--mode", choices=MODES, help="запустить один режим в текущем процессе")
+    args = parser.parse_args(argv)
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.rooms)))
+        return
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_render", "--mode", mode, "--rooms", str(args.rooms)],
+            check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:>8}: {result['rooms_per_second']:7.1f} комнат/с, "
+              f"ожидание {result['blocked_seconds']:6.2f} с, пик RSS {result['peak_rss_mb']:7.1f} МБ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Нагрузочный бенчмарк сервиса планирования: задержки p50/p99 и пропускная способность.
+
+Генератор нагрузки запускает --clients клиентов в одном цикле событий;
+каждый клиент отправляет запросы один за другим, пока их общее число
+не достигнет --requests. Комната запроса выбирается случайно из --distinct
+синтетических комнат, поэтому одновременные одинаковые запросы
+объединяются сервисом; доля --images запросов просит PNG вместо расстановки:
+
+    python -m benchmarks.bench_service --requests 500 --clients 32 --workers 4
+    python -m benchmarks.bench_service --max-pending 4 --queue-timeout 0  # отказы при перегрузке
+
+Задержка считается только для выполненных запросов; отказы ServiceBusy
+считаются отдельно."""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import sys
+import time
+from typing import List, Optional
+
+from app.service import PlanningService, ServiceBusy
+from benchmarks.bench_planner import synthetic_spec
+
+
+def room_specs(distinct: int, cell_size: int = 10) -> List[dict]:
+    """distinct разных синтетических комнат: ширина растет на 20 см от комнаты к комнате."""
+    return [synthetic_spec(room_size=(400 + 20 * i, 600), cell_size=cell_size) for i in range(distinct)]
+
+
+def percentile(values: List[float], share: float) -> float:
+    """Значение, не меньше которого доля share значений (ближайший ранг)."""
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(len(ordered) * share)) - 1]
+
+
+async def generate_load(service: PlanningService, specs: List[dict], requests: int, clients: int,
+                        images: float = 0.0, seed: int = 0) -> dict:
+    """Нагружает сервис и возвращает задержки, пропускную способность и счетчики сервиса."""
+    rng = random.Random(seed)
+    plan = [(rng.choice(specs), rng.random() < images) for _ in range(requests)]
+    latencies = []
+    rejected = 0
+
+    async def client() -> None:
+        nonlocal rejected
+        while plan:
+            spec, image = plan.pop()
+            began = time.perf_counter()
+            try:
+                await (service.image(spec) if image else service.plan(spec))
+            except ServiceBusy:
+                rejected += 1
+                continue
+            latencies.append(time.perf_counter() - began)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "completed": len(latencies),
+        "rejected": rejected,
+        "seconds": elapsed,
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.5) * 1000 if latencies else None,
+        "p99_ms": percentile(latencies, 0.99) * 1000 if latencies else None,
+        "counters": dict(service.counters),
+    }
+
+
+async def run(requests: int, clients: int, distinct: int, workers: Optional[int], max_pending: int,
+              queue_timeout: Optional[float], images: float, cell_size: int, seed: int) -> dict:
+    specs = room_specs(distinct, cell_size)
+    async with PlanningService(workers=workers, max_pending=max_pending, queue_timeout=queue_timeout) as service:
+        # Прогрев: процессы пула запускаются и импортируют модули до замера
+        await asyncio.gather(*(service.plan(spec) for spec in specs[:service.workers]))
+        service.counters = dict.fromkeys(service.counters, 0)
+        result = await generate_load(service, specs, requests, clients, images, seed)
+    result.update(clients=clients, distinct=distinct, workers=service.workers, max_pending=max_pending)
+    return result
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300, help="общее число запросов")
+    parser.add_argument("--clients", type=int, default=16, help="число одновременных клиентов")
+    parser.add_argument("--distinct", type=int, default=20, help="число разных комнат")
+    parser.add_argument("--workers", type=int, default=None, help="процессов в пуле сервиса")
+    parser.add_argument("--max-pending", type=int, default=64, help="предел очереди сервиса")
+    parser.add_argument("--queue-timeout", type=float, default=None, help="ожидание места в очереди, с")
+    parser.add_argument("--images", type=float, default=0.0, help="доля запросов PNG")
+    parser.add_argument("--cell-size", type=int, default=10, help="размер ячейки комнат, см")
+    parser.add_argument("--seed", type=int, default=0, help="зерно выбора комнат")
+    parser.add_argument("-o", "--output", help="файл для результатов в JSON")
+    args = parser.parse_args(argv)
+    logging.getLogger("app").setLevel(logging.ERROR)
+
+    result = asyncio.run(run(args.requests, args.clients, args.distinct, args.workers, args.max_pending,
+                             args.queue_timeout, args.images, args.cell_size, args.seed))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(json.dumps(result, ensure_ascii=False, indent=2) + "\n")
+    counters = result["counters"]
+    latency = (f"p50 {result['p50_ms']:.1f} мс, p99 {result['p99_ms']:.1f} мс"
+               if result["completed"] else "нет выполненных запросов")
+    print(f"{result['completed']}/{result['requests']} запросов за {result['seconds']:.2f} с: "
+          f"{result['throughput_rps']:.1f} запр/с, {latency}; задач пула {counters['computations']}, "
+          f"объединено {counters['coalesced']}, отказов {result['rejected']}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,30 +1,18 @@
-from app.roomplanner import RoomPlanner
-from app.visualizer import visualize
+from app.batch import plan_room
+from app.visualizer import ImageWriter, visualize
 
 
-def run_test_case(room_size, doors, windows, furniture_list, test_case_id):
-    cell_size = 20
-    planner = RoomPlanner(room_size, cell_size, doors, windows)
-    planner.calculate_weights()
-
-    for item in furniture_list:
-        name, width, height, placement, *extra = item
-        
-        if placement == "window":
-            planner.place_furniture(name, width, height, prefer_window=True)
-        elif placement == "wall":
-            planner.place_furniture(name, width, height, prefer_wall=True)
-        elif placement == "near":
-            near_name = extra[0]
-            planner.place_furniture_near(name, width, height, near_name=near_name)
-        elif placement == "around":
-            target_name = extra[0]
-            planner.place_furniture_around(name, width, height, target_name=target_name)
-        elif placement == "wardrobe":
-            planner.place_wardrobe(name, width, height)
+def run_test_case(room_size, doors, windows, furniture_list, test_case_id, writer=None):
+    planner = plan_room({
+        "room_size": room_size,
+        "cell_size": 20,
+        "doors": doors,
+        "windows": windows,
+        "furniture_list": furniture_list,
+    })
 
     print(f"Запуск теста {test_case_id}...")
-    visualize(planner, save_to_file=True, filename=f"Тест_{test_case_id}.png")
+    visualize(planner, save_to_file=True, filename=f"Тест_{test_case_id}.png", writer=writer)
     print(f"Тест {test_case_id} завершен.")
 
 test_cases = [
@@ -139,11 +127,15 @@ test_cases = [
     }
 ]
 
-for idx, test_case in enumerate(test_cases, 1):
-    run_test_case(
-        room_size=test_case["room_size"],
-        doors=test_case["doors"],
-        windows=test_case["windows"],
-        furniture_list=test_case["furniture_list"],
-        test_case_id=idx
-    )
\ No newline at end of file
+if __name__ == "__main__":
+    # Изображения пишутся в фоне, пока планируются следующие тесты
+    with ImageWriter("output") as writer:
+        for idx, test_case in enumerate(test_cases, 1):
+            run_test_case(
+                room_size=test_case["room_size"],
+                doors=test_case["doors"],
+                windows=test_case["windows"],
+                furniture_list=test_case["furniture_list"],
+                test_case_id=idx,
+                writer=writer
+            )
\ No newline at end of file
@@ -0,0 +1,118 @@
+import os
+import pickle
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from app import visualizer
+from app.batch import PlanResult, plan_batch, plan_result
+from app.visualizer import ImageWriter
+
+SPECS = [
+    {
+        "room_size": (400, 600),
+        "doors": [(0, 200, 20, 90)],
+        "windows": [(100, 0, 180, 20)],
+        "furniture_list": [
+            ("Туалетный столик", 60, 30, "window"),
+            ("Двуспальная кровать", 200, 180, "wall"),
+            ("Стул", 20, 20, "near", "Туалетный столик"),
+            ("Шкаф 1", 120, 60, "wardrobe")
+        ]
+    },
+    {
+        "room_size": (350, 450),
+        "cell_size": 10,
+        "doors": [(0, 150, 40, 100)],
+        "windows": [(100, 0, 150, 30)],
+        "furniture_list": [
+            ("Кресло", 80, 50, "wall"),
+            ("Полка", 50, 40, "near", "Кресло"),
+            ("Тумбочка", 30, 30, "around", "Диван")
+        ]
+    },
+]
+
+
+class TestPlanBatch(unittest.TestCase):
+    def test_result_is_compact(self):
+        """Результат содержит только позиции и неудачи и переживает pickle."""
+        result = plan_result(7, SPECS[1])
+        self.assertEqual(result.index, 7)
+        self.assertIn("Кресло", result.furniture_positions)
+        self.assertEqual(result.failures, ["Тумбочка"])
+        self.assertEqual(pickle.loads(pickle.dumps(result)), result)
+
+    def test_deterministic_across_workers(self):
+        """Результаты не зависят от числа процессов и размера пачки."""
+        specs = SPECS * 3
+        inline = list(plan_batch(specs, workers=1))
+        pooled = list(plan_batch(iter(specs), workers=2, chunksize=2, ordered=True))
+        self.assertEqual(pooled, inline)
+        self.assertEqual([result.index for result in pooled], list(range(len(specs))))
+
+    def test_streaming_results(self):
+        """Без ordered результаты приходят по мере готовности, но все и с номерами."""
+        results = sorted(plan_batch(SPECS, workers=2), key=lambda result: result.index)
+        self.assertEqual(results, [plan_result(index, spec) for index, spec in enumerate(SPECS)])
+        self.assertIsInstance(results[0], PlanResult)
+
+    def test_ordered_bounded(self):
+        """С ordered=True медленная первая комната не дает прочитать весь поток вперед."""
+        slow = {"room_size": (1200, 1200), "cell_size": 5, "doors": [], "windows": [],
+                "furniture_list": [("Стол", 100, 100, "window")]}
+        fast = {"room_size": (100, 100), "doors": [], "windows": [], "furniture_list": [("Стул", 20, 20, "wall")]}
+        consumed = 0
+
+        def specs():
+            nonlocal consumed
+            for spec in [slow] + [fast] * 60:
+                consumed += 1
+                yield spec
+
+        results = plan_batch(specs(), workers=2, ordered=True, scoring="brute")
+        first = next(results)
+        self.assertEqual(first.index, 0)
+        # В работе не больше 2 * workers пачек и еще столько же результатов ждут очереди
+        self.assertLessEqual(consumed, 1 + 2 * 2 + 2 * 2)
+        self.assertEqual(len(list(results)), 60)
+
+    def test_render_does_not_block_planning(self):
+        """Пока писатель изображений стоит, пакет все равно планируется до конца."""
+        release = threading.Event()
+        render = visualizer.render_to_file
+
+        def blocked_render(room, path):
+            release.wait()
+            return render(room, path)
+
+        specs = SPECS * 2
+        with tempfile.TemporaryDirectory() as directory:
+            with mock.patch.object(visualizer, "render_to_file", blocked_render):
+                writer = ImageWriter(directory)
+                try:
+                    results = list(plan_batch(specs, workers=1, writer=writer))
+                    self.assertEqual(results, list(plan_batch(specs, workers=1)))
+                    self.assertEqual(os.listdir(directory), [])
+                finally:
+                    release.set()
+                    writer.close()
+            self.assertEqual(sorted(os.listdir(directory)), sorted(f"{index}.png" for index in range(len(specs))))
+
+    def test_render_dir(self):
+        """С render_dir все изображения записаны к концу пакета."""
+        with tempfile.TemporaryDirectory() as directory:
+            results = list(plan_batch(SPECS, workers=2, render_dir=directory))
+            self.assertEqual(len(results), len(SPECS))
+            for index in range(len(SPECS)):
+                self.assertTrue(os.path.getsize(os.path.join(directory, f"{index}.png")) > 0)
+
+    def test_invalid_chunksize(self):
+        """Размер пачки должен быть положительным."""
+        with self.assertRaises(ValueError):
+            list(plan_batch(SPECS, chunksize=0))
+
+
+if __name__ == "__main__":
+    unittest.main()
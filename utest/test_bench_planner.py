@@ -0,0 +1,34 @@
+import unittest
+
+from benchmarks.bench_planner import compare, corpus, measure, synthetic_spec
+
+
+class TestBenchPlanner(unittest.TestCase):
+    def test_corpus(self):
+        """В корпус входят сценарии test.py и комнаты с ячейкой от 20 до 1 см."""
+        cases = corpus()
+        self.assertIn("test-1", cases)
+        self.assertEqual(cases["test-1"]["cell_size"], 20)
+        self.assertEqual({spec["cell_size"] for spec in cases.values()}, {20, 10, 5, 2, 1})
+
+    def test_synthetic_spec(self):
+        """Число проемов и предметов каждого способа расстановки задается параметрами."""
+        spec = synthetic_spec(openings=8, items=4)
+        self.assertEqual(len(spec["doors"]) + len(spec["windows"]), 8)
+        placements = [item[3] for item in spec["furniture_list"]]
+        self.assertEqual(placements.count("wardrobe"), 4)
+        self.assertEqual(placements.count("near"), 4)
+
+    def test_compare(self):
+        """Замедление сверх порога отмечается как регрессия, шум таймера - нет."""
+        result = measure(synthetic_spec(cell_size=20), "vectorized", repeat=1)
+        baseline = {"scoring": "vectorized", "cases": {"room": result}}
+        slow = dict(result, seconds=dict(result["seconds"], place_wardrobe=result["seconds"]["place_wardrobe"] + 1))
+        self.assertEqual(compare({"scoring": "vectorized", "cases": {"room": result}}, baseline), [])
+        regressions = compare({"scoring": "vectorized", "cases": {"room": slow}}, baseline)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("place_wardrobe", regressions[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+
+from app.batch import plan_result
+from app.cache import PlanCache, spec_key
+
+SPEC = {
+    "room_size": (400, 600),
+    "doors": [(0, 200, 20, 90)],
+    "windows": [(100, 0, 180, 20)],
+    "furniture_list": [
+        ("Туалетный столик", 60, 30, "window"),
+        ("Двуспальная кровать", 200, 180, "wall"),
+        ("Шкаф 1", 120, 60, "wardrobe")
+    ]
+}
+# Та же комната, отраженная по горизонтали
+MIRRORED = dict(SPEC, doors=[(380, 200, 20, 90)], windows=[(120, 0, 180, 20)])
+# Та же комната, повернутая на 90°: ширина и высота меняются местами
+ROTATED = {
+    "room_size": (600, 400),
+    "doors": [(200, 0, 90, 20)],
+    "windows": [(0, 100, 20, 180)],
+    "furniture_list": [
+        ("Туалетный столик", 30, 60, "window"),
+        ("Двуспальная кровать", 180, 200, "wall"),
+        ("Шкаф 1", 60, 120, "wardrobe")
+    ]
+}
+
+
+class TestSpecKey(unittest.TestCase):
+    def test_canonical_numbers(self):
+        """Ключ не зависит от записи чисел и типа последовательностей."""
+        as_json = dict(SPEC, room_size=[400.0, 600.0], cell_size=20)
+        self.assertEqual(spec_key(as_json), spec_key(SPEC))
+
+    def test_symmetry(self):
+        """С нормализацией отражения и повороты дают один ключ, без нее - разные."""
+        self.assertNotEqual(spec_key(MIRRORED)[0], spec_key(SPEC)[0])
+        key = spec_key(SPEC, normalize=True)[0]
+        self.assertEqual(spec_key(MIRRORED, normalize=True)[0], key)
+        self.assertEqual(spec_key(ROTATED, normalize=True)[0], key)
+
+
+class TestPlanCache(unittest.TestCase):
+    def test_memory_tier(self):
+        """Повторный запрос берется из памяти и совпадает с планированием."""
+        cache = PlanCache()
+        first = cache.plan(SPEC, index=3)
+        second = cache.plan(SPEC, index=4)
+        self.assertEqual(first, plan_result(3, SPEC))
+        self.assertEqual(second.furniture_positions, first.furniture_positions)
+        self.assertEqual(second.index, 4)
+        self.assertEqual((cache.stats.memory_hits, cache.stats.misses), (1, 1))
+
+    def test_disk_tier(self):
+        """Записи на диске переживают пересоздание кэша."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "plans.sqlite")
+            cache = PlanCache(path=path)
+            expected = cache.plan(SPEC)
+            cache.close()
+            cache = PlanCache(path=path)
+            self.assertEqual(cache.get(SPEC), expected)
+            self.assertEqual(cache.stats.disk_hits, 1)
+            cache.close()
+
+    def test_disk_eviction(self):
+        """При превышении размера вытесняются давно не использованные записи."""
+        with tempfile.TemporaryDirectory() as directory:
+            cache = PlanCache(memory_items=1, path=os.path.join(directory, "plans.sqlite"), max_bytes=200)
+            cache.plan(SPEC)
+            cache.plan(ROTATED)
+            self.assertEqual(cache.stats.evictions, 1)
+            self.assertIsNotNone(cache.get(ROTATED))
+            self.assertIsNone(cache.get(SPEC))
+            cache.close()
+
+    def test_normalized_hit(self):
+        """Отраженная комната получает расстановку, преобразованную обратно."""
+        cache = PlanCache(normalize=True)
+        cache.plan(SPEC)
+        for spec in (MIRRORED, ROTATED):
+            result = cache.plan(spec)
+            grid_width, grid_height = spec["room_size"][0] // 20, spec["room_size"][1] // 20
+            for name, width, height, _ in spec["furniture_list"]:
+                x, y, w, h = result.furniture_positions[name]
+                self.assertEqual((w, h), (-(-width // 20), -(-height // 20)))
+                self.assertTrue(0 <= x and x + w <= grid_width and 0 <= y and y + h <= grid_height)
+        self.assertEqual((cache.stats.memory_hits, cache.stats.misses), (2, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
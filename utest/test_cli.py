@@ -0,0 +1,62 @@
+import io
+import json
+import unittest
+
+from app.batch import plan_result
+from app.cli import run
+
+SPEC = {
+    "room_size": [400, 600],
+    "doors": [[0, 200, 20, 90]],
+    "windows": [[100, 0, 180, 20]],
+    "furniture_list": [
+        ["Туалетный столик", 60, 30, "window"],
+        ["Стул", 20, 20, "near", "Туалетный столик"],
+        ["Шкаф 1", 120, 60, "wardrobe"]
+    ]
+}
+
+
+class TestCli(unittest.TestCase):
+    def test_stream(self):
+        """Каждая строка входа дает строку результата, ошибки не прерывают обработку."""
+        lines = [json.dumps(SPEC), "", "{broken", json.dumps({"room_size": [400, 600]}), json.dumps(SPEC)]
+        output = io.StringIO()
+        count = run(io.StringIO("\n".join(lines) + "\n"), output, workers=1, ordered=True)
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(count, 2)
+        self.assertEqual([record["line"] for record in records], [1, 3, 4, 5])
+        self.assertIn("error", records[1])
+        self.assertIn("doors", records[2]["error"])
+        expected = plan_result(0, SPEC).furniture_positions
+        self.assertEqual({name: tuple(position) for name, position in records[0]["furniture_positions"].items()}, expected)
+        self.assertEqual(records[3]["failures"], [])
+
+    def test_ordered_invalid_lines(self):
+        """С ordered=True ошибки разбора выводятся на своем месте и в пуле процессов."""
+        lines = [json.dumps(SPEC), "{broken", json.dumps(SPEC), "[]", json.dumps({"room_size": [400, 600]})]
+        output = io.StringIO()
+        count = run(io.StringIO("\n".join(lines) + "\n"), output, workers=2, chunksize=1, ordered=True)
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(count, 2)
+        self.assertEqual([record["line"] for record in records], [1, 2, 3, 4, 5])
+        self.assertEqual(["error" in record for record in records], [False, True, False, True, True])
+
+    def test_planning_error(self):
+        """Спецификация, на которой падает планирование, дает строку с ошибкой, а соседние комнаты выводятся."""
+        bad = dict(SPEC, room_size=[400])
+        lines = [json.dumps(SPEC), json.dumps(bad), json.dumps(SPEC)]
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                output = io.StringIO()
+                count = run(io.StringIO("\n".join(lines) + "\n"), output, workers=workers, chunksize=1, ordered=True)
+                records = [json.loads(line) for line in output.getvalue().splitlines()]
+                self.assertEqual(count, 2)
+                self.assertEqual([record["line"] for record in records], [1, 2, 3])
+                self.assertIn("error", records[1])
+                self.assertEqual(records[0]["furniture_positions"], records[2]["furniture_positions"])
+                self.assertTrue(records[2]["furniture_positions"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import numpy as np
+
+from app.integral import IntegralGrid
+from app.roomplanner import RoomPlanner
+
+ROOM_SIZE = (400, 600)
+DOORS = [(0, 200, 20, 90)]
+WINDOWS = [(100, 0, 180, 20)]
+
+
+class TestIncrementalEditing(unittest.TestCase):
+    def setUp(self):
+        """Комната с тремя предметами мебели."""
+        self.planner = RoomPlanner(ROOM_SIZE, 20, DOORS, WINDOWS)
+        self.planner.calculate_weights()
+        self.planner.place_furniture("Туалетный столик", 60, 30, prefer_window=True)
+        self.planner.place_furniture("Двуспальная кровать", 200, 180, prefer_wall=True)
+        self.planner.place_furniture_near("Стул", 20, 20, near_name="Туалетный столик")
+
+    def rebuilt(self, positions) -> RoomPlanner:
+        """Комната, построенная с нуля с той же мебелью на тех же местах."""
+        planner = RoomPlanner(ROOM_SIZE, 20, DOORS, WINDOWS)
+        planner.calculate_weights()
+        for name, (x, y, w, h) in positions.items():
+            planner._update_grid(name, (x, y), w, h)
+        return planner
+
+    def assertSameState(self, planner, expected):
+        self.assertTrue(np.array_equal(planner.grid, expected.grid))
+        self.assertTrue(np.array_equal(planner.occupancy, expected.occupancy))
+        self.assertTrue(np.array_equal(planner.integral.table, IntegralGrid(expected.grid).table))
+
+    def test_remove_furniture(self):
+        """Удаление мебели освобождает ее область, но не соседнюю."""
+        self.planner.remove_furniture("Туалетный столик")
+        self.assertNotIn("Туалетный столик", self.planner.furniture_positions)
+        self.assertSameState(self.planner, self.rebuilt(self.planner.furniture_positions))
+
+    def test_move_furniture(self):
+        """Перенос мебели эквивалентен построению комнаты заново."""
+        self.planner.move_furniture("Стул", 10, 20)
+        self.assertEqual(self.planner.furniture_positions["Стул"], (10, 20, 1, 1))
+        self.assertSameState(self.planner, self.rebuilt(self.planner.furniture_positions))
+
+    def test_move_out_of_room(self):
+        """Мебель нельзя вынести за пределы комнаты."""
+        with self.assertRaises(ValueError):
+            self.planner.move_furniture("Двуспальная кровать", 15, 0)
+        with self.assertRaises(KeyError):
+            self.planner.remove_furniture("Шкаф")
+
+    def test_replan_after_remove(self):
+        """После удаления мебель можно расставить заново на то же место."""
+        position = self.planner.remove_furniture("Двуспальная кровать")
+        self.planner.place_furniture("Двуспальная кровать", 200, 180, prefer_wall=True)
+        self.assertEqual(self.planner.furniture_positions["Двуспальная кровать"], position)
+
+    def test_add_window(self):
+        """Новое окно пересчитывает веса только в области своего влияния."""
+        self.planner.add_window((0, 580, 100, 20))
+        expected = RoomPlanner(ROOM_SIZE, 20, DOORS, WINDOWS + [(0, 580, 100, 20)])
+        expected.calculate_weights()
+        for name, (x, y, w, h) in self.planner.furniture_positions.items():
+            expected._update_grid(name, (x, y), w, h)
+        self.assertTrue(np.array_equal(self.planner.base_weights, expected.base_weights))
+        self.assertSameState(self.planner, expected)
+
+    def test_copy(self):
+        """Изменения копии не затрагивают оригинал, статические веса разделяются."""
+        clone = self.planner.copy()
+        self.assertIs(clone.base_weights, self.planner.base_weights)
+        grid = self.planner.grid.copy()
+        clone.remove_furniture("Стул")
+        clone.place_wardrobe("Шкаф", 120, 60)
+        clone.add_door((380, 400, 20, 90))
+        self.assertIn("Стул", self.planner.furniture_positions)
+        self.assertNotIn("Шкаф", self.planner.furniture_positions)
+        self.assertTrue(np.array_equal(self.planner.grid, grid))
+        self.assertEqual(self.planner.doors, [(0, 10, 1, 5)])
+        self.assertSameState(self.planner, self.rebuilt(self.planner.furniture_positions))
+
+
+if __name__ == "__main__":
+    unittest.main()
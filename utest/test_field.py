@@ -0,0 +1,84 @@
+import random
+import unittest
+import numpy as np
+
+from app.field import FieldEngine, ObstacleKind
+from app.roomplanner import RoomPlanner
+
+
+def reference_weights(obstacles, radius, y_start, y_end, x_start, x_end) -> np.ndarray:
+    """Прежний расчет: отдельная сетка координат и вычитание по маске для каждого препятствия."""
+    weights = np.ones((y_end - y_start, x_end - x_start))
+    for obj_x, obj_y, obj_w, obj_h in obstacles:
+        area_x_start, area_x_end = max(x_start, obj_x - radius), min(x_end, obj_x + obj_w + radius)
+        area_y_start, area_y_end = max(y_start, obj_y - radius), min(y_end, obj_y + obj_h + radius)
+        if area_x_start >= area_x_end or area_y_start >= area_y_end:
+            continue
+        y_coords, x_coords = np.meshgrid(np.arange(area_y_start, area_y_end),
+                                         np.arange(area_x_start, area_x_end), indexing="ij")
+        dist_x = np.maximum(0, np.maximum(obj_x - x_coords, x_coords - (obj_x + obj_w)))
+        dist_y = np.maximum(0, np.maximum(obj_y - y_coords, y_coords - (obj_y + obj_h)))
+        distances_sq = dist_x**2 + dist_y**2
+        mask = distances_sq <= radius**2
+        weights[y_coords[mask] - y_start, x_coords[mask] - x_start] -= 1.0 / (1.0 + np.sqrt(distances_sq[mask]))
+    return weights
+
+
+def column_kernel(distances: np.ndarray, out: np.ndarray) -> np.ndarray:
+    return np.subtract(2.0, distances, out=out)
+
+
+COLUMN = ObstacleKind(radius=2, kernel=column_kernel)
+
+
+class TestFieldEngine(unittest.TestCase):
+    def test_matches_reference(self):
+        """Поле совпадает с прежним циклом по препятствиям до бита, в том числе для части сетки."""
+        rng = random.Random(0)
+        engine = FieldEngine()
+        for _ in range(100):
+            width, height = rng.randrange(5, 80), rng.randrange(5, 80)
+            rects = [(rng.randrange(-10, width), rng.randrange(-10, height), rng.randrange(1, 15), rng.randrange(1, 15))
+                     for _ in range(rng.randrange(0, 30))]
+            radius = rng.randrange(1, 20)
+            y_start, x_start = rng.randrange(0, height), rng.randrange(0, width)
+            y_end, x_end = rng.randrange(y_start + 1, height + 1), rng.randrange(x_start + 1, width + 1)
+            obstacles = [(rect, ObstacleKind()) for rect in rects]
+            for region in ((0, height, 0, width), (y_start, y_end, x_start, x_end)):
+                self.assertTrue(np.array_equal(engine.weights(obstacles, radius, *region),
+                                               reference_weights(rects, radius, *region)))
+
+    def test_kind_radius_and_kernel(self):
+        """У вида препятствия свои ядро и радиус."""
+        weights = FieldEngine().weights([((5, 5, 1, 1), COLUMN)], 8, 0, 12, 0, 12)
+        # Расстояние по оси считается до отрезка [x, x + w], как в прежнем цикле
+        self.assertEqual(list(weights[5, 4:10]), [0.0, -1.0, -1.0, 0.0, 1.0, 1.0])
+        self.assertEqual(weights[3, 3], 1.0)  # Расстояние больше радиуса 2
+
+
+class TestPlannerObstacles(unittest.TestCase):
+    def make_planner(self) -> RoomPlanner:
+        return RoomPlanner((400, 600), 20, [(0, 200, 20, 90)], [(100, 0, 180, 20)],
+                           obstacle_kinds={"column": COLUMN})
+
+    def test_add_obstacle(self):
+        """Препятствие нового вида пересчитывает веса только в своей области и совпадает с полным расчетом."""
+        planner = self.make_planner()
+        planner.calculate_weights()
+        snapshot = planner.snapshot()
+        planner.add_obstacle("column", (200, 300, 40, 40))
+        planner.add_door((380, 400, 20, 90))
+        expected = self.make_planner()
+        expected.obstacles = [("column", (10, 15, 2, 2))]
+        expected.add_door((380, 400, 20, 90))
+        expected.calculate_weights()
+        self.assertTrue(np.array_equal(planner.base_weights, expected.base_weights))
+        self.assertEqual(planner.base_weights[15, 10], 0.0)
+        planner.restore(snapshot)
+        self.assertEqual(planner.obstacles, [])
+        with self.assertRaises(ValueError):
+            planner.add_obstacle("radiator", (0, 0, 20, 20))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,203 @@
+import unittest
+import numpy as np
+
+from app.integral import IntegralGrid
+from app.roomplanner import RoomPlanner
+from benchmarks.bench_planner import load_scenarios
+
+# Сценарии из test.py, на которых сравниваются способы подсчета весов
+SCENARIOS = [
+    {
+        "room_size": (400, 600),
+        "doors": [(0, 200, 20, 90)],
+        "windows": [(100, 0, 180, 20)],
+        "furniture_list": [
+            ("Туалетный столик", 60, 30, "window"),
+            ("Двуспальная кровать", 200, 180, "wall"),
+            ("Стул", 20, 20, "near", "Туалетный столик"),
+            ("Прикроватная тумбочка", 30, 30, "around", "Двуспальная кровать"),
+            ("Шкаф 1", 120, 60, "wardrobe"),
+            ("Шкаф 2", 120, 60, "wardrobe")
+        ]
+    },
+    {
+        "room_size": (450, 650),
+        "doors": [(200, 250, 50, 100)],
+        "windows": [(150, 0, 150, 30)],
+        "furniture_list": [
+            ("Трехместный диван", 200, 100, "wall"),
+            ("Журнальный столик", 60, 40, "near", "Трехместный диван"),
+            ("Полка для книг", 120, 60, "wardrobe")
+        ]
+    },
+    {
+        "room_size": (350, 450),
+        "doors": [(0, 150, 40, 100)],
+        "windows": [(100, 0, 150, 30)],
+        "furniture_list": [
+            ("Кресло", 80, 50, "wall"),
+            ("Полка", 50, 40, "near", "Кресло"),
+            ("Тумбочка", 30, 30, "wardrobe"),
+            ("Шкаф для одежды", 120, 60, "wardrobe")
+        ]
+    },
+]
+
+# Расстановка test_cases из test.py прежним планировщиком (перебор срезов без таблицы сумм)
+REFERENCE_LAYOUTS = [
+    {"Туалетный столик": (14, 1, 3, 2), "Двуспальная кровать": (9, 9, 10, 9), "Стул": (14, 3, 1, 1),
+     "Прикроватная тумбочка 1": (18, 7, 2, 2), "Прикроватная тумбочка 2": (18, 18, 2, 2),
+     "Шкаф 1": (0, 27, 6, 3), "Шкаф 2": (12, 27, 6, 3)},
+    {"Книжный шкаф": (17, 2, 5, 2), "Офисный стол": (0, 10, 6, 4), "Кресло": (0, 16, 3, 3),
+     "Шкаф для одежды": (19, 32, 6, 3)},
+    {"Компьютерный стол": (0, 19, 5, 3), "Кресло офисное": (7, 19, 3, 3), "Шкаф для книг": (13, 7, 4, 2),
+     "Кровать": (4, 7, 9, 10), "Тумбочка 1": (12, 5, 2, 2), "Тумбочка 2": (12, 17, 2, 2)},
+    {"Кухонный стол": (0, 33, 6, 4), "Диван 1": (5, 28, 10, 5), "Шкаф для посуды": (25, 15, 5, 3),
+     "Полка 1": (26, 13, 4, 2), "Полка 2": (26, 18, 4, 2)},
+    {"Трехместный диван": (0, 25, 10, 5), "Журнальный столик": (12, 25, 3, 2), "Полка для книг": (0, 9, 6, 3)},
+    {"Компьютерный стол": (0, 22, 6, 3), "Офисный стул": (0, 27, 3, 3), "Книжный шкаф": (16, 16, 4, 2)},
+    {"Двуспальная кровать": (24, 3, 10, 9), "Тумбочка 1": (33, 1, 2, 2), "Тумбочка 2": (33, 12, 2, 2),
+     "Шкаф": (20, 42, 6, 3)},
+    {"Кресло": (0, 18, 4, 3), "Полка": (6, 19, 3, 2), "Тумбочка": (15, 10, 2, 2), "Шкаф для одежды": (11, 16, 6, 3)},
+    {"Журнальный столик": (15, 2, 4, 3), "Диван": (0, 10, 13, 8), "Шкаф": (24, 37, 6, 3),
+     "Полка для книг": (15, 10, 5, 3)},
+    {"Стол для компьютера": (0, 8, 5, 3), "Офисный стул": (7, 8, 3, 3), "Шкаф": (21, 34, 6, 3)},
+]
+
+
+def plan(scenario, cell_size, **kwargs) -> RoomPlanner:
+    """Расставляет мебель сценария так же, как test.py."""
+    planner = RoomPlanner(scenario["room_size"], cell_size, scenario["doors"], scenario["windows"], **kwargs)
+    planner.calculate_weights()
+    for name, width, height, placement, *extra in scenario["furniture_list"]:
+        if placement == "window":
+            planner.place_furniture(name, width, height, prefer_window=True)
+        elif placement == "wall":
+            planner.place_furniture(name, width, height, prefer_wall=True)
+        elif placement == "near":
+            planner.place_furniture_near(name, width, height, near_name=extra[0])
+        elif placement == "around":
+            planner.place_furniture_around(name, width, height, target_name=extra[0])
+        elif placement == "wardrobe":
+            planner.place_wardrobe(name, width, height)
+    return planner
+
+
+class TestIntegralGrid(unittest.TestCase):
+    def setUp(self):
+        """Случайная сетка весов."""
+        self.grid = np.random.default_rng(0).random((17, 23))
+
+    def test_rect_sum(self):
+        """Сумма прямоугольника совпадает с суммой среза."""
+        integral = IntegralGrid(self.grid)
+        for x, y, w, h in [(0, 0, 23, 17), (3, 4, 5, 6), (22, 16, 1, 1), (0, 10, 7, 7)]:
+            self.assertAlmostEqual(integral.rect_sum(x, y, w, h), self.grid[y:y+h, x:x+w].sum())
+
+    def test_window_sums(self):
+        """Суммы для всех положений совпадают с rect_sum."""
+        integral = IntegralGrid(self.grid)
+        sums = integral.window_sums(4, 3)
+        self.assertEqual(sums.shape, (15, 20))
+        self.assertEqual(sums[5, 7], integral.rect_sum(7, 5, 4, 3))
+
+    def test_update_matches_rebuild(self):
+        """Инкрементальное обновление побитово совпадает с полным пересчетом."""
+        integral = IntegralGrid(self.grid)
+        for y_start, y_end, x_start, x_end in [(3, 8, 5, 9), (0, 2, 0, 23), (10, 17, 20, 23)]:
+            self.grid[y_start:y_end, x_start:x_end] = 0
+            integral.update(self.grid, y_start, y_end, x_start, x_end)
+        expected = IntegralGrid(self.grid)
+        self.assertTrue(np.array_equal(integral.table, expected.table))
+        self.assertTrue(np.array_equal(integral.window_sums(4, 3), expected.window_sums(4, 3)))
+        self.assertTrue(np.array_equal(integral.exact_windows(4, 3), expected.exact_windows(4, 3)))
+
+    def test_lean_update_matches_rebuild(self):
+        """Без сумм по столбцам обновление квантованной сетки тоже совпадает с пересчетом."""
+        grid = np.round(self.grid * 2 ** 20) / 2 ** 20
+        integral = IntegralGrid(grid, lean=True)
+        for y_start, y_end, x_start, x_end in [(3, 8, 5, 9), (0, 2, 0, 23), (10, 17, 20, 23)]:
+            grid[y_start:y_end, x_start:x_end] = 0
+            integral.update(grid, y_start, y_end, x_start, x_end)
+        self.assertTrue(np.array_equal(integral.table, IntegralGrid(grid).table))
+        self.assertLess(integral.nbytes, IntegralGrid(grid).nbytes)
+
+
+class TestScoringParity(unittest.TestCase):
+    def test_integral_matches_brute(self):
+        """Таблица префиксных сумм дает ту же расстановку, что и перебор срезов."""
+        for cell_size in (20, 10):
+            for scenario in SCENARIOS:
+                with self.subTest(cell_size=cell_size, room_size=scenario["room_size"]):
+                    brute = plan(scenario, cell_size, scoring="brute")
+                    integral = plan(scenario, cell_size, scoring="integral")
+                    self.assertEqual(integral.furniture_positions, brute.furniture_positions)
+                    self.assertTrue(np.array_equal(integral.grid, brute.grid))
+
+    def test_vectorized_matches_brute(self):
+        """Векторизованные карты оценок дают ту же расстановку, что и перебор срезов."""
+        for cell_size in (20, 10, 7):
+            for scenario in SCENARIOS:
+                with self.subTest(cell_size=cell_size, room_size=scenario["room_size"]):
+                    brute = plan(scenario, cell_size, scoring="brute")
+                    vectorized = plan(scenario, cell_size, scoring="vectorized")
+                    self.assertEqual(vectorized.furniture_positions, brute.furniture_positions)
+
+    def test_lean_matches_float64(self):
+        """Экономный режим (float32 и битовая маска) дает ту же расстановку, что и float64 с квантованием весов."""
+        for cell_size in (20, 10, 7):
+            for scenario in SCENARIOS:
+                for scoring in ("brute", "integral", "vectorized"):
+                    with self.subTest(cell_size=cell_size, room_size=scenario["room_size"], scoring=scoring):
+                        full = plan(scenario, cell_size, scoring=scoring, quantize=True)
+                        lean = plan(scenario, cell_size, scoring=scoring, lean=True)
+                        self.assertEqual(lean.furniture_positions, full.furniture_positions)
+                        self.assertEqual(lean.grid.dtype, np.float32)
+                        self.assertTrue(np.array_equal(lean.grid, full.grid))
+
+    def test_reference_layouts(self):
+        """Все способы подсчета расставляют test_cases из test.py так же, как прежний планировщик."""
+        scenarios = load_scenarios()
+        self.assertEqual(len(scenarios), len(REFERENCE_LAYOUTS))
+        for number, (scenario, expected) in enumerate(zip(scenarios, REFERENCE_LAYOUTS), 1):
+            for scoring in ("brute", "integral", "vectorized", "pyramid"):
+                with self.subTest(test_case=number, scoring=scoring):
+                    positions = plan(scenario, scenario["cell_size"], scoring=scoring).furniture_positions
+                    self.assertEqual({name: tuple(int(value) for value in position)
+                                      for name, position in positions.items()}, expected)
+
+    def test_near_tie(self):
+        """Оценки, различающиеся на погрешность округления, различаются и у таблицы сумм."""
+        scenario = {"room_size": (210, 300), "doors": [], "windows": [(144, 200, 44, 20)],
+                    "furniture_list": [("Стол", 100, 120, "wall"), ("Диван", 140, 100, "window")]}
+        options = [dict(scoring=scoring) for scoring in ("brute", "integral", "vectorized", "pyramid")]
+        options += [dict(scoring="integral", prune=False), dict(scoring="brute", lazy=True, tile_size=4)]
+        for kwargs in options:
+            with self.subTest(**kwargs):
+                planner = plan(scenario, 20, **kwargs)
+                self.assertEqual(planner.furniture_positions["Диван"], (0, 9, 7, 5))
+        # С квантованием эти оценки равны, и выбирается первая позиция по строкам
+        self.assertEqual(plan(scenario, 20, quantize=True).furniture_positions["Диван"], (0, 8, 7, 5))
+
+    def test_exact_windows(self):
+        """Суммы без остатков весов совпадают с суммами срезов до бита, остальные - с допуском."""
+        grid = np.random.default_rng(1).random((40, 50))
+        grid[:20] = np.round(grid[:20] * 2 ** 20) / 2 ** 20
+        integral = IntegralGrid(grid)
+        sums, exact = integral.window_sums(7, 5), integral.exact_windows(7, 5)
+        self.assertTrue(exact[:16].all() and not exact[16:].any())
+        for y in range(sums.shape[0]):
+            for x in range(sums.shape[1]):
+                expected = grid[y:y + 5, x:x + 7].sum()
+                if exact[y, x]:
+                    self.assertEqual(sums[y, x], expected)
+                self.assertAlmostEqual(sums[y, x], expected, places=12)
+
+    def test_unknown_scoring(self):
+        """Неизвестный способ подсчета отклоняется."""
+        with self.assertRaises(ValueError):
+            RoomPlanner((400, 600), 20, [], [], scoring="fast")
+
+
+if __name__ == "__main__":
+    unittest.main()
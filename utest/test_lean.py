@@ -0,0 +1,76 @@
+import unittest
+import numpy as np
+
+from app.batch import plan_room
+from app.integral import IntegralGrid
+from app.mask import PackedMask
+from app.roomplanner import FurnitureRecord, RoomPlanner
+
+SPEC = {
+    "room_size": (400, 600),
+    "cell_size": 5,
+    "doors": [(0, 200, 20, 90)],
+    "windows": [(100, 0, 180, 20)],
+    "furniture_list": [
+        ("Туалетный столик", 60, 30, "window"),
+        ("Двуспальная кровать", 200, 180, "wall"),
+        ("Стул", 20, 20, "near", "Туалетный столик"),
+        ("Шкаф 1", 120, 60, "wardrobe")
+    ]
+}
+
+
+class TestPackedMask(unittest.TestCase):
+    def test_matches_bool_array(self):
+        """Чтение и запись областей совпадают с обычным массивом bool."""
+        mask = PackedMask((7, 21))
+        expected = np.zeros((7, 21), dtype=bool)
+        for y_start, y_end, x_start, x_end, value in [(1, 5, 3, 12, True), (0, 7, 9, 21, True),
+                                                      (2, 4, 0, 10, False), (6, 7, 20, 21, False)]:
+            mask[y_start:y_end, x_start:x_end] = value
+            expected[y_start:y_end, x_start:x_end] = value
+            self.assertTrue(np.array_equal(mask[:, :], expected))
+        self.assertTrue(np.array_equal(mask[1:6, 5:17], expected[1:6, 5:17]))
+        self.assertTrue(np.array_equal(np.asarray(mask), expected))
+        self.assertEqual(mask.nbytes, 7 * 3)
+
+
+class TestLeanPlanner(unittest.TestCase):
+    def test_memory(self):
+        """Сетки экономного планировщика занимают меньше памяти."""
+        full = plan_room(SPEC, quantize=True)
+        lean = plan_room(SPEC, lean=True)
+        self.assertEqual(lean.furniture_positions, full.furniture_positions)
+        self.assertLess(lean.nbytes, full.nbytes * 0.6)
+
+    def test_editing(self):
+        """Удаление и перенос мебели в экономном режиме дают то же состояние, что и в обычном с квантованием."""
+        planners = [plan_room(SPEC, quantize=True), plan_room(SPEC, lean=True)]
+        for planner in planners:
+            planner.remove_furniture("Стул")
+            planner.move_furniture("Туалетный столик", 40, 60)
+        full, lean = planners
+        self.assertTrue(np.array_equal(lean.grid, full.grid))
+        self.assertTrue(np.array_equal(lean.occupancy[:, :], full.occupancy))
+        self.assertTrue(np.array_equal(lean.integral.table, IntegralGrid(full.grid).table))
+
+    def test_furniture_record(self):
+        """Положение мебели сравнивается и распаковывается как кортеж."""
+        planner = RoomPlanner((400, 600), 20, [], [])
+        planner.place_furniture("Стол", 60, 30)
+        record = planner.furniture_positions["Стол"]
+        self.assertIsInstance(record, FurnitureRecord)
+        x, y, width, height = record
+        self.assertEqual(record, (x, y, 3, 2))
+        self.assertEqual(record.width, width)
+
+    def test_slots(self):
+        """У планировщика нет словаря атрибутов."""
+        planner = RoomPlanner((400, 600), 20, [], [], lean=True)
+        self.assertFalse(hasattr(planner, "__dict__"))
+        with self.assertRaises(AttributeError):
+            planner.unknown = 1
+
+
+if __name__ == '__main__':
+    unittest.main()
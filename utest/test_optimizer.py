@@ -0,0 +1,63 @@
+import unittest
+import numpy as np
+
+from app.batch import plan_room
+from app.optimizer import layout_score, optimize
+
+# Стеллаж помещается в узкую комнату только повернутым, а стул ставится рядом с ним
+NARROW_ROOM = {
+    "room_size": (200, 600),
+    "doors": [(0, 300, 20, 90)],
+    "windows": [],
+    "furniture_list": [
+        ("Стеллаж", 300, 60, "wall"),
+        ("Стул", 40, 40, "near", "Стеллаж"),
+        ("Шкаф", 100, 50, "wardrobe")
+    ]
+}
+
+ROOM = {
+    "room_size": (400, 600),
+    "doors": [(0, 200, 20, 90)],
+    "windows": [(100, 0, 180, 20)],
+    "furniture_list": [
+        ("Туалетный столик", 60, 30, "window"),
+        ("Двуспальная кровать", 200, 180, "wall"),
+        ("Стул", 20, 20, "near", "Туалетный столик"),
+        ("Шкаф 1", 120, 60, "wardrobe")
+    ]
+}
+
+
+class TestOptimizer(unittest.TestCase):
+    def test_rotation_avoids_failures(self):
+        """Поворот и порядок предметов позволяют поставить всю мебель."""
+        greedy = plan_room(NARROW_ROOM)
+        self.assertEqual(len(greedy.failures), 2)
+        result = optimize(NARROW_ROOM, workers=1)
+        self.assertEqual(result.planner.failures, [])
+        self.assertIn(("Стеллаж", True), result.order)
+        self.assertLess(result.order.index(("Стеллаж", True)), result.order.index(("Стул", False)))
+        self.assertEqual(result.score, layout_score(result.planner))
+
+    def test_not_worse_than_greedy(self):
+        """Результат не хуже жадной расстановки в исходном порядке."""
+        result = optimize(ROOM, beam_width=2, workers=1)
+        self.assertLessEqual(result.score, layout_score(plan_room(ROOM)))
+
+    def test_deterministic(self):
+        """Результат не зависит от числа процессов и повторяется при том же seed."""
+        single = optimize(ROOM, workers=1, seed=7, max_children=3)
+        pooled = optimize(ROOM, workers=2, seed=7, max_children=3)
+        self.assertEqual(single.order, pooled.order)
+        self.assertEqual(single.score, pooled.score)
+        self.assertTrue(np.array_equal(single.planner.grid, pooled.planner.grid))
+
+    def test_time_budget(self):
+        """Исчерпанный бюджет времени возвращает жадную расстановку."""
+        result = optimize(NARROW_ROOM, workers=1, time_budget=0)
+        self.assertEqual([name for name, _ in result.order], ["Стеллаж", "Стул", "Шкаф"])
+
+
+if __name__ == "__main__":
+    unittest.main()
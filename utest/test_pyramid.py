@@ -0,0 +1,121 @@
+import unittest
+import numpy as np
+
+from app import pyramid
+from app.batch import plan_room
+from app.integral import IntegralGrid
+from app.roomplanner import RoomPlanner
+from app.scoring import occupied_distance
+
+SPECS = [
+    {
+        "room_size": (400, 600),
+        "doors": [(0, 200, 20, 90)],
+        "windows": [(100, 0, 180, 20)],
+        "furniture_list": [
+            ("Туалетный столик", 60, 30, "window"),
+            ("Двуспальная кровать", 200, 180, "wall"),
+            ("Стул", 20, 20, "near", "Туалетный столик"),
+            ("Шкаф 1", 120, 60, "wardrobe"),
+            ("Шкаф 2", 120, 60, "wardrobe")
+        ]
+    },
+    {
+        "room_size": (900, 700),
+        "doors": [(0, 300, 20, 90), (880, 100, 20, 90)],
+        "windows": [(100, 0, 180, 20), (500, 680, 200, 20)],
+        "furniture_list": [
+            ("Диван", 200, 90, "wall"),
+            ("Стол", 120, 80, "window"),
+            ("Комод", 80, 40, "wall"),
+            ("Шкаф", 100, 50, "wardrobe"),
+            ("Полка", 60, 30, "wardrobe")
+        ]
+    },
+]
+
+
+def block_max(values: np.ndarray, blocks: pyramid.Blocks) -> np.ndarray:
+    """Максимум значений позиций в каждом блоке."""
+    result = np.empty(blocks.shape)
+    for index in range(result.size):
+        y_start, y_end, x_start, x_end = blocks.bounds(index)
+        result.flat[index] = values[y_start:y_end, x_start:x_end].max()
+    return result
+
+
+class TestBounds(unittest.TestCase):
+    def setUp(self):
+        """Комната с мебелью на мелкой сетке."""
+        self.planner = plan_room(dict(SPECS[1], cell_size=10))
+        self.occupied = self.planner.grid == 0
+
+    def test_area_bounds(self):
+        """Граница суммы весов не меньше суммы ни в одной позиции блока."""
+        integral = IntegralGrid(self.planner.grid)
+        for width, height, factor in [(12, 8, 4), (3, 5, 7), (1, 1, 2)]:
+            sums = integral.window_sums(width, height)
+            blocks = pyramid.Blocks(*sums.shape, factor)
+            max_weight = float(self.planner.grid.max())
+            tolerance = self.planner._tolerance(width, height, max_weight)
+            bounds = pyramid.area_bounds(integral, blocks, width, height, max_weight, tolerance)
+            self.assertTrue(np.all(bounds >= block_max(sums, blocks)))
+
+    def test_distance_bounds(self):
+        """Граница расстояния до занятых клеток не меньше расстояния ни в одной позиции блока."""
+        grid_height, grid_width = self.occupied.shape
+        for width, height, factor in [(10, 5, 4), (3, 8, 5), (1, 1, 3), (6, 6, 8)]:
+            rows, cols = grid_height - height + 1, grid_width - width + 1
+            distances = occupied_distance(self.occupied, width, height, rows, cols)
+            blocks = pyramid.Blocks(rows, cols, factor)
+            bounds = pyramid.distance_bounds(self.occupied, blocks, width, height)
+            self.assertTrue(np.all(bounds >= block_max(distances, blocks)))
+
+    def test_occupied_distance_window(self):
+        """Расстояния в окне позиций совпадают с соответствующей частью полной карты."""
+        grid_height, grid_width = self.occupied.shape
+        rows, cols = grid_height - 4, grid_width - 6
+        full = occupied_distance(self.occupied, 7, 5, rows, cols)
+        window = occupied_distance(self.occupied, 7, 5, 9, 11, x_start=30, y_start=20)
+        self.assertTrue(np.array_equal(window, full[20:29, 30:41]))
+
+
+class TestPyramidSearch(unittest.TestCase):
+    def test_matches_vectorized(self):
+        """Точный поиск по пирамиде дает ту же расстановку, что и полный перебор."""
+        for spec in SPECS:
+            for cell_size in (20, 10, 5):
+                for factor, top_k in [(2, 1), (8, 4), (16, 2)]:
+                    with self.subTest(room_size=spec["room_size"], cell_size=cell_size, factor=factor):
+                        room = dict(spec, cell_size=cell_size)
+                        expected = plan_room(room, scoring="vectorized")
+                        planner = plan_room(room, scoring="pyramid", pyramid_factor=factor, pyramid_k=top_k)
+                        self.assertEqual(planner.furniture_positions, expected.furniture_positions)
+
+    def test_fewer_candidates(self):
+        """На мелкой сетке точно оцениваются только позиции в немногих блоках."""
+        spec = dict(SPECS[0], cell_size=2)
+        planner = plan_room(spec, scoring="pyramid", collect_stats=True)
+        full = plan_room(spec, scoring="vectorized", collect_stats=True)
+        for method in ("place_furniture", "place_wardrobe"):
+            self.assertLess(planner.stats.methods[method].candidates, full.stats.methods[method].candidates / 10)
+
+    def test_inexact(self):
+        """Без точного режима уточняются только pyramid_k блоков."""
+        planner = RoomPlanner((400, 600), 5, [(0, 200, 20, 90)], [], scoring="pyramid",
+                              pyramid_k=1, pyramid_exact=False, collect_stats=True)
+        planner.calculate_weights()
+        planner.place_wardrobe("Шкаф", 120, 60)
+        self.assertIn("Шкаф", planner.furniture_positions)
+        self.assertLessEqual(planner.stats.methods["place_wardrobe"].candidates, 8 * 8)
+
+    def test_invalid_parameters(self):
+        """Фактор меньше 2 и пустой top-k отклоняются."""
+        with self.assertRaises(ValueError):
+            RoomPlanner((400, 600), 20, [], [], scoring="pyramid", pyramid_factor=1)
+        with self.assertRaises(ValueError):
+            RoomPlanner((400, 600), 20, [], [], scoring="pyramid", pyramid_k=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
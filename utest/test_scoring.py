@@ -0,0 +1,97 @@
+import unittest
+import numpy as np
+
+from app.roomplanner import RoomPlanner
+from app.scoring import best_position, bounded_search, free_counts, occupied_distance
+
+
+class TestOccupiedDistance(unittest.TestCase):
+    def brute_distance(self, occupied, width, height):
+        """Расстояния от центров мебели до занятых клеток перебором, как в place_wardrobe."""
+        grid_height, grid_width = occupied.shape
+        cells = np.argwhere(occupied)
+        result = np.empty((grid_height - height + 1, grid_width - width + 1))
+        for y in range(result.shape[0]):
+            for x in range(result.shape[1]):
+                center_x = x + width / 2
+                center_y = y + height / 2
+                result[y, x] = np.sqrt((cells[:, 1] - center_x) ** 2 + (cells[:, 0] - center_y) ** 2).min()
+        return result
+
+    def test_matches_brute(self):
+        """Преобразование расстояний совпадает с перебором при любой четности размеров."""
+        rng = np.random.default_rng(1)
+        for width, height in [(1, 1), (2, 3), (5, 4), (3, 7)]:
+            occupied = rng.random((19, 13)) < 0.03
+            occupied[0, 0] = True
+            rows, cols = 19 - height + 1, 13 - width + 1
+            with self.subTest(width=width, height=height):
+                expected = self.brute_distance(occupied, width, height)
+                self.assertTrue(np.array_equal(occupied_distance(occupied, width, height, rows, cols), expected))
+
+
+class TestBestPosition(unittest.TestCase):
+    def test_first_maximum(self):
+        """При равных оценках выбирается первая позиция в порядке строк."""
+        scores = np.array([[0.0, 2.0, 1.0], [2.0, 0.0, 2.0]])
+        self.assertEqual(best_position(scores), (1, 0))
+
+    def test_no_position(self):
+        """Без допустимых позиций результат пустой."""
+        self.assertIsNone(best_position(np.full((2, 2), -np.inf)))
+        self.assertIsNone(best_position(np.empty((0, 3))))
+
+
+class TestBoundedSearch(unittest.TestCase):
+    def test_matches_full_search(self):
+        """Перебор с отсечением находит ту же позицию, что и построчный, включая равные оценки."""
+        rng = np.random.default_rng(2)
+        for _ in range(50):
+            scores = rng.integers(0, 4, (6, 7)).astype(float)
+            bounds = scores + rng.integers(0, 3, scores.shape)
+            position, evaluated = bounded_search(bounds, lambda x, y: scores[y, x])
+            self.assertEqual(position, best_position(scores))
+            self.assertLessEqual(evaluated, scores.size)
+
+    def test_prunes(self):
+        """Позиции с границей ниже найденной оценки не оцениваются."""
+        bounds = np.array([[1.0, 5.0], [2.0, 5.0]])
+        seen = []
+        position, evaluated = bounded_search(bounds, lambda x, y: seen.append((x, y)) or 4.0)
+        self.assertEqual((position, evaluated), ((1, 0), 2))
+        self.assertEqual(seen, [(1, 0), (1, 1)])
+
+    def test_rejected(self):
+        """Отклоненные позиции не выбираются."""
+        self.assertEqual(bounded_search(np.ones((2, 2)), lambda x, y: None), (None, 4))
+
+    def test_free_counts(self):
+        grid = np.ones((5, 6))
+        grid[1:3, 2:4] = 0
+        counts = free_counts(grid, 2, 2, 4, 5)
+        self.assertEqual(counts[0, 0], 4)
+        self.assertEqual(counts[1, 2], 0)
+        self.assertEqual(counts[0, 1], 3)
+
+
+class TestPrunedPlanner(unittest.TestCase):
+    def test_same_layout(self):
+        """Расстановка с отсечением совпадает с полным перебором."""
+        for scoring in ("brute", "integral"):
+            for lean in (False, True):
+                planners = []
+                for prune in (False, True):
+                    planner = RoomPlanner((400, 600), 20, [(0, 200, 20, 90)], [(100, 0, 180, 20)],
+                                          scoring=scoring, lean=lean, prune=prune)
+                    planner.calculate_weights(4)
+                    planner.place_furniture("Столик", 60, 30, prefer_window=True)
+                    planner.place_furniture("Кровать", 200, 180, prefer_wall=True)
+                    planner.place_wardrobe("Шкаф", 120, 60)
+                    planner.place_furniture("Стол", 80, 60)
+                    planners.append(planner)
+                with self.subTest(scoring=scoring, lean=lean):
+                    self.assertEqual(planners[0].furniture_positions, planners[1].furniture_positions)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import unittest
+
+from app.batch import plan_result
+from app.cache import PlanCache
+from app.service import PlanningService, ServiceBusy
+from benchmarks.bench_service import percentile
+
+SPEC = {
+    "room_size": (400, 600),
+    "doors": [(0, 200, 20, 90)],
+    "windows": [(100, 0, 180, 20)],
+    "furniture_list": [
+        ("Туалетный столик", 60, 30, "window"),
+        ("Стул", 20, 20, "near", "Туалетный столик"),
+        ("Шкаф 1", 120, 60, "wardrobe"),
+    ]
+}
+OTHER = dict(SPEC, room_size=(500, 600))
+
+
+class TestPlanningService(unittest.IsolatedAsyncioTestCase):
+    async def test_plan_and_coalesce(self):
+        """Одинаковые одновременные запросы считаются одной задачей пула."""
+        async with PlanningService(workers=2) as service:
+            results = await asyncio.gather(*(service.plan(dict(SPEC)) for _ in range(5)), service.plan(OTHER))
+        expected = plan_result(0, SPEC)
+        for result in results[:5]:
+            self.assertEqual(result.furniture_positions, expected.furniture_positions)
+        self.assertEqual(results[5].furniture_positions, plan_result(0, OTHER).furniture_positions)
+        self.assertEqual(service.counters["computations"], 2)
+        self.assertEqual(service.counters["coalesced"], 4)
+        self.assertEqual(service.pending, 0)
+
+    async def test_backpressure(self):
+        """При заполненной очереди новая задача отклоняется, а одинаковый запрос присоединяется к идущей."""
+        async with PlanningService(workers=1, max_pending=1, queue_timeout=0) as service:
+            first = asyncio.ensure_future(service.plan(SPEC))
+            await asyncio.sleep(0)
+            with self.assertRaises(ServiceBusy):
+                await service.plan(OTHER)
+            same = await service.plan(SPEC)
+            self.assertEqual((await first).furniture_positions, same.furniture_positions)
+            # После завершения задачи место в очереди освобождается
+            await service.plan(OTHER)
+        self.assertEqual(service.counters["rejected"], 1)
+        self.assertEqual(service.counters["computations"], 2)
+
+    async def test_queue_wait(self):
+        """С queue_timeout=None запрос ждет места в очереди, а не отклоняется."""
+        async with PlanningService(workers=1, max_pending=1) as service:
+            results = await asyncio.gather(service.plan(SPEC), service.plan(OTHER))
+        self.assertEqual(len(results), 2)
+        self.assertEqual(service.counters["rejected"], 0)
+
+    async def test_image_and_cache(self):
+        """PNG рисуется по запросу, а результаты из кэша не доходят до пула."""
+        cache = PlanCache()
+        async with PlanningService(workers=1, cache=cache) as service:
+            png = await service.image(SPEC)
+            await service.plan(SPEC)
+            cached = await service.plan(SPEC)
+            with self.assertRaises(ValueError):
+                await service.plan({"room_size": (400, 600)})
+        self.assertTrue(png.startswith(b"\x89PNG"))
+        self.assertEqual(cached.furniture_positions, plan_result(0, SPEC).furniture_positions)
+        self.assertEqual(service.counters["cache_hits"], 1)
+        self.assertEqual(service.counters["computations"], 2)
+
+    async def test_cache_off_loop(self):
+        """Кэш читается и пишется не в потоке цикла событий, а результат общей задачи сохраняется один раз."""
+        loop_thread = threading.get_ident()
+        calls = []
+
+        class RecordingCache(PlanCache):
+            def get(self, spec, index=0):
+                calls.append(("get", threading.get_ident()))
+                return super().get(spec, index)
+
+            def put(self, spec, result):
+                calls.append(("put", threading.get_ident()))
+                super().put(spec, result)
+
+        async with PlanningService(workers=1, cache=RecordingCache()) as service:
+            await asyncio.gather(*(service.plan(dict(SPEC)) for _ in range(4)))
+            await service.plan(SPEC)
+        self.assertEqual([name for name, _ in calls].count("put"), 1)
+        self.assertNotIn(loop_thread, [thread for _, thread in calls])
+        self.assertEqual(service.counters["cache_hits"], 1)
+
+    def test_percentile(self):
+        values = [float(value) for value in range(1, 101)]
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile([3.0], 0.99), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
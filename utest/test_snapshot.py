@@ -0,0 +1,111 @@
+import unittest
+import numpy as np
+
+from app.integral import IntegralGrid
+from app.roomplanner import RoomPlanner
+
+ROOM_SIZE = (400, 600)
+DOORS = [(0, 200, 20, 90)]
+WINDOWS = [(100, 0, 180, 20)]
+
+
+def furnished(**kwargs) -> RoomPlanner:
+    """Комната с кроватью, столиком и стулом."""
+    planner = RoomPlanner(ROOM_SIZE, 20, DOORS, WINDOWS, **kwargs)
+    planner.calculate_weights()
+    planner.place_furniture("Туалетный столик", 60, 30, prefer_window=True)
+    planner.place_furniture("Двуспальная кровать", 200, 180, prefer_wall=True)
+    planner.place_furniture_near("Стул", 20, 20, near_name="Туалетный столик")
+    return planner
+
+
+class TestSnapshot(unittest.TestCase):
+    def assertSameState(self, planner, expected):
+        self.assertEqual(planner.furniture_positions, expected.furniture_positions)
+        self.assertEqual(list(planner.furniture_positions), list(expected.furniture_positions))
+        self.assertEqual(planner.failures, expected.failures)
+        self.assertEqual(planner.doors, expected.doors)
+        self.assertTrue(np.array_equal(planner.base_weights, expected.base_weights))
+        self.assertTrue(np.array_equal(planner.grid, expected.grid))
+        self.assertTrue(np.array_equal(planner.occupancy[:, :], expected.occupancy[:, :]))
+        self.assertTrue(np.array_equal(planner.integral.table, IntegralGrid(expected.grid).table))
+
+    def test_restore(self):
+        """После restore состояние совпадает с состоянием на момент снимка."""
+        for lean in (False, True):
+            with self.subTest(lean=lean):
+                planner = furnished(lean=lean)
+                snapshot = planner.snapshot()
+                planner.place_wardrobe("Шкаф", 120, 60)
+                planner.remove_furniture("Стул")
+                planner.move_furniture("Туалетный столик", 8, 12)
+                planner.add_door((380, 400, 20, 90))
+                planner.place_furniture_near("Полка", 20, 20, near_name="Нет такой")
+                planner.restore(snapshot)
+                self.assertSameState(planner, furnished(lean=lean))
+
+    def test_nested(self):
+        """Снимки вкладываются, а после отмены более поздние снимки недействительны."""
+        planner = furnished()
+        first = planner.snapshot()
+        planner.place_wardrobe("Шкаф", 120, 60)
+        after_wardrobe = planner.snapshot()
+        expected = planner.copy()
+        planner.remove_furniture("Двуспальная кровать")
+        planner.restore(after_wardrobe)
+        self.assertSameState(planner, expected)
+        planner.restore(first)
+        self.assertNotIn("Шкаф", planner.furniture_positions)
+        planner.place_furniture("Стол", 60, 30)
+        with self.assertRaises(ValueError):
+            planner.restore(after_wardrobe)
+
+    def test_undo_log_is_local(self):
+        """Журнал хранит только измененные области, а не копии сетки."""
+        planner = furnished(scoring="vectorized")
+        snapshot = planner.snapshot()
+        planner.place_furniture_near("Пуф", 20, 20, near_name="Двуспальная кровать")
+        (edit,) = planner._undo
+        self.assertLess(edit.occupancy.size, planner.grid.size / 10)
+        self.assertIs(edit.base_weights, planner.base_weights)
+        planner.restore(snapshot)
+        self.assertEqual(planner._undo, [])
+
+
+class TestFork(unittest.TestCase):
+    def test_shared_until_changed(self):
+        """Ветка разделяет сетки с оригиналом, пока одна из них не изменится."""
+        planner = furnished()
+        branch = planner.fork()
+        self.assertIs(branch.grid, planner.grid)
+        self.assertIs(branch.integral, planner.integral)
+        branch.place_wardrobe("Шкаф", 120, 60)
+        self.assertIsNot(branch.grid, planner.grid)
+        self.assertIs(branch.base_weights, planner.base_weights)
+        self.assertNotIn("Шкаф", planner.furniture_positions)
+        self.assertTrue(np.array_equal(planner.grid, furnished().grid))
+        # Оригинал больше ни с кем не делит сетки и меняет их на месте
+        grid = planner.grid
+        planner.remove_furniture("Стул")
+        self.assertIs(planner.grid, grid)
+
+    def test_branch_matches_replay(self):
+        """Расстановка в ветке совпадает с расстановкой с нуля."""
+        planner = furnished()
+        branch = planner.fork()
+        branch.place_wardrobe("Шкаф", 120, 60)
+        expected = furnished()
+        expected.place_wardrobe("Шкаф", 120, 60)
+        self.assertEqual(branch.furniture_positions, expected.furniture_positions)
+        self.assertTrue(np.array_equal(branch.integral.table, expected.integral.table))
+
+    def test_snapshots_do_not_cross_branches(self):
+        """Снимок оригинала нельзя применить к ветке."""
+        planner = furnished()
+        snapshot = planner.snapshot()
+        with self.assertRaises(ValueError):
+            planner.fork().restore(snapshot)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import random
+import unittest
+import numpy as np
+
+from app.roomplanner import RoomPlanner
+from app.spatial import SpatialIndex, nearest_distances, rect_distance
+
+
+def cell_distance(rect, x, y) -> float:
+    """Расстояние до ближайшей клетки прямоугольника перебором клеток."""
+    rect_x, rect_y, width, height = rect
+    rows, cols = np.mgrid[rect_y:rect_y + height, rect_x:rect_x + width]
+    return float(np.sqrt((cols - x) ** 2 + (rows - y) ** 2).min())
+
+
+def random_rects(rng: random.Random, count: int) -> dict:
+    return {f"r{i}": (rng.randrange(0, 60), rng.randrange(0, 60), rng.randrange(1, 12), rng.randrange(1, 12))
+            for i in range(count)}
+
+
+class TestSpatialIndex(unittest.TestCase):
+    def test_rect_distance(self):
+        """Расстояние до прямоугольника совпадает с расстоянием до его ближайшей клетки."""
+        rng = random.Random(0)
+        for rect in random_rects(rng, 50).values():
+            x, y = rng.randrange(-10, 80) / 2, rng.randrange(-10, 80) / 2
+            self.assertEqual(rect_distance(rect, x, y), cell_distance(rect, x, y))
+
+    def test_queries_match_scan(self):
+        """Запросы индекса совпадают с перебором всех прямоугольников."""
+        rng = random.Random(1)
+        for bucket_size in (1, 4, 16):
+            rects = random_rects(rng, 40)
+            index = SpatialIndex(bucket_size)
+            for name, rect in rects.items():
+                index.insert(name, rect)
+            for _ in range(50):
+                x, y = rng.randrange(-20, 160) / 2, rng.randrange(-20, 160) / 2
+                nearest = min((rect_distance(rect, x, y), name) for name, rect in rects.items())
+                self.assertEqual(index.nearest(x, y), (nearest[1], nearest[0]))
+                radius = rng.randrange(0, 20)
+                within = sorted((rect_distance(rect, x, y), name) for name, rect in rects.items())
+                self.assertEqual(index.within(x, y, radius),
+                                 [name for distance, name in within if distance <= radius])
+                qx, qy, qw, qh = int(x), int(y), rng.randrange(1, 15), rng.randrange(1, 15)
+                overlapping = sorted(name for name, (rx, ry, rw, rh) in rects.items()
+                                     if rx < qx + qw and qx < rx + rw and ry < qy + qh and qy < ry + rh)
+                self.assertEqual(index.overlapping(qx, qy, qw, qh), overlapping)
+
+    def test_insert_remove(self):
+        """Повторная вставка заменяет прямоугольник, удаление освобождает корзины."""
+        index = SpatialIndex(4)
+        index.insert("a", (0, 0, 10, 10))
+        index.insert("a", (20, 20, 2, 2))
+        self.assertEqual(index["a"], (20, 20, 2, 2))
+        self.assertEqual(index.overlapping(0, 0, 10, 10), [])
+        self.assertEqual(index.remove("a"), (20, 20, 2, 2))
+        self.assertEqual(len(index), 0)
+        self.assertEqual(index._buckets, {})
+        self.assertIsNone(index.nearest(0, 0))
+
+    def test_nearest_distances(self):
+        """Векторный расчет по строке совпадает с rect_distance."""
+        rng = random.Random(2)
+        rects = list(random_rects(rng, 10).values())
+        xs = np.arange(0, 70) + 1.5
+        distances = nearest_distances(np.array(rects), xs, 7.0)
+        for x, distance in zip(xs, distances):
+            self.assertEqual(distance, min(rect_distance(rect, x, 7.0) for rect in rects))
+
+
+class TestPlannerIndex(unittest.TestCase):
+    def make_planner(self) -> RoomPlanner:
+        planner = RoomPlanner((400, 600), 20, [(0, 200, 20, 90)], [(100, 0, 180, 20)])
+        planner.calculate_weights()
+        planner.place_furniture("Столик", 60, 30, prefer_window=True)
+        planner.place_furniture("Кровать", 200, 180, prefer_wall=True)
+        planner.place_furniture_near("Стул", 20, 20, near_name="Столик")
+        return planner
+
+    def assertIndexed(self, planner):
+        self.assertEqual(dict(planner.furniture_index.items()),
+                         {name: tuple(position) for name, position in planner.furniture_positions.items()})
+
+    def test_index_follows_edits(self):
+        """Индекс повторяет furniture_positions после расстановки, удаления, отмены и развилки."""
+        planner = self.make_planner()
+        self.assertIndexed(planner)
+        snapshot = planner.snapshot()
+        branch = planner.fork()
+        planner.move_furniture("Стул", 15, 20)
+        planner.remove_furniture("Кровать")
+        self.assertIndexed(planner)
+        self.assertIndexed(branch)
+        self.assertIn("Кровать", branch.furniture_index)
+        planner.restore(snapshot)
+        self.assertIndexed(planner)
+        x, y, width, height = planner.furniture_positions["Столик"]
+        self.assertIn("Стул", planner.furniture_index.within(x, y, width + height))
+
+
+if __name__ == "__main__":
+    unittest.main()
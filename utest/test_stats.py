@@ -0,0 +1,81 @@
+import unittest
+
+from app.batch import plan_batch
+from app.roomplanner import RoomPlanner
+from app.stats import PlannerStats
+
+SPEC = {
+    "room_size": (400, 600),
+    "doors": [(0, 200, 20, 90)],
+    "windows": [(100, 0, 180, 20)],
+    "furniture_list": [
+        ("Туалетный столик", 60, 30, "window"),
+        ("Стул", 20, 20, "near", "Туалетный столик"),
+        ("Шкаф 1", 120, 60, "wardrobe")
+    ]
+}
+
+
+class TestPlannerStats(unittest.TestCase):
+    def test_disabled_by_default(self):
+        """По умолчанию статистика не собирается."""
+        planner = RoomPlanner((400, 600), 20, [], [])
+        planner.place_furniture("Стол", 60, 30)
+        self.assertIsNone(planner.stats)
+
+    def test_counters(self):
+        """Учитываются вызовы, время и число оцененных позиций."""
+        for scoring in ("integral", "vectorized"):
+            with self.subTest(scoring=scoring):
+                planner = RoomPlanner((400, 600), 20, [], [], scoring=scoring, collect_stats=True)
+                planner.calculate_weights()
+                planner.place_furniture("Стол", 60, 30)
+                planner.place_wardrobe("Шкаф", 120, 60)
+                methods = planner.stats.methods
+                self.assertEqual(methods["calculate_weights"].calls, 1)
+                self.assertEqual(methods["place_furniture"].candidates, (30 - 2) * (20 - 3))
+                self.assertEqual(methods["place_wardrobe"].candidates, (30 - 3 + 1) * (20 - 6 + 1))
+                self.assertGreater(methods["place_wardrobe"].seconds, 0)
+
+    def test_rejected_bounds(self):
+        """Позиции за пределами комнаты учитываются как отклоненные."""
+        planner = RoomPlanner((400, 600), 20, [], [], collect_stats=True)
+        planner.place_furniture("Кровать", 200, 180, prefer_wall=True)
+        planner.place_furniture_around("Тумбочка", 30, 30, target_name="Кровать")
+        around = planner.stats.methods["place_furniture_around"]
+        self.assertEqual(around.candidates, 2 * 10)
+        self.assertGreater(around.rejected_bounds, 0)
+
+    def test_pruned(self):
+        """Отсеченные позиции учитываются, а их доля выводится вместе со счетчиками."""
+        planner = RoomPlanner((400, 600), 20, [], [], scoring="brute", collect_stats=True)
+        planner.calculate_weights()
+        planner.place_furniture("Кровать", 200, 180, prefer_wall=True)
+        planner.place_wardrobe("Шкаф", 120, 60)
+        for method in ("place_furniture", "place_wardrobe"):
+            stats = planner.stats.methods[method]
+            self.assertGreater(stats.pruned, 0)
+            self.assertLessEqual(stats.pruned, stats.candidates)
+            self.assertEqual(stats.as_dict()["pruned_share"], stats.pruned / stats.candidates)
+        restored = PlannerStats.from_dict(planner.stats.as_dict())
+        self.assertEqual(restored.methods["place_wardrobe"].pruned, planner.stats.methods["place_wardrobe"].pruned)
+
+    def test_batch_aggregate(self):
+        """Статистика пакета складывается по всем комнатам."""
+        results = list(plan_batch([SPEC] * 3, workers=1, collect_stats=True))
+        total = PlannerStats.aggregate(result.stats for result in results)
+        single = PlannerStats.from_dict(results[0].stats)
+        self.assertEqual(total.methods["place_wardrobe"].calls, 3)
+        self.assertEqual(total.methods["place_furniture"].candidates, 3 * single.methods["place_furniture"].candidates)
+
+    def test_failure_is_logged(self):
+        """Неудачи пишутся в журнал, а не в stdout."""
+        planner = RoomPlanner((100, 100), 20, [], [])
+        with self.assertLogs("app.roomplanner", level="WARNING") as logs:
+            planner.place_furniture("Кровать", 200, 180)
+        self.assertIn("Кровать", logs.output[0])
+        self.assertEqual(planner.failures, ["Кровать"])
+
+
+if __name__ == "__main__":
+    unittest.main()
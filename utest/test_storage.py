@@ -0,0 +1,122 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from app.batch import plan_room
+from app.cli import run
+from app.storage import ALIGNMENT, LayoutArchive, LayoutWriter, encode, load, save
+
+SPEC = {
+    "room_size": (400, 600),
+    "doors": [(0, 200, 20, 90)],
+    "windows": [(100, 0, 180, 20)],
+    "furniture_list": [
+        ("Туалетный столик", 60, 30, "window"),
+        ("Двуспальная кровать", 200, 180, "wall"),
+        ("Стул", 20, 20, "near", "Туалетный столик"),
+        ("Шкаф 1", 120, 60, "wardrobe"),
+        ("Полка", 500, 500, "wall"),
+    ]
+}
+
+
+class TestStorage(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "rooms.rplan")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def assertSamePlanner(self, planner, expected):
+        self.assertEqual(planner.furniture_positions, expected.furniture_positions)
+        self.assertEqual(list(planner.furniture_positions), list(expected.furniture_positions))
+        self.assertEqual(planner.failures, expected.failures)
+        self.assertEqual(planner.doors, expected.doors)
+        self.assertEqual(planner.windows, expected.windows)
+        self.assertEqual(planner.influence_radius, expected.influence_radius)
+        self.assertTrue(np.array_equal(planner.base_weights, expected.base_weights))
+        self.assertTrue(np.array_equal(planner.grid, expected.grid))
+        self.assertTrue(np.array_equal(planner.occupancy[:, :], expected.occupancy[:, :]))
+
+    def test_round_trip(self):
+        """Сохраненная комната восстанавливается в то же состояние, с весами и без них."""
+        expected = plan_room(SPEC)
+        self.assertEqual(expected.failures, ["Полка"])
+        for weights in (True, False):
+            with self.subTest(weights=weights):
+                save(expected, self.path, weights=weights)
+                planner = load(self.path)
+                self.assertSamePlanner(planner, expected)
+                # Восстановленный планировщик продолжает расстановку так же
+                planner.place_wardrobe("Шкаф 2", 60, 60)
+                expected_next = plan_room(SPEC)
+                expected_next.place_wardrobe("Шкаф 2", 60, 60)
+                self.assertEqual(planner.furniture_positions, expected_next.furniture_positions)
+
+    def test_lean_weights(self):
+        """Веса экономного режима хранятся во float32 и читаются любым режимом."""
+        lean = plan_room(SPEC, lean=True)
+        save(lean, self.path)
+        with LayoutArchive(self.path) as archive:
+            self.assertEqual(archive[0].weights.dtype, np.float32)
+        self.assertSamePlanner(load(self.path, lean=True), lean)
+        self.assertTrue(np.array_equal(load(self.path).grid, plan_room(SPEC, quantize=True).grid))
+
+    def test_append_and_lazy_access(self):
+        """Комнаты дописываются в архив, а веса читаются без копирования из отображения файла."""
+        planners = [plan_room(dict(SPEC, room_size=(400 + 20 * i, 600))) for i in range(3)]
+        with LayoutWriter(self.path, append=False) as writer:
+            self.assertEqual(writer.write_many(planners[:2]), 2)
+        with LayoutWriter(self.path) as writer:
+            writer.write(encode(planners[2], weights=False))
+        with LayoutArchive(self.path) as archive:
+            self.assertEqual(len(archive), 3)
+            layouts = list(archive)
+            for layout, planner in zip(layouts, planners):
+                self.assertEqual(layout.furniture_positions, planner.furniture_positions)
+                self.assertEqual(layout.grid_width, planner.grid_width)
+            weights = layouts[1].weights
+            self.assertFalse(weights.flags.writeable)
+            self.assertFalse(weights.flags.owndata)
+            self.assertEqual(weights.__array_interface__["data"][0] % ALIGNMENT, 0)
+            self.assertTrue(np.array_equal(weights, planners[1].base_weights))
+            self.assertIsNone(layouts[2].weights)
+            self.assertTrue(np.array_equal(layouts[0].view().grid, planners[0].grid))
+            # Без весов отрисовывается только занятость
+            self.assertTrue(np.array_equal(layouts[2].view().grid == 0, planners[2].occupancy))
+
+    def test_invalid_files(self):
+        """Чужие, поврежденные и более новые файлы не читаются."""
+        save(plan_room(SPEC), self.path)
+        with open(self.path, "rb") as file:
+            data = file.read()
+        cases = {
+            "foreign": b"PNG" + data[3:],
+            "truncated": data[:-ALIGNMENT],
+            "newer": data[:8] + (99).to_bytes(2, "little") + data[10:],
+        }
+        for name, content in cases.items():
+            with self.subTest(name):
+                with open(self.path, "wb") as file:
+                    file.write(content)
+                with self.assertRaises(ValueError):
+                    LayoutArchive(self.path)
+                if name == "foreign":
+                    with self.assertRaises(ValueError):
+                        LayoutWriter(self.path)
+
+    def test_cli_archive(self):
+        """Командная строка дописывает все спланированные комнаты в архив."""
+        lines = [json.dumps(SPEC), json.dumps(dict(SPEC, room_size=[500, 600]))]
+        run(io.StringIO("\n".join(lines) + "\n"), io.StringIO(), workers=1, ordered=True, archive=self.path)
+        with LayoutArchive(self.path) as archive:
+            self.assertEqual([layout.room_size for layout in archive], [(400, 600), (500, 600)])
+            self.assertEqual(archive[0].furniture_positions, plan_room(SPEC).furniture_positions)
+
+
+if __name__ == "__main__":
+    unittest.main()
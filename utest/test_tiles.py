@@ -0,0 +1,155 @@
+import logging
+import unittest
+import numpy as np
+
+from app.batch import plan_room
+from app.roomplanner import RoomPlanner
+from app.scoring import occupied_distance
+from app.tiles import TiledWeights
+
+SPEC = {
+    "room_size": (400, 600),
+    "cell_size": 10,
+    "doors": [(0, 200, 20, 90)],
+    "windows": [(100, 0, 180, 20)],
+    "furniture_list": [
+        ("Туалетный столик", 60, 30, "window"),
+        ("Двуспальная кровать", 200, 180, "wall"),
+        ("Стул", 20, 20, "near", "Туалетный столик"),
+        ("Тумба", 30, 30, "around", "Двуспальная кровать"),
+        ("Шкаф 1", 120, 60, "wardrobe")
+    ]
+}
+LAZY = {"scoring": "brute", "lazy": True, "tile_size": 7, "max_tiles": 3}
+
+
+def sample(y_start, y_end, x_start, x_end):
+    rows, cols = np.mgrid[y_start:y_end, x_start:x_end]
+    return rows * 100.0 + cols
+
+
+class TestTiledWeights(unittest.TestCase):
+    def test_regions(self):
+        """Области, пересекающие границы плиток, совпадают с плотным массивом."""
+        weights = TiledWeights((23, 31), sample, tile_size=5, max_tiles=4)
+        expected = sample(0, 23, 0, 31)
+        for y_start, y_end, x_start, x_end in [(0, 23, 0, 31), (3, 4, 7, 8), (4, 16, 2, 29), (20, 23, 30, 31), (5, 5, 0, 3)]:
+            self.assertTrue(np.array_equal(weights[y_start:y_end, x_start:x_end], expected[y_start:y_end, x_start:x_end]))
+        self.assertTrue(np.array_equal(np.asarray(weights), expected))
+
+    def test_cache_bound(self):
+        """В кэше остается не больше max_tiles плиток; вытесняется давно не читанная."""
+        weights = TiledWeights((20, 20), sample, tile_size=5, max_tiles=2)
+        weights[0:1, 0:1]
+        weights[0:1, 5:6]
+        weights[0:1, 0:1]
+        weights[0:1, 10:11]  # вытесняет плитку (0, 1)
+        self.assertEqual(weights.computed, 3)
+        self.assertEqual(weights.nbytes, 2 * 25 * 8)
+        weights[0:1, 0:1]
+        self.assertEqual(weights.computed, 3)
+        weights[0:1, 5:6]
+        self.assertEqual(weights.computed, 4)
+
+    def test_blocks_region(self):
+        """Части плиток в области складываются в ту же область плотного массива."""
+        weights = TiledWeights((23, 31), sample, tile_size=5, max_tiles=4)
+        y_start, y_end, x_start, x_end = 4, 16, 2, 29
+        collected = np.zeros((23, 31))
+        for block_y, block_x, block in weights.blocks((y_start, y_end, x_start, x_end)):
+            collected[block_y:block_y + block.shape[0], block_x:block_x + block.shape[1]] += block + 1
+        expected = np.zeros((23, 31))
+        expected[y_start:y_end, x_start:x_end] = sample(y_start, y_end, x_start, x_end) + 1
+        self.assertTrue(np.array_equal(collected, expected))
+        self.assertEqual(weights.computed, 4 * 6)
+
+    def test_with_source(self):
+        """Новый источник забирает рассчитанные плитки только вне измененной области."""
+        weights = TiledWeights((20, 20), sample, tile_size=5, max_tiles=16)
+        np.asarray(weights)
+        replaced = weights.with_source(lambda *region: sample(*region) + 1, (0, 6, 0, 3))
+        self.assertEqual(replaced.nbytes, 14 * 25 * 8)
+        self.assertEqual(replaced[0:1, 0:1][0, 0], 1.0)
+        self.assertEqual(replaced[0:1, 15:16][0, 0], 15.0)
+        self.assertEqual(weights[0:1, 0:1][0, 0], 0.0)
+
+
+class TestLazyPlanner(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.WARNING)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def assert_same(self, lazy, dense):
+        self.assertEqual(lazy.furniture_positions, dense.furniture_positions)
+        self.assertTrue(np.array_equal(np.asarray(lazy.grid), dense.grid))
+        self.assertTrue(np.array_equal(np.asarray(lazy.occupancy), dense.occupancy))
+
+    def test_matches_dense(self):
+        """Ленивая сетка дает ту же расстановку и те же веса, что и плотная, с отсечением и без."""
+        dense = plan_room(SPEC, scoring="brute")
+        self.assert_same(plan_room(SPEC, **LAZY), dense)
+        self.assert_same(plan_room(SPEC, prune=False, **LAZY), dense)
+
+    def test_tiled_search(self):
+        """Блоки позиций, которые не могут содержать лучшую, отсекаются, а их плитки не рассчитываются."""
+        planners = [RoomPlanner((3000, 3000), 10, [(0, 1000, 20, 90)], [(1000, 0, 200, 20)], scoring="brute",
+                                collect_stats=True, **options)
+                    for options in ({"lazy": True, "tile_size": 32, "max_tiles": 8}, {})]
+        for planner in planners:
+            planner.calculate_weights()
+            planner.place_furniture("Стол", 200, 180, prefer_wall=True)
+            planner.place_wardrobe("Шкаф", 120, 60)
+        lazy, dense = planners
+        self.assertEqual(lazy.furniture_positions, dense.furniture_positions)
+        self.assertLess(lazy.base_weights.computed, 10 * 10 // 2)
+        stats = lazy.stats.as_dict()
+        self.assertGreater(stats["place_furniture"]["pruned_share"], 0.9)
+        self.assertGreater(stats["place_wardrobe"]["pruned_share"], 0.9)
+
+    def test_occupied_distances(self):
+        """Расстояния до занятых клеток по индексу прямоугольников совпадают с плотной сеткой."""
+        lazy, dense = plan_room(SPEC, **LAZY), plan_room(SPEC, scoring="brute")
+        index = lazy._occupied_index()
+        rows, cols = dense.grid_height - 6 + 1, dense.grid_width - 12 + 1
+        expected = occupied_distance(dense.grid == 0, 12, 6, rows, cols)
+        for y_start, y_end, x_start, x_end in [(0, rows, 0, cols), (10, 17, 3, 9), (rows - 1, rows, cols - 5, cols)]:
+            distances = lazy._occupied_distances(index, 12, 6, y_start, y_end, x_start, x_end)
+            self.assertTrue(np.array_equal(distances, expected[y_start:y_end, x_start:x_end]))
+
+    def test_editing(self):
+        """Новые препятствия, удаление мебели, развилки и снимки работают как с плотной сеткой."""
+        planners = [plan_room(SPEC, **LAZY), plan_room(SPEC, scoring="brute")]
+        snapshots = [planner.snapshot() for planner in planners]
+        for planner in planners:
+            planner.add_door((300, 400, 60, 20))
+            planner.remove_furniture("Стул")
+            branch = planner.fork()
+            branch.place_furniture("Стол", 60, 60)
+            planner.place_furniture("Кресло", 50, 50, prefer_wall=True)
+        self.assert_same(*planners)
+        self.assertNotIn("Стол", planners[0].furniture_positions)
+        for planner, snapshot in zip(planners, snapshots):
+            planner.restore(snapshot)
+        self.assert_same(*planners)
+        self.assertEqual(planners[0].furniture_positions, plan_room(SPEC).furniture_positions)
+
+    def test_bounded_memory(self):
+        """Память ленивой сетки не зависит от размера комнаты."""
+        planner = RoomPlanner((5000, 3000), 2, [(0, 1000, 100, 200)], [(1000, 0, 400, 20)], **LAZY)
+        planner.calculate_weights(20)
+        planner._update_grid("Стол", (600, 10), 60, 30)
+        planner.place_furniture_near("Стул", 40, 40, "Стол")
+        self.assertIn("Стул", planner.furniture_positions)
+        self.assertLessEqual(planner.nbytes, 3 * 7 * 7 * 8)
+        region = planner.base_weights[0:60, 480:720]
+        self.assertTrue(np.array_equal(region, planner._compute_base_weights(0, 60, 480, 720)))
+
+    def test_requires_brute(self):
+        with self.assertRaises(ValueError):
+            RoomPlanner((400, 600), 10, [], [], scoring="integral", lazy=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import os
+import tempfile
+import unittest
+
+from app.roomplanner import RoomPlanner
+from app.visualizer import ImageWriter, Renderer, RoomView
+
+
+class TestRenderer(unittest.TestCase):
+    def setUp(self):
+        """Комната с мебелью для отрисовки."""
+        self.planner = RoomPlanner((400, 600), 20, [(0, 200, 20, 90)], [(100, 0, 180, 20)])
+        self.planner.calculate_weights()
+        self.planner.place_furniture("Двуспальная кровать", 200, 180, prefer_wall=True)
+        self.planner.place_wardrobe("Шкаф", 120, 60)
+
+    def test_template_is_reused(self):
+        """Повторная отрисовка не накапливает элементы на шаблоне."""
+        renderer = Renderer()
+        renderer.draw(self.planner)
+        patches = len(renderer.ax.patches)
+        renderer.draw(self.planner)
+        self.assertEqual(len(renderer.ax.patches), patches)
+        # Сетка рисуется одной коллекцией: линия на каждую границу ячеек
+        self.assertEqual(len(renderer.grid_lines.get_segments()), self.planner.grid_width + self.planner.grid_height + 2)
+
+    def test_image_writer(self):
+        """Фоновая запись создает PNG для каждой комнаты."""
+        with tempfile.TemporaryDirectory() as directory:
+            with ImageWriter(directory) as writer:
+                futures = [writer.submit(self.planner, "room.png"), writer.submit(RoomView.from_room(self.planner), "view.png")]
+            for future in futures:
+                self.assertTrue(os.path.getsize(future.result()) > 0)
+
+
+if __name__ == "__main__":
+    unittest.main()